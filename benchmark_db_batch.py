@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库批量写入基准测试
+对比逐行保存（每行一次连接+提交）与单事务批量保存（executemany）的吞吐量（行/秒）
+
+用法：
+    python benchmark_db_batch.py                    # SQLite替身（无需MySQL）
+    python benchmark_db_batch.py --backend mysql    # 本地MySQL（使用db_config配置）
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+SQLITE_SCHEMA = '''
+    CREATE TABLE sessions (id INTEGER PRIMARY KEY AUTOINCREMENT, session_name TEXT, start_time TIMESTAMP);
+    CREATE TABLE persons (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, session_id INT NOT NULL, track_id INT NOT NULL,
+        first_seen TIMESTAMP, last_seen TIMESTAMP, total_frames INT, faces_detected INT,
+        avg_age REAL, dominant_gender TEXT, gender_confidence REAL
+    );
+    CREATE INDEX idx_persons_session ON persons (session_id);
+    CREATE TABLE positions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, person_id INT NOT NULL, x INT, y INT,
+        timestamp TIMESTAMP, frame_number INT
+    );
+    CREATE TABLE faces (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, person_id INT NOT NULL, age INT, gender TEXT,
+        gender_confidence REAL, bbox_x1 INT, bbox_y1 INT, bbox_x2 INT, bbox_y2 INT,
+        confidence REAL, timestamp TIMESTAMP
+    );
+'''
+
+PERSON_SQL = ('INSERT INTO persons (session_id, track_id, first_seen, last_seen, total_frames, '
+              'faces_detected, avg_age, dominant_gender, gender_confidence) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+POSITION_SQL = 'INSERT INTO positions (person_id, x, y, timestamp, frame_number) VALUES (?, ?, ?, ?, ?)'
+FACE_SQL = ('INSERT INTO faces (person_id, age, gender, gender_confidence, bbox_x1, bbox_y1, bbox_x2, '
+            'bbox_y2, confidence, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)')
+
+def make_batch(num_persons: int, num_faces: int):
+    """生成一个保存周期的数据（与PersistentAnalyzer._save_data_batch的结构一致）"""
+    now = datetime.now()
+    persons = [{
+        'track_id': track_id,
+        'first_seen': now,
+        'last_seen': now,
+        'total_frames': random.randint(1, 500),
+        'faces_detected': random.randint(0, 50),
+        'avg_age': random.uniform(18, 60),
+        'dominant_gender': random.choice(['Male', 'Female']),
+        'gender_confidence': random.random()
+    } for track_id in range(num_persons)]
+    positions = [{
+        'track_id': track_id,
+        'x': random.randint(0, 640),
+        'y': random.randint(0, 480),
+        'timestamp': now,
+        'frame_number': 1
+    } for track_id in range(num_persons)]
+    faces = [{
+        'track_id': random.randrange(num_persons),
+        'age': random.randint(18, 60),
+        'gender': random.choice(['Male', 'Female']),
+        'gender_confidence': random.random(),
+        'bbox': (10, 10, 60, 60),
+        'confidence': random.random(),
+        'timestamp': now
+    } for _ in range(num_faces)]
+    return persons, positions, faces
+
+def person_row(session_id, p):
+    return (session_id, p['track_id'], p['first_seen'], p['last_seen'], p['total_frames'],
+            p['faces_detected'], p['avg_age'], p['dominant_gender'], p['gender_confidence'])
+
+def face_row(person_id, f):
+    return (person_id, f['age'], f['gender'], f['gender_confidence'], *f['bbox'],
+            f['confidence'], f['timestamp'])
+
+class SQLiteStandIn:
+    """SQLite替身：逐行模式模拟原实现（每次调用新建连接并提交）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SQLITE_SCHEMA)
+            self.session_id = conn.execute(
+                'INSERT INTO sessions (session_name, start_time) VALUES (?, ?)', ('bench', datetime.now())
+            ).lastrowid
+
+    def _execute_one(self, sql, params):
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def save_rowwise(self, persons, positions, faces):
+        ids = {}
+        for p in persons:
+            ids[p['track_id']] = self._execute_one(PERSON_SQL, person_row(self.session_id, p))
+        for pos in positions:
+            self._execute_one(POSITION_SQL, (ids[pos['track_id']], pos['x'], pos['y'],
+                                             pos['timestamp'], pos['frame_number']))
+        first_id = next(iter(ids.values()))
+        for f in faces:
+            self._execute_one(FACE_SQL, face_row(first_id, f))
+
+    def save_batch(self, conn, persons, positions, faces):
+        with conn:  # 单个事务
+            cursor = conn.cursor()
+            # SQLite的executemany不返回lastrowid，先取当前最大ID作为本批下界
+            last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM persons').fetchone()[0]
+            cursor.executemany(PERSON_SQL, [person_row(self.session_id, p) for p in persons])
+            track_ids = [p['track_id'] for p in persons]
+            placeholders = ', '.join('?' * len(track_ids))
+            cursor.execute(f'SELECT id, track_id FROM persons WHERE session_id = ? AND id > ? '
+                           f'AND track_id IN ({placeholders})',
+                           (self.session_id, last_id, *track_ids))
+            ids = {track_id: person_id for person_id, track_id in cursor.fetchall()}
+            cursor.executemany(POSITION_SQL, [(ids[p['track_id']], p['x'], p['y'], p['timestamp'],
+                                               p['frame_number']) for p in positions])
+            cursor.executemany(FACE_SQL, [face_row(ids[f['track_id']], f) for f in faces])
+
+def bench_sqlite(rounds: int, num_persons: int, num_faces: int):
+    batches = [make_batch(num_persons, num_faces) for _ in range(rounds)]
+    rows = rounds * (2 * num_persons + num_faces)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        rowwise = SQLiteStandIn(os.path.join(tmp, 'rowwise.db'))
+        start = time.perf_counter()
+        for batch in batches:
+            rowwise.save_rowwise(*batch)
+        results['逐行保存'] = rows / (time.perf_counter() - start)
+
+        batched = SQLiteStandIn(os.path.join(tmp, 'batch.db'))
+        conn = sqlite3.connect(batched.path)
+        start = time.perf_counter()
+        for batch in batches:
+            batched.save_batch(conn, *batch)
+        results['单事务批量'] = rows / (time.perf_counter() - start)
+        conn.close()
+    return results
+
+def bench_mysql(rounds: int, num_persons: int, num_faces: int):
+    from database import DatabaseManager
+
+    db = DatabaseManager()
+    batches = [make_batch(num_persons, num_faces) for _ in range(rounds)]
+    rows = rounds * (2 * num_persons + num_faces)
+    results = {}
+
+    session_id = db.create_session('benchmark_rowwise')
+    start = time.perf_counter()
+    for persons, positions, faces in batches:
+        ids = {p['track_id']: db.save_person(session_id, p) for p in persons}
+        for pos in positions:
+            db.save_position(ids[pos['track_id']], pos['x'], pos['y'], pos['timestamp'], pos['frame_number'])
+        for f in faces:
+            db.save_face(ids[f['track_id']], f)
+    results['逐行保存'] = rows / (time.perf_counter() - start)
+
+    session_id = db.create_session('benchmark_batch')
+    start = time.perf_counter()
+    for persons, positions, faces in batches:
+        db.save_batch(session_id, persons, positions, faces)
+    results['单事务批量'] = rows / (time.perf_counter() - start)
+
+    print(f"连接池: {db.get_pool_statistics()}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='数据库批量写入基准测试')
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--rounds', type=int, default=20, help='保存周期数')
+    parser.add_argument('--persons', type=int, default=50, help='每周期人员数')
+    parser.add_argument('--faces', type=int, default=30, help='每周期人脸数')
+    args = parser.parse_args()
+
+    random.seed(0)
+    bench = bench_sqlite if args.backend == 'sqlite' else bench_mysql
+    results = bench(args.rounds, args.persons, args.faces)
+
+    print(f"后端: {args.backend}, {args.rounds} 个周期 x ({args.persons} 人员 + {args.persons} 位置 + {args.faces} 人脸)")
+    for name, throughput in results.items():
+        print(f"{name:<8}: {throughput:>10.0f} 行/秒")
+    print(f"加速比: {results['单事务批量'] / results['逐行保存']:.1f}x")
+
+if __name__ == "__main__":
+    main()
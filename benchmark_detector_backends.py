@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人员检测后端基准测试
+对比 PyTorch（Ultralytics）、ONNX Runtime 和 OpenVINO 后端的单帧延迟，
+并以PyTorch结果为基准统计各后端检测框的一致性（匹配率和平均IoU）
+
+    python benchmark_detector_backends.py
+    python benchmark_detector_backends.py --images data/frames --threads 4 --backends torch onnxruntime
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+import glob
+import time
+
+import cv2
+import numpy as np
+
+from detector_backends import BACKEND_TORCH, available_backends, create_backend
+
+def load_frames(image_dir: str = None, num_frames: int = 30, width: int = 640, height: int = 480):
+    """从图片目录读取测试帧，没有目录时生成随机帧（随机帧几乎没有检测结果，只适合测延迟）"""
+    frames = []
+    if image_dir:
+        for path in sorted(glob.glob(os.path.join(image_dir, '*')))[:num_frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(cv2.resize(frame, (width, height)))
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(num_frames)]
+    return frames
+
+def box_iou(a, b) -> float:
+    """两个 (x1, y1, x2, y2, ...) 框的IoU"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+def agreement(reference, candidate, iou_threshold: float = 0.5):
+    """
+    贪心匹配两组检测框
+
+    Returns:
+        (匹配数, 基准框数, 候选框数, 匹配框IoU列表, 匹配框置信度差列表)
+    """
+    used = set()
+    ious, conf_diffs = [], []
+    for ref in sorted(reference, key=lambda d: -d[4]):
+        best, best_iou = None, iou_threshold
+        for j, cand in enumerate(candidate):
+            if j in used:
+                continue
+            iou = box_iou(ref, cand)
+            if iou >= best_iou:
+                best, best_iou = j, iou
+        if best is not None:
+            used.add(best)
+            ious.append(best_iou)
+            conf_diffs.append(abs(ref[4] - candidate[best][4]))
+    return len(ious), len(reference), len(candidate), ious, conf_diffs
+
+def run(backend, frames, rounds: int):
+    """逐帧推理，返回 (延迟列表ms, 各帧检测结果)"""
+    latencies, outputs = [], []
+    for r in range(rounds):
+        for frame in frames:
+            start = time.perf_counter()
+            detections = backend.infer([frame])[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            if r == 0:
+                outputs.append(detections)
+    return np.array(latencies), outputs
+
+def main():
+    parser = argparse.ArgumentParser(description='人员检测后端基准测试')
+    parser.add_argument('--model', type=str, default='yolov8n.pt')
+    parser.add_argument('--backends', type=str, nargs='+', default=available_backends())
+    parser.add_argument('--images', type=str, default=None, help='测试图片目录（默认随机帧）')
+    parser.add_argument('--rounds', type=int, default=3, help='每帧重复推理轮数')
+    parser.add_argument('--threads', type=int, default=None, help='推理线程数（默认后端默认值）')
+    parser.add_argument('--imgsz', type=int, default=640)
+    args = parser.parse_args()
+
+    frames = load_frames(args.images)
+    backends = [BACKEND_TORCH] + [name for name in args.backends if name != BACKEND_TORCH]
+
+    results = {}
+    for name in backends:
+        start = time.perf_counter()
+        try:
+            backend = create_backend(name, args.model, imgsz=args.imgsz, threads=args.threads)
+        except Exception as e:
+            print(f"跳过 {name}: {e}")
+            continue
+        load_ms = (time.perf_counter() - start) * 1000
+        latencies, outputs = run(backend, frames, args.rounds)
+        results[name] = (load_ms, latencies, outputs)
+
+    print(f"\n{'后端':<12} | {'加载(ms)':>9} | {'p50(ms)':>8} | {'p90(ms)':>8} | {'FPS':>6} | "
+          f"{'检测数':>6} | {'匹配率':>6} | {'平均IoU':>7} | {'置信度差':>8}")
+    print("-" * 96)
+    reference = results.get(BACKEND_TORCH)
+    for name, (load_ms, latencies, outputs) in results.items():
+        total_matched = total_ref = total_cand = 0
+        ious, conf_diffs = [], []
+        if reference is not None:
+            for ref_dets, cand_dets in zip(reference[2], outputs):
+                matched, n_ref, n_cand, frame_ious, frame_diffs = agreement(ref_dets, cand_dets)
+                total_matched += matched
+                total_ref += n_ref
+                total_cand += n_cand
+                ious.extend(frame_ious)
+                conf_diffs.extend(frame_diffs)
+        # 匹配率：匹配框数 / 两组框数的较大者（漏检和多检都会降低）
+        match_rate = total_matched / max(total_ref, total_cand) if max(total_ref, total_cand) else 1.0
+        print(f"{name:<12} | {load_ms:>9.0f} | {np.percentile(latencies, 50):>8.1f} | "
+              f"{np.percentile(latencies, 90):>8.1f} | {1000 / latencies.mean():>6.1f} | "
+              f"{sum(len(d) for d in outputs):>6} | {match_rate:>6.1%} | "
+              f"{np.mean(ious) if ious else 1.0:>7.3f} | {np.mean(conf_diffs) if conf_diffs else 0.0:>8.3f}")
+
+if __name__ == "__main__":
+    main()
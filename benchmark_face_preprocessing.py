@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人脸预处理基准测试
+对比整帧增强（full_frame）与仅人脸区域增强（face_region）两种流程的
+detect_faces 端到端耗时以及年龄/性别一致性
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+import glob
+import time
+import cv2
+import numpy as np
+
+from face_analyzer import InsightFaceAnalyzer
+
+def load_frames(image_dir: str = None, camera: int = 0, num_frames: int = 30):
+    """从图片目录或摄像头读取测试帧"""
+    frames = []
+    if image_dir:
+        for path in sorted(glob.glob(os.path.join(image_dir, '*'))):
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+        return frames[:num_frames]
+
+    cap = cv2.VideoCapture(camera)
+    if not cap.isOpened():
+        print("❌ 无法打开摄像头")
+        return frames
+    while len(frames) < num_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+def iou(box_a, box_b) -> float:
+    """计算两个边界框的IoU"""
+    x1 = max(box_a[0], box_b[0])
+    y1 = max(box_a[1], box_b[1])
+    x2 = min(box_a[2], box_b[2])
+    y2 = min(box_a[3], box_b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+def run_mode(analyzer: InsightFaceAnalyzer, mode: str, frames, warmup: int = 2):
+    """运行指定预处理模式，返回每帧耗时和人脸结果"""
+    analyzer.preprocess_mode = mode
+    for frame in frames[:warmup]:
+        analyzer.detect_faces(frame)
+
+    latencies = []
+    results = []
+    for frame in frames:
+        start = time.perf_counter()
+        faces = analyzer.detect_faces(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(faces)
+    return np.array(latencies), results
+
+def compare_attributes(old_results, new_results, iou_threshold: float = 0.5):
+    """按IoU匹配两种流程的人脸并比较年龄/性别"""
+    age_diffs = []
+    gender_agree = 0
+    matched = 0
+    total_old = sum(len(faces) for faces in old_results)
+    for old_faces, new_faces in zip(old_results, new_results):
+        used = set()
+        for old_face in old_faces:
+            best_j, best_iou = None, iou_threshold
+            for j, new_face in enumerate(new_faces):
+                if j in used:
+                    continue
+                overlap = iou(old_face.bbox, new_face.bbox)
+                if overlap >= best_iou:
+                    best_j, best_iou = j, overlap
+            if best_j is None:
+                continue
+            used.add(best_j)
+            new_face = new_faces[best_j]
+            matched += 1
+            age_diffs.append(abs(old_face.age - new_face.age))
+            gender_agree += int(old_face.gender == new_face.gender)
+    return total_old, matched, age_diffs, gender_agree
+
+def main():
+    parser = argparse.ArgumentParser(description='人脸预处理基准测试')
+    parser.add_argument('--images', type=str, default=None, help='测试图片目录（默认使用摄像头）')
+    parser.add_argument('--camera', type=int, default=0)
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--detection-scale', type=float, default=1.0, help='face_region模式下的检测缩放比例')
+    args = parser.parse_args()
+
+    frames = load_frames(args.images, args.camera, args.frames)
+    if not frames:
+        print("❌ 没有可用的测试帧")
+        return
+
+    analyzer = InsightFaceAnalyzer(detection_scale=args.detection_scale)
+
+    print(f"🧪 测试帧数: {len(frames)}, 分辨率: {frames[0].shape[1]}x{frames[0].shape[0]}")
+    old_lat, old_results = run_mode(analyzer, InsightFaceAnalyzer.PREPROCESS_FULL_FRAME, frames)
+    new_lat, new_results = run_mode(analyzer, InsightFaceAnalyzer.PREPROCESS_FACE_REGION, frames)
+
+    print(f"\n{'模式':<12} | {'p50(ms)':>8} | {'p90(ms)':>8} | {'平均(ms)':>8}")
+    print("-" * 46)
+    for name, lat in (('full_frame', old_lat), ('face_region', new_lat)):
+        print(f"{name:<12} | {np.percentile(lat, 50):>8.1f} | {np.percentile(lat, 90):>8.1f} | {lat.mean():>8.1f}")
+    print(f"加速比(平均): {old_lat.mean() / new_lat.mean():.1f}x")
+
+    total_old, matched, age_diffs, gender_agree = compare_attributes(old_results, new_results)
+    print(f"\n人脸匹配: {matched}/{total_old}")
+    if age_diffs:
+        age_diffs = np.array(age_diffs)
+        print(f"年龄差异: 平均 {age_diffs.mean():.2f} 岁, 中位数 {np.median(age_diffs):.1f} 岁, "
+              f"≤3岁比例 {np.mean(age_diffs <= 3):.1%}")
+        print(f"性别一致率: {gender_agree / matched:.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热力图性能基准测试
+对比原逐像素高斯叠加+整图衰减与预计算核切片叠加+惰性衰减的单帧耗时
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+import math
+import time
+import numpy as np
+
+from heatmap import HeatmapAccumulator
+
+class LegacyHeatmap:
+    """原实现：每帧整图衰减 + Python双重循环叠加"""
+
+    def __init__(self, width: int, height: int, decay: float = 0.995):
+        self.width = width
+        self.height = height
+        self.decay = decay
+        self.heatmap = np.zeros((height, width), dtype=np.float32)
+
+    def update(self, points, radius: int = 20):
+        self.heatmap *= self.decay
+        for x, y in points:
+            y_min = max(0, y - radius)
+            y_max = min(self.height, y + radius + 1)
+            x_min = max(0, x - radius)
+            x_max = min(self.width, x + radius + 1)
+            for py in range(y_min, y_max):
+                for px in range(x_min, x_max):
+                    distance = math.sqrt((px - x) ** 2 + (py - y) ** 2)
+                    if distance <= radius:
+                        heat = math.exp(-(distance ** 2) / (2 * (radius / 3) ** 2))
+                        self.heatmap[py, px] += heat
+
+def random_tracks(rng, num_tracks: int, width: int, height: int):
+    """生成随机轨迹中心点（包含靠近边界的点）"""
+    xs = rng.integers(0, width, size=num_tracks)
+    ys = rng.integers(0, height, size=num_tracks)
+    return list(zip(xs.tolist(), ys.tolist()))
+
+def bench(update_fn, frames):
+    """返回单帧平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for points in frames:
+        update_fn(points)
+    return (time.perf_counter() - start) / len(frames) * 1000
+
+def check_equivalence(width: int, height: int, num_frames: int = 30):
+    """检查两种实现结果一致"""
+    rng = np.random.default_rng(0)
+    legacy = LegacyHeatmap(width, height)
+    fast = HeatmapAccumulator(width, height)
+    for _ in range(num_frames):
+        points = random_tracks(rng, 5, width, height)
+        legacy.update(points)
+        fast.step()
+        fast.add_points(points)
+    max_diff = float(np.max(np.abs(legacy.heatmap - fast.get())))
+    # 绘制用的归一化结果（原实现：heatmap / max * 255）
+    legacy_normalized = (legacy.heatmap / legacy.heatmap.max() * 255).astype(np.uint8)
+    normalized_diff = int(np.max(np.abs(legacy_normalized.astype(np.int16) - fast.normalized())))
+    print(f"一致性检查: 最大绝对误差 = {max_diff:.2e}, 归一化最大差异 = {normalized_diff}")
+    return max_diff
+
+def main():
+    parser = argparse.ArgumentParser(description='热力图性能基准测试')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    parser.add_argument('--frames', type=int, default=50, help='每组测试帧数')
+    parser.add_argument('--tracks', type=int, nargs='+', default=[1, 5, 10, 20, 40])
+    args = parser.parse_args()
+
+    check_equivalence(args.width, args.height)
+
+    print(f"\n分辨率: {args.width}x{args.height}, 每组 {args.frames} 帧")
+    print(f"{'轨迹数':>6} | {'原实现(ms/帧)':>14} | {'新实现(ms/帧)':>14} | {'加速比':>8}")
+    print("-" * 52)
+
+    for num_tracks in args.tracks:
+        rng = np.random.default_rng(num_tracks)
+        frames = [random_tracks(rng, num_tracks, args.width, args.height) for _ in range(args.frames)]
+
+        legacy = LegacyHeatmap(args.width, args.height)
+        legacy_ms = bench(legacy.update, frames)
+
+        fast = HeatmapAccumulator(args.width, args.height)
+
+        def fast_update(points):
+            fast.step()
+            fast.add_points(points)
+
+        fast_ms = bench(fast_update, frames)
+        print(f"{num_tracks:>6} | {legacy_ms:>14.3f} | {fast_ms:>14.3f} | {legacy_ms / fast_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
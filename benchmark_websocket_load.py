@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WebSocket并发负载测试
+N个会话同时通过WebSocket发送视频帧，统计帧往返延迟p50/p99，
+同时探测REST接口延迟以观察事件循环是否被帧分析阻塞
+
+对比方法：
+    python run_web_app.py --no-ssl --executor inline   # 改造前：在事件循环中分析
+    python run_web_app.py --no-ssl --executor thread   # 改造后：线程池分析
+    python benchmark_websocket_load.py --sessions 1 2 4 8
+    python benchmark_websocket_load.py --sessions 1 2 4 8 --binary   # 二进制帧协议
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+import urllib.request
+
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import cv2
+import numpy as np
+import websockets
+
+from frame_protocol import encode_frame, MSG_VIDEO_FRAME, PROTOCOL_BINARY
+
+def http_post(url: str, payload: dict = None) -> dict:
+    """发送POST请求"""
+    data = json.dumps(payload or {}).encode('utf-8')
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=120) as resp:
+        return json.loads(resp.read().decode('utf-8'))
+
+def load_frame_data(image_path: str = None, width: int = 640, height: int = 480) -> str:
+    """加载测试帧并编码为data URL"""
+    frame = cv2.imread(image_path) if image_path else None
+    if frame is None:
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    return "data:image/jpeg;base64," + base64.b64encode(buffer).decode('utf-8')
+
+async def run_client(base_url: str, ws_url: str, index: int, frame_data: str,
+                     num_frames: int, latencies: list, binary: bool = False):
+    """单个会话：创建会话、开始分析、串行发送帧并等待结果"""
+    loop = asyncio.get_running_loop()
+    session = await loop.run_in_executor(
+        None, http_post, f"{base_url}/api/create-session", {'username': f'load_{index}'})
+    user_id = session['user_id']
+    await loop.run_in_executor(None, http_post, f"{base_url}/api/start/{user_id}")
+
+    async with websockets.connect(f"{ws_url}/ws/{user_id}", max_size=None) as websocket:
+        if binary:
+            # 协商二进制帧协议，结果以JPEG二进制消息 + frame_stats文本消息返回
+            await websocket.send(json.dumps({'type': 'connection', 'protocols': [PROTOCOL_BINARY]}))
+            json.loads(await websocket.recv())
+            jpeg = base64.b64decode(frame_data.split(',', 1)[1])
+            result_type = 'frame_stats'
+        else:
+            result_type = 'frame_result'
+
+        for frame_id in range(num_frames):
+            if binary:
+                message = encode_frame(MSG_VIDEO_FRAME, jpeg, frame_id, int(time.time() * 1000))
+            else:
+                message = json.dumps({'type': 'video_frame', 'frame': frame_data})
+            start = time.perf_counter()
+            await websocket.send(message)
+            while True:
+                response = await websocket.recv()
+                if isinstance(response, bytes):
+                    continue
+                if json.loads(response).get('type') == result_type:
+                    break
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await loop.run_in_executor(None, http_post, f"{base_url}/api/stop/{user_id}")
+
+async def run_probe(base_url: str, stop_event: asyncio.Event, latencies: list, interval: float = 0.1):
+    """周期性请求轻量REST接口，测量事件循环响应延迟"""
+    loop = asyncio.get_running_loop()
+
+    def fetch():
+        with urllib.request.urlopen(f"{base_url}/api/users", timeout=120) as resp:
+            resp.read()
+
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        await loop.run_in_executor(None, fetch)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+
+async def run_round(base_url: str, ws_url: str, num_sessions: int, frame_data: str,
+                    num_frames: int, binary: bool = False):
+    """运行一轮N会话并发测试"""
+    frame_latencies, probe_latencies = [], []
+    stop_event = asyncio.Event()
+    probe = asyncio.create_task(run_probe(base_url, stop_event, probe_latencies))
+    await asyncio.gather(*[
+        run_client(base_url, ws_url, i, frame_data, num_frames, frame_latencies, binary)
+        for i in range(num_sessions)
+    ])
+    stop_event.set()
+    await probe
+    return np.array(frame_latencies), np.array(probe_latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description='WebSocket并发负载测试')
+    parser.add_argument('--url', type=str, default='http://localhost:8000', help='Web应用地址')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8], help='并发会话数')
+    parser.add_argument('--frames', type=int, default=30, help='每个会话发送的帧数')
+    parser.add_argument('--image', type=str, default=None, help='测试图片（默认随机噪声帧）')
+    parser.add_argument('--binary', action='store_true', help='使用二进制帧协议（默认base64文本协议）')
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip('/')
+    ws_url = base_url.replace('https://', 'wss://').replace('http://', 'ws://')
+    frame_data = load_frame_data(args.image)
+
+    print(f"{'会话数':>6} | {'帧p50(ms)':>10} | {'帧p99(ms)':>10} | {'REST p50(ms)':>12} | {'REST p99(ms)':>12}")
+    print("-" * 62)
+    for num_sessions in args.sessions:
+        frame_lat, probe_lat = asyncio.run(
+            run_round(base_url, ws_url, num_sessions, frame_data, args.frames, args.binary))
+        print(f"{num_sessions:>6} | {np.percentile(frame_lat, 50):>10.1f} | {np.percentile(frame_lat, 99):>10.1f} | "
+              f"{np.percentile(probe_lat, 50):>12.1f} | {np.percentile(probe_lat, 99):>12.1f}")
+
+if __name__ == "__main__":
+    main()
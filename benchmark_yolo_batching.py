@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+YOLO跨会话批处理基准测试
+N个会话线程同时调用 PersonDetector.detect_persons，对比逐帧推理（共享模型加锁串行）
+与跨会话动态批处理的总吞吐量、单帧延迟以及批大小/排队等待统计
+
+    python benchmark_yolo_batching.py --sessions 1 2 4 8
+    python benchmark_yolo_batching.py --images data/frames --max-batch 8 --max-wait-ms 5
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import argparse
+import glob
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from detector import PersonDetector
+from model_registry import get_model_registry
+
+def load_frames(image_dir: str = None, num_frames: int = 30, width: int = 640, height: int = 480):
+    """从图片目录读取测试帧，没有目录时生成随机帧"""
+    frames = []
+    if image_dir:
+        for path in sorted(glob.glob(os.path.join(image_dir, '*')))[:num_frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(cv2.resize(frame, (width, height)))
+    if not frames:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(num_frames)]
+    return frames
+
+def run(num_sessions: int, batched: bool, frames, frames_per_session: int):
+    """每个会话一个线程，返回 (总帧率, 单帧延迟列表)"""
+    detectors = [PersonDetector(shared=True, batched=batched) for _ in range(num_sessions)]
+    for detector in detectors:
+        detector.detect_persons(frames[0])  # 预热
+
+    latencies = [[] for _ in range(num_sessions)]
+
+    def session(index: int):
+        for i in range(frames_per_session):
+            start = time.perf_counter()
+            detectors[index].detect_persons(frames[(index + i) % len(frames)])
+            latencies[index].append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(num_sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return num_sessions * frames_per_session / elapsed, np.concatenate([np.array(l) for l in latencies])
+
+def main():
+    parser = argparse.ArgumentParser(description='YOLO跨会话批处理基准测试')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--frames', type=int, default=50, help='每个会话的帧数')
+    parser.add_argument('--images', type=str, default=None, help='测试图片目录（默认随机帧）')
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    frames = load_frames(args.images)
+    registry = get_model_registry()
+    batcher = registry.get_yolo_batcher(max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+
+    print(f"{'会话数':>6} | {'模式':<8} | {'总FPS':>7} | {'p50(ms)':>8} | {'p99(ms)':>8} | {'平均批':>6} | {'平均排队(ms)':>12}")
+    print("-" * 76)
+    for num_sessions in args.sessions:
+        for batched in (False, True):
+            before = batcher.get_statistics()
+            fps, latencies = run(num_sessions, batched, frames, args.frames)
+            after = batcher.get_statistics()
+            batch_info, wait_info = '-', '-'
+            if batched:
+                frames_done = after['frames'] - before['frames']
+                batches_done = max(after['batches'] - before['batches'], 1)
+                batch_info = f"{frames_done / batches_done:.1f}"
+                wait_info = f"{after['avg_queue_wait_ms']:.1f}"
+            print(f"{num_sessions:>6} | {'batched' if batched else 'single':<8} | {fps:>7.1f} | "
+                  f"{np.percentile(latencies, 50):>8.1f} | {np.percentile(latencies, 99):>8.1f} | "
+                  f"{batch_info:>6} | {wait_info:>12}")
+
+    print(f"\n批大小分布: {batcher.get_statistics()['batch_size_histogram']}")
+    batcher.close()
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,17 @@ def main():
     parser.add_argument('--host', type=str, default='localhost', help='服务器主机地址')
     parser.add_argument('--port', type=int, default=8000, help='服务器端口号')
     parser.add_argument('--no-ssl', action='store_true', help='禁用SSL（使用HTTP而不是HTTPS）')
+    parser.add_argument('--preload-models', action='store_true', help='启动时预加载共享模型')
+    parser.add_argument('--executor', type=str, default='thread', choices=['thread', 'process', 'inline'],
+                        help='帧处理执行模式（inline为在事件循环中直接执行）')
+    parser.add_argument('--frame-workers', type=int, default=4, help='帧处理工作线程数/工作进程数')
+    parser.add_argument('--pipeline-depth', type=int, default=0,
+                        help='会话流水线同时在途的最大帧数（0为逐帧顺序处理）')
+    parser.add_argument('--detector-backend', type=str, default='torch',
+                        choices=['torch', 'onnxruntime', 'openvino'],
+                        help='人员检测推理后端（非torch后端首次使用时自动导出模型到models/）')
+    parser.add_argument('--detector-threads', type=int, default=0,
+                        help='检测推理线程数（0为后端默认值）')
     
     # 解析命令行参数
     args = parser.parse_args()
@@ -32,6 +43,15 @@ def main():
     print(f"主机: {args.host}")
     print(f"端口: {args.port}")
     print(f"SSL: {'禁用' if args.no_ssl else '启用'}")
+    print(f"帧处理: {args.executor} x {args.frame_workers}")
+    if args.pipeline_depth > 0:
+        print(f"流水线: 最多 {args.pipeline_depth} 帧在途")
+    print(f"检测后端: {args.detector_backend}（线程数: {args.detector_threads or '默认'}）")
+    
+    # 通过环境变量传递给模型注册表（进程池模式的工作进程同样生效）
+    os.environ['DETECTOR_BACKEND'] = args.detector_backend
+    if args.detector_threads > 0:
+        os.environ['DETECTOR_THREADS'] = str(args.detector_threads)
     
     try:
         # 导入并运行Web应用
@@ -42,7 +62,9 @@ def main():
         db_config = DatabaseConfig.get_pymysql_config()
         print(f"数据库配置: {db_config['host']}:{db_config['port']}/{db_config['database']}")
         
-        web_app = WebApp(db_config=db_config)
+        web_app = WebApp(db_config=db_config, preload_models=args.preload_models,
+                         executor_mode=args.executor, frame_workers=args.frame_workers,
+                         pipeline_depth=args.pipeline_depth)
         web_app.run(host=args.host, port=args.port, use_ssl=not args.no_ssl)
         
     except Exception as e:
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人脸-人员关联模块
+用NumPy一次性计算人脸与人员框的重叠矩阵，并用匈牙利算法求最优一对一分配，
+替代逐对循环的贪心匹配（贪心匹配可能把两张人脸分给同一个人）
+"""
+
+import numpy as np
+from typing import Dict, List, Sequence, Tuple
+import logging
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 人脸面积至少有该比例落在人员框内才可关联
+MIN_FACE_OVERLAP = 0.3
+
+# 同等重叠时优先人脸中心更靠近人员框顶部中点的人员（按人员框高度归一化后的权重）
+HEAD_DISTANCE_WEIGHT = 1e-3
+
+def boxes_to_array(boxes: Sequence[Sequence[float]]) -> np.ndarray:
+    """边界框列表 -> (N, 4) float32 数组"""
+    if len(boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+def face_overlap_matrix(face_boxes: np.ndarray, person_boxes: np.ndarray) -> np.ndarray:
+    """
+    人脸落在人员框内的面积比例矩阵
+
+    Args:
+        face_boxes: (F, 4) 人脸框 x1, y1, x2, y2
+        person_boxes: (P, 4) 人员框 x1, y1, x2, y2
+
+    Returns:
+        (F, P) 交集面积 / 人脸面积
+    """
+    fx1, fy1, fx2, fy2 = (face_boxes[:, i:i + 1] for i in range(4))
+    px1, py1, px2, py2 = (person_boxes[:, i] for i in range(4))
+
+    inter_w = np.clip(np.minimum(fx2, px2) - np.maximum(fx1, px1), 0, None)
+    inter_h = np.clip(np.minimum(fy2, py2) - np.maximum(fy1, py1), 0, None)
+    face_area = (fx2 - fx1) * (fy2 - fy1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overlap = np.where(face_area > 0, inter_w * inter_h / face_area, 0.0)
+    return overlap.astype(np.float32)
+
+def head_distance_matrix(face_boxes: np.ndarray, person_boxes: np.ndarray) -> np.ndarray:
+    """人脸中心到人员框顶部中点的距离（按人员框高度归一化），(F, P)"""
+    face_cx = (face_boxes[:, 0:1] + face_boxes[:, 2:3]) / 2
+    face_cy = (face_boxes[:, 1:2] + face_boxes[:, 3:4]) / 2
+    head_x = (person_boxes[:, 0] + person_boxes[:, 2]) / 2
+    head_y = person_boxes[:, 1]
+    height = np.maximum(person_boxes[:, 3] - person_boxes[:, 1], 1.0)
+    return np.hypot(face_cx - head_x, face_cy - head_y) / height
+
+def hungarian(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    最小代价分配（无SciPy时使用的O(n^2 m)实现，接口与 linear_sum_assignment 相同）
+
+    Args:
+        cost: (n, m) 代价矩阵
+
+    Returns:
+        (行下标, 列下标)，按行下标升序
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    # 势函数法（行数 <= 列数），下标从1开始，0为虚拟列
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.intp)  # 列 -> 行
+    way = np.zeros(m + 1, dtype=np.intp)
+
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    cols = np.nonzero(match[1:])[0]
+    rows = match[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order].astype(np.intp), cols[order].astype(np.intp)
+
+def solve_assignment(score: np.ndarray, min_score: float) -> List[Tuple[int, int]]:
+    """
+    最大化总得分的一对一分配，只保留得分高于min_score的配对
+
+    Args:
+        score: (F, P) 得分矩阵
+        min_score: 最低得分
+
+    Returns:
+        [(行下标, 列下标), ...]
+    """
+    if score.size == 0:
+        return []
+    valid = score > min_score
+    if not valid.any():
+        return []
+
+    # 不可行配对不产生收益，分配后再过滤
+    cost = np.where(valid, -score, 0.0)
+    if SCIPY_AVAILABLE:
+        rows, cols = linear_sum_assignment(cost)
+    else:
+        rows, cols = hungarian(cost)
+    return [(int(r), int(c)) for r, c in zip(rows, cols) if valid[r, c]]
+
+def associate_faces(face_boxes: Sequence[Sequence[float]], person_boxes: Sequence[Sequence[float]],
+                    min_overlap: float = MIN_FACE_OVERLAP) -> Dict[int, int]:
+    """
+    将人脸关联到人员（每个人员最多一张人脸）
+
+    Args:
+        face_boxes: 人脸框列表
+        person_boxes: 人员框列表
+        min_overlap: 人脸落在人员框内的最低面积比例
+
+    Returns:
+        人脸下标 -> 人员下标
+    """
+    faces = boxes_to_array(face_boxes)
+    persons = boxes_to_array(person_boxes)
+    if len(faces) == 0 or len(persons) == 0:
+        return {}
+
+    overlap = face_overlap_matrix(faces, persons)
+    # 重叠相同（如人脸同时完全落在两个重叠的人员框内）时按到头部位置的距离区分
+    score = np.where(overlap > min_overlap,
+                     overlap - HEAD_DISTANCE_WEIGHT * head_distance_matrix(faces, persons),
+                     0.0)
+    return dict(solve_assignment(score, min_score=0.0))
+
+def assign_faces_to_tracks(faces: List, tracks: List) -> Dict[int, int]:
+    """
+    为人脸设置 track_id 并返回 track_id -> 人脸下标
+
+    Args:
+        faces: FaceInfo 列表（写入 face.track_id，未关联为None）
+        tracks: 带 track_id 和 bbox 的轨迹列表
+    """
+    pairs = associate_faces([face.bbox for face in faces], [track.bbox for track in tracks])
+    assignment = {}
+    for face_index, face in enumerate(faces):
+        track_index = pairs.get(face_index)
+        face.track_id = tracks[track_index].track_id if track_index is not None else None
+        if face.track_id is not None:
+            assignment[face.track_id] = face_index
+    return assignment
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨会话动态批处理推理模块
+收集各会话提交的帧（最多等待几毫秒或凑满最大批大小），合并为一次批量推理，
+再把结果分发回各调用方的Future；按会话轮询取帧保证公平，并统计批大小和排队等待时间
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+import numpy as np
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class _Request:
+    __slots__ = ('session', 'frame', 'future', 'enqueued_at')
+
+    def __init__(self, session: Hashable, frame: np.ndarray):
+        self.session = session
+        self.frame = frame
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+class BatchInferenceServer:
+    """进程内动态批处理推理服务"""
+
+    def __init__(self, infer: Callable[[List[np.ndarray]], List[Any]], max_batch: int = 8,
+                 max_wait_ms: float = 5.0, active_window: float = 1.0,
+                 name: str = 'batch-inference'):
+        """
+        初始化批处理推理服务
+
+        Args:
+            infer: 批量推理函数（帧列表 -> 与之一一对应的结果列表）
+            max_batch: 单批最大帧数
+            max_wait_ms: 收到第一帧后最多等待其他会话的时间（毫秒）
+            active_window: 最近该时间（秒）内提交过帧的会话视为活跃；
+                           活跃会话都已提交时不再等待，单会话使用时没有额外延迟
+            name: 工作线程名称
+        """
+        self.infer = infer
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.active_window = active_window
+
+        # 会话 -> 待处理请求队列；OrderedDict的顺序即轮询顺序
+        self._queues: 'OrderedDict[Hashable, deque]' = OrderedDict()
+        self._last_seen: Dict[Hashable, float] = {}
+        self._pending = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+
+        # 统计信息
+        self.batches = 0
+        self.frames = 0
+        self.failed_batches = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.total_infer_time = 0.0
+        self.recent_waits = deque(maxlen=500)
+        self.session_frames: Dict[Hashable, int] = {}
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, session: Hashable, frame: np.ndarray) -> Future:
+        """
+        提交一帧（不等待推理）
+
+        Args:
+            session: 会话标识（用于公平调度和统计）
+            frame: 输入图像
+
+        Returns:
+            Future，结果为该帧的推理结果
+        """
+        request = _Request(session, frame)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("批处理推理服务已关闭")
+            queue = self._queues.get(session)
+            if queue is None:
+                queue = deque()
+                self._queues[session] = queue
+            queue.append(request)
+            self._last_seen[session] = request.enqueued_at
+            self._pending += 1
+            self._cond.notify_all()
+        return request.future
+
+    def __call__(self, session: Hashable, frame: np.ndarray, timeout: float = None) -> Any:
+        """提交一帧并等待结果"""
+        return self.submit(session, frame).result(timeout)
+
+    def _active_sessions(self, now: float) -> int:
+        for session in [s for s, t in self._last_seen.items() if now - t > self.active_window]:
+            del self._last_seen[session]
+            if not self._queues.get(session):
+                self._queues.pop(session, None)
+        return len(self._last_seen)
+
+    def _sessions_waiting(self) -> int:
+        return sum(1 for queue in self._queues.values() if queue)
+
+    def _take_batch(self) -> Optional[List[_Request]]:
+        """等待并按会话轮询取出一批请求（已关闭且队列为空时返回None）"""
+        with self._cond:
+            while self._pending == 0 and not self._closed:
+                self._cond.wait()
+            if self._pending == 0:
+                return None
+
+            # 等待其他会话：凑满批次、所有活跃会话都已提交或超时即开始推理。
+            # 等待从“首帧入队”和“工作线程空闲”中较晚者算起，否则上一批推理期间入队的帧
+            # 会立即单独推理，而刚拿到结果的会话随后又凑成另一批，两组会话从此错开
+            first_at = min(queue[0].enqueued_at for queue in self._queues.values() if queue)
+            deadline = max(first_at, time.monotonic()) + self.max_wait
+            while not self._closed and self._pending < self.max_batch:
+                now = time.monotonic()
+                if now >= deadline or self._sessions_waiting() >= self._active_sessions(now):
+                    break
+                self._cond.wait(deadline - now)
+
+            # 轮询：每轮每个会话最多取一帧，先取到的会话移到队尾
+            batch = []
+            while len(batch) < self.max_batch and self._pending > 0:
+                for session in list(self._queues.keys()):
+                    queue = self._queues[session]
+                    if not queue:
+                        continue
+                    batch.append(queue.popleft())
+                    self._pending -= 1
+                    self._queues.move_to_end(session)
+                    if len(batch) >= self.max_batch:
+                        break
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+
+            start = time.monotonic()
+            try:
+                results = self.infer([request.frame for request in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(f"推理结果数量不匹配: {len(results)} != {len(batch)}")
+            except Exception as e:
+                logger.error(f"批量推理失败 (批大小 {len(batch)}): {e}")
+                with self._cond:
+                    self.failed_batches += 1
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            elapsed = time.monotonic() - start
+
+            with self._cond:
+                self.batches += 1
+                self.frames += len(batch)
+                self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+                self.total_infer_time += elapsed
+                for request in batch:
+                    wait = start - request.enqueued_at
+                    self.total_wait += wait
+                    self.max_wait_seen = max(self.max_wait_seen, wait)
+                    self.recent_waits.append(wait)
+                    self.session_frames[request.session] = self.session_frames.get(request.session, 0) + 1
+
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+    def close(self, timeout: float = 5.0):
+        """处理完已提交的帧后停止工作线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def get_statistics(self) -> Dict:
+        """批大小、排队等待和推理耗时统计"""
+        with self._cond:
+            batches = max(self.batches, 1)
+            frames = max(self.frames, 1)
+            waits = np.array(self.recent_waits) * 1000 if self.recent_waits else np.zeros(1)
+            return {
+                'batches': self.batches,
+                'frames': self.frames,
+                'failed_batches': self.failed_batches,
+                'avg_batch_size': self.frames / batches,
+                'batch_size_histogram': dict(sorted(self.batch_sizes.items())),
+                'avg_queue_wait_ms': self.total_wait / frames * 1000,
+                'p90_queue_wait_ms': float(np.percentile(waits, 90)),
+                'max_queue_wait_ms': self.max_wait_seen * 1000,
+                'avg_batch_infer_ms': self.total_infer_time / batches * 1000,
+                'pending': self._pending,
+                'active_sessions': len(self._last_seen),
+                'sessions': len(self.session_frames)
+            }
@@ -16,6 +16,7 @@ import math
 
 from integrated_analyzer import PersonProfile
 from tracker import PersonTrack
+from heatmap import HeatmapAccumulator
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -64,13 +65,15 @@ class PersonBehavior:
 class BehaviorAnalyzer:
     """消费行为分析器"""
     
-    def __init__(self, frame_width: int = 640, frame_height: int = 480):
+    def __init__(self, frame_width: int = 640, frame_height: int = 480,
+                 heatmap_time_scaled: bool = False):
         """
         初始化行为分析器
         
         Args:
             frame_width: 视频帧宽度
             frame_height: 视频帧高度
+            heatmap_time_scaled: 热力图是否按实际经过时间衰减（默认按帧衰减）
         """
         self.frame_width = frame_width
         self.frame_height = frame_height
@@ -83,14 +86,19 @@ class BehaviorAnalyzer:
         self.person_last_positions: Dict[int, Tuple[Tuple[int, int], datetime]] = {}
         self.person_zone_states: Dict[int, Dict[str, bool]] = {}  # 人员在各区域的状态
         
-        # 热力图数据
-        self.heatmap = np.zeros((frame_height, frame_width), dtype=np.float32)
+        # 热力图数据（惰性衰减，避免每帧整图乘法）
         self.heatmap_decay = 0.995  # 热力图衰减系数
+        self.heatmap_accumulator = HeatmapAccumulator(
+            frame_width, frame_height,
+            decay=self.heatmap_decay,
+            time_scaled=heatmap_time_scaled
+        )
         
         # 行为分析参数
         self.min_stop_duration = 2.0  # 最小停留时间（秒）
         self.min_movement_distance = 10  # 最小移动距离（像素）
         self.speed_threshold = 5.0  # 速度阈值（像素/秒）
+        self.max_dwell_step = 2.0  # 两次更新间计入区域停留的最长时间（秒），更长的间隔视为轨迹中断
         
         # 默认区域设置
         self._setup_default_zones()
@@ -162,11 +170,15 @@ class BehaviorAnalyzer:
             
             behavior = self.person_behaviors[person_id]
             
+            # 距该人员上次更新的实际时间（跳帧或预测帧时不按固定帧间隔计算）
+            last = self.person_last_positions.get(person_id)
+            elapsed = (current_time - last[1]).total_seconds() if last is not None else 0.0
+            
             # 分析移动和停留
             self._analyze_movement(person_id, position, current_time)
             
             # 分析区域访问
-            self._analyze_zone_visits(person_id, position, current_time)
+            self._analyze_zone_visits(person_id, position, current_time, elapsed)
             
             # 更新总停留时间
             if person_id in profiles:
@@ -176,31 +188,32 @@ class BehaviorAnalyzer:
         # 计算行为特征
         self._calculate_behavior_features()
     
+    @property
+    def heatmap(self) -> np.ndarray:
+        """当前热力图（已应用衰减）"""
+        return self.heatmap_accumulator.get()
+    
+    @heatmap.setter
+    def heatmap(self, value: np.ndarray):
+        self.heatmap_accumulator.set(value)
+    
     def _update_heatmap(self, tracks: List[PersonTrack]):
         """更新热力图"""
-        # 衰减现有热力图
-        self.heatmap *= self.heatmap_decay
+        # 衰减现有热力图（仅更新缩放因子）
+        self.heatmap_accumulator.decay = self.heatmap_decay
+        self.heatmap_accumulator.step()
         
         # 添加当前位置的热度
+        accumulator = self.heatmap_accumulator
         for track in tracks:
             x, y = track.center
-            if 0 <= x < self.frame_width and 0 <= y < self.frame_height:
+            if 0 <= x < accumulator.width and 0 <= y < accumulator.height:
                 # 使用高斯分布添加热度
                 self._add_gaussian_heat(x, y, intensity=1.0, radius=20)
     
     def _add_gaussian_heat(self, x: int, y: int, intensity: float = 1.0, radius: int = 20):
-        """在热力图上添加高斯热度"""
-        y_min = max(0, y - radius)
-        y_max = min(self.frame_height, y + radius + 1)
-        x_min = max(0, x - radius)
-        x_max = min(self.frame_width, x + radius + 1)
-        
-        for py in range(y_min, y_max):
-            for px in range(x_min, x_max):
-                distance = math.sqrt((px - x) ** 2 + (py - y) ** 2)
-                if distance <= radius:
-                    heat = intensity * math.exp(-(distance ** 2) / (2 * (radius / 3) ** 2))
-                    self.heatmap[py, px] += heat
+        """在热力图上添加高斯热度（预计算高斯核切片叠加）"""
+        self.heatmap_accumulator.add_point(x, y, intensity=intensity, radius=radius)
     
     def _analyze_movement(self, person_id: int, position: Tuple[int, int], current_time: datetime):
         """分析人员移动行为"""
@@ -241,8 +254,14 @@ class BehaviorAnalyzer:
         # 更新最后位置
         self.person_last_positions[person_id] = (position, current_time)
     
-    def _analyze_zone_visits(self, person_id: int, position: Tuple[int, int], current_time: datetime):
-        """分析区域访问行为"""
+    def _analyze_zone_visits(self, person_id: int, position: Tuple[int, int], current_time: datetime,
+                             elapsed: float = 0.0):
+        """
+        分析区域访问行为
+        
+        Args:
+            elapsed: 距该人员上次更新的时间（秒），在区域内时累加为停留时间
+        """
         behavior = self.person_behaviors[person_id]
         zone_states = self.person_zone_states[person_id]
         
@@ -275,8 +294,10 @@ class BehaviorAnalyzer:
                 behavior.events.append(event)
             
             elif is_in_zone:
-                # 在区域内停留
-                behavior.zone_dwell_times[zone.name] = behavior.zone_dwell_times.get(zone.name, 0) + 0.1  # 假设每次更新0.1秒
+                # 在区域内停留（按实际经过时间累加）
+                behavior.zone_dwell_times[zone.name] = (
+                    behavior.zone_dwell_times.get(zone.name, 0) + min(max(elapsed, 0.0), self.max_dwell_step)
+                )
             
             zone_states[zone.name] = is_in_zone
     
@@ -392,15 +413,13 @@ class BehaviorAnalyzer:
         frame_height, frame_width = frame.shape[:2]
         
         # 如果热力图尺寸与帧尺寸不匹配，调整热力图尺寸
-        if self.heatmap.shape != (frame_height, frame_width):
+        accumulator = self.heatmap_accumulator
+        if (accumulator.height, accumulator.width) != (frame_height, frame_width):
             # 重新调整热力图尺寸
             self.heatmap = cv2.resize(self.heatmap, (frame_width, frame_height))
         
-        # 归一化热力图
-        if np.max(self.heatmap) > 0:
-            normalized_heatmap = (self.heatmap / np.max(self.heatmap) * 255).astype(np.uint8)
-        else:
-            normalized_heatmap = self.heatmap.astype(np.uint8)
+        # 归一化热力图（直接使用存储数组，不复制衰减后的真实值）
+        normalized_heatmap = accumulator.normalized()
         
         # 应用颜色映射
         heatmap_colored = cv2.applyColorMap(normalized_heatmap, cv2.COLORMAP_JET)
@@ -436,6 +455,24 @@ class BehaviorAnalyzer:
         
         return result_frame
     
+    def get_heatmap_thumbnail(self, width: int = 64, height: int = 48) -> np.ndarray:
+        """
+        获取降采样并归一化的热力图（供客户端叠加渲染）
+        
+        Args:
+            width: 输出宽度
+            height: 输出高度
+            
+        Returns:
+            (height, width) 的uint8热力图，0-255
+        """
+        # 缩放因子在归一化中抵消，直接缩小存储数组
+        thumbnail = cv2.resize(self.heatmap_accumulator.stored(), (width, height), interpolation=cv2.INTER_AREA)
+        thumbnail_max = float(thumbnail.max())
+        if thumbnail_max <= 0:
+            return np.zeros((height, width), dtype=np.uint8)
+        return (thumbnail / thumbnail_max * 255).astype(np.uint8)
+    
     def draw_behavior_info(self, frame: np.ndarray, tracks: List[PersonTrack]) -> np.ndarray:
         """绘制行为信息"""
         result_frame = frame.copy()
@@ -7,17 +7,21 @@
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Dict, Optional
+from typing import Any, Callable, List, Tuple, Dict, Optional
 import logging
+import threading
 from datetime import datetime
 import json
 import os
+import base64
 
 from persistent_analyzer import PersistentAnalyzer
 from behavior_analyzer import BehaviorAnalyzer, Zone
 from tracker import PersonTrack
 from face_analyzer import FaceInfo
 from integrated_analyzer import PersonProfile
+from frame_snapshot import FrameSnapshot, SnapshotCounters
+from pipeline_runner import PipelineRunner
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -26,10 +30,18 @@ logger = logging.getLogger(__name__)
 class CompleteAnalyzer:
     """完整的AI人流分析系统"""
     
+    # 结果输出模式
+    RENDER_FRAME = 'frame'      # 服务端绘制并返回标注后的图像
+    RENDER_OVERLAY = 'overlay'  # 只返回叠加层描述，由客户端绘制
+    
+    # 叠加层热力图降采样尺寸
+    OVERLAY_HEATMAP_SIZE = (64, 48)
+    
     def __init__(self, session_name: str = None, use_insightface: bool = True,
                  db_config: Dict = None, save_interval: int = 30,
                  record_interval: int = 300, auto_record: bool = True,
-                 frame_width: int = 640, frame_height: int = 480):
+                 frame_width: int = 640, frame_height: int = 480,
+                 shared_models: bool = False, analyzer_options: Dict = None):
         """
         初始化完整分析器
         
@@ -42,6 +54,8 @@ class CompleteAnalyzer:
             auto_record: 是否自动生成分析记录
             frame_width: 视频帧宽度
             frame_height: 视频帧高度
+            shared_models: 是否使用进程内共享模型（多会话只加载一份YOLO/DeepSORT/InsightFace）
+            analyzer_options: 传给 IntegratedAnalyzer 的可选优化开关（如 roi_face_detection）
         """
         # 初始化持久化分析器
         self.persistent_analyzer = PersistentAnalyzer(
@@ -49,7 +63,9 @@ class CompleteAnalyzer:
             use_insightface=use_insightface,
             db_config=db_config,
             save_interval=save_interval,
-            record_interval=record_interval
+            record_interval=record_interval,
+            shared_models=shared_models,
+            analyzer_options=analyzer_options
         )
         
         # 设置父分析器引用，用于获取行为分析数据
@@ -75,6 +91,14 @@ class CompleteAnalyzer:
         # 统计数据
         self.session_stats = {}
         
+        # 当前帧统计快照（每帧重建，绘制/WebSocket/分析记录/REST共用）
+        self.snapshot_counters = SnapshotCounters()
+        self._snapshot: Optional[FrameSnapshot] = None
+        
+        # 流水线模式（可选）：分析阶段修改跟踪/行为状态，REST统计读取同一状态，共用一把锁
+        self.pipeline: Optional[PipelineRunner] = None
+        self._state_lock = threading.RLock()
+        
         # 分析记录配置
         self.auto_record = auto_record
         self.record_interval = record_interval
@@ -100,17 +124,218 @@ class CompleteAnalyzer:
         
         # 2. 行为分析
         self.behavior_analyzer.update_behavior_analysis(tracks, profiles)
+        snapshot = self._new_snapshot()
         
         # 3. 绘制结果
-        result_frame = self._draw_complete_results(frame, tracks, faces)
+        result_frame = self._draw_complete_results(frame, tracks, faces, snapshot)
         
         # 4. 收集统计信息
-        stats = self._collect_statistics()
+        stats = self._collect_statistics(snapshot)
         
         return result_frame, stats
     
+    def analyze_frame(self, frame: np.ndarray) -> Dict:
+        """
+        分析单帧但不绘制（叠加层模式），省去服务端绘制和图像编码
+        
+        Args:
+            frame: 输入图像
+            
+        Returns:
+            {'overlay': 叠加层描述, 'faces': 人脸列表, 'stats': 统计信息}
+        """
+        tracks, faces, profiles = self.persistent_analyzer.process_frame(frame)
+        self.behavior_analyzer.update_behavior_analysis(tracks, profiles)
+        snapshot = self._new_snapshot()
+        
+        overlay = self.build_overlay(frame.shape, tracks, faces, profiles)
+        return {
+            'overlay': overlay,
+            'faces': overlay['faces'],
+            'stats': self._collect_statistics(snapshot)
+        }
+    
+    def create_pipeline(self, decode: Callable[[Any], np.ndarray] = None,
+                        encode: Callable[[np.ndarray], Any] = None,
+                        queue_size: int = 2) -> PipelineRunner:
+        """
+        创建多阶段流水线：解码 → 人员检测 → 分析与绘制（跟踪、人脸、档案、行为、绘制、统计） → 编码
+        
+        各阶段在独立线程中运行，相邻帧可同时处于不同阶段，结果按提交顺序返回。
+        绘制和统计读取的热力图、行为和档案状态由分析修改，二者必须在同一阶段内完成，
+        否则下一帧的分析可能先于本帧的绘制执行，本帧会画出下一帧的状态。
+        提交的值为 {'data': 原始数据}（提供decode时）或 {'frame': 图像}，可附带
+        'render_mode'；结果为同一字典，增加 'tracks'、'faces'、'stats'、'result_frame'
+        （叠加层模式下为 'overlay'）以及 'output'（提供encode时）
+        
+        Args:
+            decode: 解码函数（原始数据 -> 图像），None时跳过解码阶段
+            encode: 编码函数（结果图像 -> 输出），None时跳过编码阶段
+            queue_size: 各阶段输入队列容量
+            
+        Returns:
+            PipelineRunner（关闭分析器时一并关闭）
+        """
+        stages = []
+        if decode is not None:
+            def decode_stage(ctx: Dict) -> Dict:
+                ctx['frame'] = decode(ctx['data'])
+                if ctx['frame'] is None:
+                    raise ValueError("无法解码图像")
+                return ctx
+            stages.append(('decode', decode_stage))
+        
+        stages.append(('detect', self._detect_stage))
+        stages.append(('analyze', self._analyze_stage))
+        
+        if encode is not None:
+            def encode_stage(ctx: Dict) -> Dict:
+                if ctx.get('result_frame') is not None:
+                    ctx['output'] = encode(ctx['result_frame'])
+                return ctx
+            stages.append(('encode', encode_stage))
+        
+        if self.pipeline is not None:
+            self.pipeline.close()
+        self.pipeline = PipelineRunner(
+            stages, queue_size=queue_size,
+            locks={'analyze': self._state_lock},
+            name='analysis-pipeline'
+        )
+        return self.pipeline
+    
+    def _detect_stage(self, ctx: Dict) -> Dict:
+        """人员检测（经过运动门控，只在本阶段线程中调用，可与前一帧的分析/绘制并行）"""
+        ctx['detections'] = self.persistent_analyzer.analyzer.detect_persons(ctx['frame'])
+        return ctx
+    
+    def _analyze_stage(self, ctx: Dict) -> Dict:
+        """跟踪、人脸、档案、持久化和行为分析，随后在同一帧的状态上绘制并收集统计"""
+        tracks, faces, profiles = self.persistent_analyzer.process_frame(ctx['frame'], ctx['detections'])
+        self.behavior_analyzer.update_behavior_analysis(tracks, profiles)
+        ctx.update(tracks=tracks, faces=faces, profiles=profiles, snapshot=self._new_snapshot())
+        return self._render(ctx)
+    
+    def _render(self, ctx: Dict) -> Dict:
+        """绘制结果（或构建叠加层）并收集统计信息（与分析在同一阶段、同一把锁内执行）"""
+        snapshot = ctx['snapshot']
+        if ctx.get('render_mode') == self.RENDER_OVERLAY:
+            ctx['overlay'] = self.build_overlay(ctx['frame'].shape, ctx['tracks'], ctx['faces'], ctx['profiles'])
+            ctx['result_frame'] = None
+        else:
+            ctx['result_frame'] = self._draw_complete_results(ctx['frame'], ctx['tracks'], ctx['faces'], snapshot)
+        ctx['stats'] = self._collect_statistics(snapshot)
+        return ctx
+    
+    def get_pipeline_statistics(self) -> Optional[Dict]:
+        """流水线各阶段耗时统计（未启用流水线时为None）"""
+        return self.pipeline.get_statistics() if self.pipeline is not None else None
+    
+    def _new_snapshot(self) -> FrameSnapshot:
+        """为刚处理完的帧创建统计快照"""
+        self._snapshot = FrameSnapshot(
+            self.persistent_analyzer.analyzer.frame_count,
+            {
+                'realtime': self.persistent_analyzer.get_realtime_statistics,
+                'behavior': self.behavior_analyzer.get_behavior_summary,
+                'zones': self.behavior_analyzer.get_zone_statistics,
+                'database': self._cached_database_statistics,
+                'persistence': self.persistent_analyzer.get_persistence_statistics
+            },
+            self.snapshot_counters
+        )
+        return self._snapshot
+    
+    def get_snapshot(self, sections: Tuple[str, ...] = ()) -> FrameSnapshot:
+        """
+        获取最近一帧的统计快照（尚未处理任何帧时创建）
+        
+        Args:
+            sections: 需要在状态锁内预先计算的统计项（流水线模式下分析线程可能并发修改状态，
+                      其他线程读取前应列出要用的统计项）
+        """
+        with self._state_lock:
+            snapshot = self._snapshot if self._snapshot is not None else self._new_snapshot()
+            for section in sections:
+                snapshot.get(section)
+        return snapshot
+    
+    def _cached_database_statistics(self) -> Dict:
+        # 写入时维护的内存计数器，不在帧处理路径上查询数据库
+        try:
+            return self.persistent_analyzer.get_cached_session_statistics()
+        except Exception:
+            return {}
+    
+    def build_overlay(self, frame_shape: Tuple[int, ...], tracks: List[PersonTrack],
+                      faces: List[FaceInfo], profiles: Dict[int, PersonProfile]) -> Dict:
+        """
+        构建紧凑的叠加层描述（坐标均为输入帧像素坐标，遵循display_config开关）
+        
+        Args:
+            frame_shape: 输入帧形状
+            tracks: 人员轨迹列表
+            faces: 人脸信息列表
+            profiles: 人员档案
+            
+        Returns:
+            叠加层描述字典
+        """
+        height, width = frame_shape[:2]
+        overlay = {'width': width, 'height': height, 'tracks': [], 'faces': [], 'zones': []}
+        
+        if self.display_config['show_tracks']:
+            behaviors = self.behavior_analyzer.person_behaviors
+            for track in tracks:
+                item = {'id': track.track_id, 'bbox': [int(v) for v in track.bbox]}
+                if track.predicted:
+                    item['predicted'] = True
+                profile = profiles.get(track.track_id)
+                if profile is not None:
+                    if profile.avg_age is not None:
+                        item['age'] = round(profile.avg_age, 1)
+                    if profile.dominant_gender is not None:
+                        item['gender'] = profile.dominant_gender
+                behavior = behaviors.get(track.track_id)
+                if behavior is not None and self.display_config['show_behavior_info']:
+                    item['dwell'] = round(behavior.total_dwell_time, 1)
+                    if behavior.is_shopper:
+                        item['type'] = 'shopper'
+                    elif behavior.is_browser:
+                        item['type'] = 'browser'
+                overlay['tracks'].append(item)
+        
+        if self.display_config['show_faces']:
+            for face in faces:
+                item = {'bbox': [int(v) for v in face.bbox], 'confidence': round(float(face.confidence), 2)}
+                if face.age is not None:
+                    item['age'] = int(face.age)
+                if face.gender is not None:
+                    item['gender'] = face.gender
+                overlay['faces'].append(item)
+        
+        if self.display_config['show_zones']:
+            for zone in self.behavior_analyzer.zones:
+                b, g, r = zone.color  # OpenCV颜色为BGR
+                overlay['zones'].append({
+                    'name': zone.name,
+                    'polygon': [[int(x), int(y)] for x, y in zone.polygon],
+                    'color': f"#{r:02x}{g:02x}{b:02x}"
+                })
+        
+        if self.display_config['show_heatmap']:
+            heatmap_width, heatmap_height = self.OVERLAY_HEATMAP_SIZE
+            thumbnail = self.behavior_analyzer.get_heatmap_thumbnail(heatmap_width, heatmap_height)
+            overlay['heatmap'] = {
+                'width': heatmap_width,
+                'height': heatmap_height,
+                'data': base64.b64encode(thumbnail.tobytes()).decode('ascii')
+            }
+        
+        return overlay
+    
     def _draw_complete_results(self, frame: np.ndarray, tracks: List[PersonTrack], 
-                              faces: List[FaceInfo]) -> np.ndarray:
+                              faces: List[FaceInfo], snapshot: FrameSnapshot = None) -> np.ndarray:
         """绘制完整的分析结果"""
         result_frame = frame.copy()
         
@@ -135,17 +360,17 @@ class CompleteAnalyzer:
         
         # 绘制统计信息（如果启用）
         if self.display_config['show_statistics']:
-            result_frame = self._draw_statistics(result_frame)
+            result_frame = self._draw_statistics(result_frame, snapshot or self.get_snapshot())
         
         return result_frame
     
-    def _draw_statistics(self, frame: np.ndarray) -> np.ndarray:
+    def _draw_statistics(self, frame: np.ndarray, snapshot: FrameSnapshot) -> np.ndarray:
         """绘制统计信息"""
         result_frame = frame.copy()
         
         # 获取各种统计信息
-        realtime_stats = self.persistent_analyzer.get_realtime_statistics()
-        behavior_summary = self.behavior_analyzer.get_behavior_summary()
+        realtime_stats = snapshot.realtime
+        behavior_summary = snapshot.behavior
         
         # 准备显示信息
         info_lines = []
@@ -184,24 +409,11 @@ class CompleteAnalyzer:
         
         return result_frame
     
-    def _collect_statistics(self) -> Dict:
-        """收集所有统计信息"""
-        stats = {}
-        
-        # 实时统计
-        stats['realtime'] = self.persistent_analyzer.get_realtime_statistics()
-        
-        # 行为分析统计
-        stats['behavior'] = self.behavior_analyzer.get_behavior_summary()
-        
-        # 区域统计
-        stats['zones'] = self.behavior_analyzer.get_zone_statistics()
-        
-        # 数据库统计（如果需要）
-        try:
-            stats['database'] = self.persistent_analyzer.get_session_statistics()
-        except:
-            stats['database'] = {}
+    def _collect_statistics(self, snapshot: FrameSnapshot = None) -> Dict:
+        """收集所有统计信息（实时、行为、区域、数据库和持久化队列统计取自帧快照）"""
+        snapshot = snapshot or self.get_snapshot()
+        stats = snapshot.to_dict()
+        stats['snapshot'] = {'frame': snapshot.frame_number, **self.snapshot_counters.to_dict()}
         
         # 分析记录统计
         try:
@@ -212,6 +424,10 @@ class CompleteAnalyzer:
         except:
             stats['records'] = {'count': 0}
         
+        # 流水线各阶段耗时
+        if self.pipeline is not None:
+            stats['pipeline'] = self.pipeline.get_statistics()
+        
         return stats
     
     def toggle_display_option(self, option: str):
@@ -346,8 +562,9 @@ class CompleteAnalyzer:
     
     def get_performance_metrics(self) -> Dict:
         """获取性能指标"""
-        realtime_stats = self.persistent_analyzer.get_realtime_statistics()
-        behavior_summary = self.behavior_analyzer.get_behavior_summary()
+        snapshot = self.get_snapshot()
+        realtime_stats = snapshot.realtime
+        behavior_summary = snapshot.behavior
         
         metrics = {
             'total_people_detected': realtime_stats.get('total_people', 0),
@@ -364,6 +581,8 @@ class CompleteAnalyzer:
     def close(self):
         """关闭分析器和数据库连接"""
         try:
+            if self.pipeline is not None:
+                self.pipeline.close()
             self.persistent_analyzer.close()
             logger.info("完整分析器已关闭")
         except Exception as e:
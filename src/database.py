@@ -15,6 +15,7 @@ import os
 from contextlib import contextmanager
 
 from db_config import DatabaseConfig
+from db_pool import get_pool
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -96,32 +97,50 @@ class AnalysisRecord:
 class DatabaseManager:
     """MySQL数据库管理器"""
     
-    def __init__(self, db_config: Dict[str, Any] = None):
+    def __init__(self, db_config: Dict[str, Any] = None, pool_config: Dict[str, Any] = None):
         """
         初始化数据库管理器
         
         Args:
-            db_config: 数据库配置字典，如果为None则使用默认配置
+            db_config: 数据库配置字典，如果为None则使用默认配置（其中的连接池参数会被分离出来）
+            pool_config: 连接池配置，覆盖默认值（pool_size/max_overflow/pool_recycle/
+                         pool_pre_ping/pool_timeout/pool_idle_timeout）
         """
-        self.db_config = db_config or DatabaseConfig.get_pymysql_config()
+        db_config = dict(db_config or DatabaseConfig.get_pymysql_config())
+        
+        # 连接池参数：默认配置 < db_config中携带的池参数 < pool_config
+        settings = DatabaseConfig.get_pool_config()
+        for key in DatabaseConfig.POOL_KEYS:
+            if key in db_config:
+                settings[key] = db_config.pop(key)
+        settings.update(pool_config or {})
+        
+        self.db_config = db_config
+        self.pool = get_pool(
+            self.db_config,
+            pool_size=settings['pool_size'],
+            max_overflow=settings['max_overflow'],
+            pool_recycle=settings['pool_recycle'],
+            pool_pre_ping=settings['pool_pre_ping'],
+            pool_timeout=settings['pool_timeout'],
+            idle_timeout=settings['pool_idle_timeout']
+        )
         self._init_database()
         logger.info(f"MySQL数据库初始化完成: {self.db_config['host']}:{self.db_config['port']}/{self.db_config['database']}")
     
     @contextmanager
     def get_connection(self):
-        """获取数据库连接的上下文管理器"""
-        conn = None
-        try:
-            conn = pymysql.connect(**self.db_config)
-            yield conn
-        except Exception as e:
-            logger.error(f"数据库连接错误: {e}")
-            if conn:
-                conn.rollback()
-            raise
-        finally:
-            if conn:
-                conn.close()
+        """从连接池借出数据库连接的上下文管理器，退出时归还"""
+        with self.pool.connection() as conn:
+            try:
+                yield conn
+            except Exception as e:
+                logger.error(f"数据库连接错误: {e}")
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+                raise
     
     def _init_database(self):
         """初始化数据库表结构"""
@@ -175,10 +194,12 @@ class DatabaseManager:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                 FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE,
+                UNIQUE KEY uq_session_track (session_id, track_id),
                 INDEX idx_session_id (session_id),
                 INDEX idx_track_id (track_id)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
         ''')
+        self._migrate_persons_unique_key(cursor)
         
         # 位置表
         cursor.execute('''
@@ -242,6 +263,45 @@ class DatabaseManager:
         
         logger.info("MySQL数据表创建完成")
     
+    def _migrate_persons_unique_key(self, cursor):
+        """
+        为旧版persons表补充 (session_id, track_id) 唯一键（尽力而为）
+        
+        旧版每个保存周期都会插入新行，先将位置/人脸记录归并到每组最新的人员记录，
+        删除重复行后再添加唯一键；失败时仅记录警告，不影响启动
+        """
+        try:
+            cursor.execute('''
+                SELECT COUNT(*) FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = 'persons'
+                  AND index_name = 'uq_session_track'
+            ''')
+            if cursor.fetchone()[0]:
+                return
+            
+            duplicates = '''
+                SELECT session_id, track_id, MAX(id) AS keep_id FROM persons
+                GROUP BY session_id, track_id HAVING COUNT(*) > 1
+            '''
+            for table in ('positions', 'faces'):
+                cursor.execute(f'''
+                    UPDATE {table} t
+                    JOIN persons p ON t.person_id = p.id
+                    JOIN ({duplicates}) k ON p.session_id = k.session_id AND p.track_id = k.track_id
+                    SET t.person_id = k.keep_id
+                    WHERE p.id <> k.keep_id
+                ''')
+            cursor.execute(f'''
+                DELETE p FROM persons p
+                JOIN ({duplicates}) k ON p.session_id = k.session_id AND p.track_id = k.track_id
+                WHERE p.id <> k.keep_id
+            ''')
+            removed = cursor.rowcount
+            cursor.execute('ALTER TABLE persons ADD UNIQUE KEY uq_session_track (session_id, track_id)')
+            logger.info(f"persons表已添加唯一键 (session_id, track_id)，合并重复记录 {removed} 条")
+        except Exception as e:
+            logger.warning(f"persons表唯一键迁移失败，将继续使用旧表结构: {e}")
+    
     def create_session(self, session_name: str) -> int:
         """
         创建新会话
@@ -287,9 +347,67 @@ class DatabaseManager:
             ))
             conn.commit()
     
+    # 按 (session_id, track_id) 插入或更新；first_seen 保持首次写入的值，
+    # id=LAST_INSERT_ID(id) 使更新已有行时 lastrowid 仍返回该行ID
+    PERSON_UPSERT_SQL = '''
+        INSERT INTO persons (
+            session_id, track_id, first_seen, last_seen, total_frames,
+            faces_detected, avg_age, dominant_gender, gender_confidence
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            id = LAST_INSERT_ID(id),
+            last_seen = VALUES(last_seen),
+            total_frames = VALUES(total_frames),
+            faces_detected = VALUES(faces_detected),
+            avg_age = VALUES(avg_age),
+            dominant_gender = VALUES(dominant_gender),
+            gender_confidence = VALUES(gender_confidence)
+    '''
+    
+    POSITION_INSERT_SQL = '''
+        INSERT INTO positions (person_id, x, y, timestamp, frame_number)
+        VALUES (%s, %s, %s, %s, %s)
+    '''
+    
+    FACE_INSERT_SQL = '''
+        INSERT INTO faces (
+            person_id, age, gender, gender_confidence,
+            bbox_x1, bbox_y1, bbox_x2, bbox_y2, confidence, timestamp
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    '''
+    
+    @staticmethod
+    def _person_row(session_id: int, person_data: Dict) -> Tuple:
+        return (
+            session_id,
+            person_data['track_id'],
+            person_data['first_seen'],
+            person_data['last_seen'],
+            person_data.get('total_frames', 0),
+            person_data.get('faces_detected', 0),
+            person_data.get('avg_age'),
+            person_data.get('dominant_gender'),
+            person_data.get('gender_confidence', 0.0)
+        )
+    
+    @staticmethod
+    def _face_row(person_id: int, face_data: Dict) -> Tuple:
+        return (
+            person_id,
+            face_data.get('age'),
+            face_data.get('gender'),
+            face_data.get('gender_confidence', 0.0),
+            face_data['bbox'][0],
+            face_data['bbox'][1],
+            face_data['bbox'][2],
+            face_data['bbox'][3],
+            face_data.get('confidence', 0.0),
+            face_data.get('timestamp', datetime.now())
+        )
+    
     def save_person(self, session_id: int, person_data: Dict) -> int:
         """
-        保存人员记录
+        保存人员记录（同一会话同一轨迹已存在时更新该记录）
         
         Args:
             session_id: 会话ID
@@ -300,22 +418,7 @@ class DatabaseManager:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO persons (
-                    session_id, track_id, first_seen, last_seen, total_frames,
-                    faces_detected, avg_age, dominant_gender, gender_confidence
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''', (
-                session_id,
-                person_data['track_id'],
-                person_data['first_seen'],
-                person_data['last_seen'],
-                person_data.get('total_frames', 0),
-                person_data.get('faces_detected', 0),
-                person_data.get('avg_age'),
-                person_data.get('dominant_gender'),
-                person_data.get('gender_confidence', 0.0)
-            ))
+            cursor.execute(self.PERSON_UPSERT_SQL, self._person_row(session_id, person_data))
             conn.commit()
             return cursor.lastrowid
     
@@ -332,10 +435,7 @@ class DatabaseManager:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO positions (person_id, x, y, timestamp, frame_number)
-                VALUES (%s, %s, %s, %s, %s)
-            ''', (person_id, x, y, timestamp, frame_number))
+            cursor.execute(self.POSITION_INSERT_SQL, (person_id, x, y, timestamp, frame_number))
             conn.commit()
     
     def save_face(self, person_id: int, face_data: Dict):
@@ -348,25 +448,120 @@ class DatabaseManager:
         """
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO faces (
-                    person_id, age, gender, gender_confidence,
-                    bbox_x1, bbox_y1, bbox_x2, bbox_y2, confidence, timestamp
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''', (
-                person_id,
-                face_data.get('age'),
-                face_data.get('gender'),
-                face_data.get('gender_confidence', 0.0),
-                face_data['bbox'][0],
-                face_data['bbox'][1],
-                face_data['bbox'][2],
-                face_data['bbox'][3],
-                face_data.get('confidence', 0.0),
-                face_data.get('timestamp', datetime.now())
-            ))
+            cursor.execute(self.FACE_INSERT_SQL, self._face_row(person_id, face_data))
+            conn.commit()
+    
+    def _upsert_persons(self, cursor, session_id: int, persons: List[Dict]) -> Dict[int, int]:
+        """
+        多行upsert人员记录并解析各轨迹对应的记录ID
+        
+        多行语句的lastrowid无法对应到每一行，借助 (session_id, track_id) 唯一键回查
+        """
+        if not persons:
+            return {}
+        
+        cursor.executemany(self.PERSON_UPSERT_SQL, [self._person_row(session_id, p) for p in persons])
+        
+        track_ids = [p['track_id'] for p in persons]
+        placeholders = ', '.join(['%s'] * len(track_ids))
+        cursor.execute(f'''
+            SELECT id, track_id FROM persons
+            WHERE session_id = %s AND track_id IN ({placeholders})
+            ORDER BY id
+        ''', (session_id, *track_ids))
+        
+        person_ids = {}
+        for row in cursor.fetchall():
+            if isinstance(row, dict):
+                person_ids[row['track_id']] = row['id']
+            else:
+                person_ids[row[1]] = row[0]
+        return person_ids
+    
+    def save_persons_bulk(self, session_id: int, persons: List[Dict]) -> Dict[int, int]:
+        """
+        批量保存人员记录（单个事务，已存在的轨迹更新原记录）
+        
+        Args:
+            session_id: 会话ID
+            persons: 人员数据列表（需包含track_id）
+            
+        Returns:
+            track_id -> 人员记录ID
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            person_ids = self._upsert_persons(cursor, session_id, persons)
+            conn.commit()
+            return person_ids
+    
+    def save_positions_bulk(self, positions: List[Tuple[int, int, int, datetime, int]]):
+        """
+        批量保存位置记录（单个事务）
+        
+        Args:
+            positions: (person_id, x, y, timestamp, frame_number) 列表
+        """
+        if not positions:
+            return
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(self.POSITION_INSERT_SQL, positions)
             conn.commit()
     
+    def save_faces_bulk(self, faces: List[Tuple[int, Dict]]):
+        """
+        批量保存人脸记录（单个事务）
+        
+        Args:
+            faces: (person_id, face_data) 列表
+        """
+        if not faces:
+            return
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(self.FACE_INSERT_SQL, [self._face_row(pid, face) for pid, face in faces])
+            conn.commit()
+    
+    def save_batch(self, session_id: int, persons: List[Dict], positions: List[Dict],
+                   faces: List[Dict], person_ids: Dict[int, int] = None) -> Dict[int, int]:
+        """
+        在一个事务中批量保存一个保存周期的人员、位置和人脸记录
+        
+        Args:
+            session_id: 会话ID
+            persons: 需要写入的人员数据列表（需包含track_id，已存在的轨迹更新原记录）
+            positions: 位置数据列表，每项包含 track_id, x, y, timestamp, frame_number
+            faces: 人脸数据列表，每项为 save_face 的face_data并包含track_id
+            person_ids: 已有的 track_id -> 人员记录ID 映射（本批未保存的人员从中查找）
+            
+        Returns:
+            本批保存人员的 track_id -> 人员记录ID
+        """
+        with self.get_connection() as conn:
+            # 显式开启事务（连接为autocommit模式时也保证整批原子提交）
+            conn.begin()
+            cursor = conn.cursor()
+            new_ids = self._upsert_persons(cursor, session_id, persons)
+            resolved = {**(person_ids or {}), **new_ids}
+            
+            position_rows = [
+                (resolved[p['track_id']], p['x'], p['y'], p['timestamp'], p['frame_number'])
+                for p in positions if p['track_id'] in resolved
+            ]
+            if position_rows:
+                cursor.executemany(self.POSITION_INSERT_SQL, position_rows)
+            
+            face_rows = [
+                self._face_row(resolved[f['track_id']], f)
+                for f in faces if f['track_id'] in resolved
+            ]
+            if face_rows:
+                cursor.executemany(self.FACE_INSERT_SQL, face_rows)
+            
+            conn.commit()
+            return new_ids
+    
     def save_analysis_record(self, record_data: Dict) -> int:
         """
         保存分析记录
@@ -690,9 +885,13 @@ class DatabaseManager:
             conn.commit()
             logger.info(f"清理了{days}天前的数据")
     
+    def get_pool_statistics(self) -> Dict:
+        """获取连接池统计信息（借出等待时间、连接数等）"""
+        return self.pool.get_statistics()
+    
     def close(self):
         """关闭数据库连接"""
-        # MySQL连接会在上下文管理器中自动关闭
+        # 连接池在进程内共享（其他会话可能仍在使用），空闲连接由空闲超时回收
         pass
 
 def test_database():
@@ -22,9 +22,15 @@ class DatabaseConfig:
         'pool_size': 10,
         'max_overflow': 20,
         'pool_recycle': 3600,
-        'pool_pre_ping': True
+        'pool_pre_ping': True,
+        'pool_timeout': 30,
+        'pool_idle_timeout': 300
     }
     
+    # 连接池参数（不传给pymysql.connect）
+    POOL_KEYS = ('pool_size', 'max_overflow', 'pool_recycle', 'pool_pre_ping',
+                 'pool_timeout', 'pool_idle_timeout')
+    
     @classmethod
     def get_config(cls) -> Dict[str, Any]:
         """
@@ -44,14 +50,20 @@ class DatabaseConfig:
             'DB_USER': 'user',
             'DB_PASSWORD': 'password',
             'DB_NAME': 'database',
-            'DB_CHARSET': 'charset'
+            'DB_CHARSET': 'charset',
+            'DB_POOL_SIZE': 'pool_size',
+            'DB_MAX_OVERFLOW': 'max_overflow',
+            'DB_POOL_TIMEOUT': 'pool_timeout',
+            'DB_POOL_IDLE_TIMEOUT': 'pool_idle_timeout'
         }
         
         for env_key, config_key in env_mapping.items():
             env_value = os.getenv(env_key)
             if env_value is not None:
-                if config_key == 'port':
+                if config_key in ('port', 'pool_size', 'max_overflow'):
                     config[config_key] = int(env_value)
+                elif config_key in ('pool_timeout', 'pool_idle_timeout'):
+                    config[config_key] = float(env_value)
                 else:
                     config[config_key] = env_value
         
@@ -75,4 +87,10 @@ class DatabaseConfig:
             'database': config['database'],
             'charset': config['charset'],
             'autocommit': config['autocommit']
-        } 
\ No newline at end of file
+        }
+    
+    @classmethod
+    def get_pool_config(cls) -> Dict[str, Any]:
+        """获取连接池配置"""
+        config = cls.get_config()
+        return {key: config[key] for key in cls.POOL_KEYS}
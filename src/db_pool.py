@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接池模块
+有界、线程安全的PyMySQL连接池，支持借出前健康检查、连接回收和空闲超时，
+并统计借出等待时间
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict
+import logging
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PoolTimeoutError(Exception):
+    """连接池借出超时"""
+
+class _PooledConnection:
+    """池内连接及其时间信息"""
+
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+class ConnectionPool:
+    """PyMySQL连接池"""
+
+    def __init__(self, connect_kwargs: Dict[str, Any], pool_size: int = 10, max_overflow: int = 20,
+                 pool_recycle: float = 3600, pool_pre_ping: bool = True,
+                 pool_timeout: float = 30.0, idle_timeout: float = 300.0):
+        """
+        初始化连接池
+
+        Args:
+            connect_kwargs: pymysql.connect 参数
+            pool_size: 常驻连接数（归还时超出部分直接关闭）
+            max_overflow: 高峰时允许额外创建的连接数
+            pool_recycle: 连接最大存活时间（秒），超过后重建，<=0表示不回收
+            pool_pre_ping: 借出前是否ping检查连接健康
+            pool_timeout: 连接耗尽时借出的最长等待时间（秒）
+            idle_timeout: 空闲连接最长保留时间（秒），<=0表示不限制
+        """
+        self.connect_kwargs = dict(connect_kwargs)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.max_connections = pool_size + max_overflow
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+        self.pool_timeout = pool_timeout
+        self.idle_timeout = idle_timeout
+
+        self._idle: deque = deque()  # 后进先出，保持热连接
+        self._total = 0
+        self._cond = threading.Condition(threading.Lock())
+
+        # 统计信息
+        self.checkouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.ping_failures = 0
+
+    def _is_expired(self, pooled: _PooledConnection, now: float) -> bool:
+        if self.pool_recycle > 0 and now - pooled.created_at > self.pool_recycle:
+            return True
+        if self.idle_timeout > 0 and now - pooled.last_used > self.idle_timeout:
+            return True
+        return False
+
+    def _close(self, pooled: _PooledConnection):
+        """关闭连接（调用方已将其从计数中移除）"""
+        self.discarded += 1
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def _checkout(self) -> _PooledConnection:
+        """借出连接（必要时创建或等待）"""
+        start = time.monotonic()
+        deadline = start + self.pool_timeout
+        expired = []
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                pooled = None
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if self._is_expired(candidate, now):
+                        self._total -= 1
+                        expired.append(candidate)
+                    else:
+                        pooled = candidate
+                        break
+
+                if pooled is not None:
+                    break
+
+                if self._total < self.max_connections:
+                    self._total += 1
+                    break
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(
+                        f"连接池已耗尽（{self.max_connections}个连接），等待{self.pool_timeout}秒超时"
+                    )
+                self._cond.wait(remaining)
+
+            wait_time = time.monotonic() - start
+            self.checkouts += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        # 网络操作在锁外进行
+        for candidate in expired:
+            self._close(candidate)
+
+        if pooled is not None and self.pool_pre_ping:
+            try:
+                pooled.conn.ping(reconnect=False)
+            except Exception:
+                self.ping_failures += 1
+                self._close(pooled)
+                pooled = None
+
+        if pooled is None:
+            try:
+                pooled = _PooledConnection(pymysql.connect(**self.connect_kwargs))
+                self.created += 1
+            except Exception:
+                self._release_slot()
+                raise
+
+        return pooled
+
+    def _release_slot(self):
+        """释放一个连接名额并唤醒等待方"""
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def _checkin(self, pooled: _PooledConnection, discard: bool = False):
+        """归还连接"""
+        if not discard and pooled.conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                # 清理未提交事务，避免状态泄漏给下一个使用者
+                pooled.conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or len(self._idle) >= self.pool_size:
+                self._total -= 1
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+                pooled = None
+            self._cond.notify()
+
+        if pooled is not None:
+            self._close(pooled)
+
+    @contextmanager
+    def connection(self):
+        """借出连接的上下文管理器，退出时自动归还（连接级错误时丢弃）"""
+        pooled = self._checkout()
+        discard = False
+        try:
+            yield pooled.conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self._checkin(pooled, discard=discard)
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close(pooled)
+
+    def get_statistics(self) -> Dict:
+        """获取连接池统计信息"""
+        with self._cond:
+            idle = len(self._idle)
+            total = self._total
+        checkouts = max(self.checkouts, 1)
+        return {
+            'pool_size': self.pool_size,
+            'max_connections': self.max_connections,
+            'open_connections': total,
+            'idle_connections': idle,
+            'in_use_connections': total - idle,
+            'checkouts': self.checkouts,
+            'avg_checkout_wait_ms': self.total_wait_time / checkouts * 1000,
+            'max_checkout_wait_ms': self.max_wait_time * 1000,
+            'timeouts': self.timeouts,
+            'created': self.created,
+            'discarded': self.discarded,
+            'ping_failures': self.ping_failures
+        }
+
+_pools: Dict[tuple, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(connect_kwargs: Dict[str, Any], **pool_settings) -> ConnectionPool:
+    """
+    获取进程内共享的连接池（相同连接参数的DatabaseManager共用一个池，
+    避免每个会话各自占用一批MySQL连接）
+    """
+    key = tuple(sorted((k, str(v)) for k, v in connect_kwargs.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(connect_kwargs, **pool_settings)
+            _pools[key] = pool
+            logger.info(f"创建数据库连接池: {connect_kwargs.get('host')}:{connect_kwargs.get('port')} "
+                        f"(常驻 {pool.pool_size}, 上限 {pool.max_connections})")
+        return pool
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人口统计增量聚合模块
+人员档案的平均年龄或主要性别变化时通知聚合器，聚合器维护年龄分布直方图、
+年龄总和与性别计数，读取统计为O(1)，不再随会话人数线性增长
+"""
+
+from typing import Dict, List, Optional, Tuple
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 年龄分组：(标签, 下限)，按下限升序，年龄落入下限不超过它的最后一组
+AGE_BUCKETS: List[Tuple[str, float]] = [
+    ("0-17", 0), ("18-25", 18), ("26-35", 26), ("36-45", 36),
+    ("46-55", 46), ("56-65", 56), ("65+", 66)
+]
+
+# FaceAnalyzer.get_age_statistics 使用的分组
+FACE_AGE_BUCKETS: List[Tuple[str, float]] = [
+    ('儿童(0-12)', 0), ('青少年(13-17)', 13), ('青年(18-35)', 18),
+    ('中年(36-55)', 36), ('老年(56+)', 56)
+]
+
+def bucket_index(age: float, buckets: List[Tuple[str, float]]) -> int:
+    """年龄所属分组的下标"""
+    index = 0
+    for i, (_, lower) in enumerate(buckets):
+        if age >= lower:
+            index = i
+        else:
+            break
+    return index
+
+class DemographicAggregator:
+    """年龄/性别增量聚合器"""
+
+    def __init__(self, schemes: Dict[str, List[Tuple[str, float]]] = None):
+        """
+        Args:
+            schemes: 分组方案名称 -> 年龄分组，默认同时维护 'default' 和 'face' 两种分组
+        """
+        self.schemes = schemes or {'default': AGE_BUCKETS, 'face': FACE_AGE_BUCKETS}
+        self._histograms: Dict[str, List[int]] = {
+            name: [0] * len(buckets) for name, buckets in self.schemes.items()
+        }
+        # 成员ID -> (平均年龄, 性别, {方案: 分组下标})
+        self._members: Dict[int, Tuple[Optional[float], Optional[str], Dict[str, int]]] = {}
+        self.age_sum = 0.0
+        self.age_count = 0
+        self.gender_counts: Dict[str, int] = {'Male': 0, 'Female': 0}
+        self.updates = 0
+
+    def _apply(self, age: Optional[float], gender: Optional[str], buckets: Dict[str, int], sign: int):
+        if age is not None:
+            self.age_sum += sign * age
+            self.age_count += sign
+            if self.age_count == 0:
+                self.age_sum = 0.0  # 消除浮点累积误差
+            for name, index in buckets.items():
+                self._histograms[name][index] += sign
+        if gender is not None:
+            self.gender_counts[gender] = self.gender_counts.get(gender, 0) + sign
+
+    def update(self, member_id: int, age: Optional[float], gender: Optional[str]):
+        """
+        更新成员的平均年龄和主要性别（O(分组方案数)）
+
+        Args:
+            member_id: 成员ID（轨迹ID）
+            age: 平均年龄，未知为None
+            gender: 主要性别，未知为None
+        """
+        previous = self._members.get(member_id)
+        if previous is not None:
+            if previous[0] == age and previous[1] == gender:
+                return
+            self._apply(*previous, sign=-1)
+
+        buckets = {}
+        if age is not None:
+            buckets = {name: bucket_index(age, scheme) for name, scheme in self.schemes.items()}
+        self._apply(age, gender, buckets, sign=1)
+        self._members[member_id] = (age, gender, buckets)
+        self.updates += 1
+
+    def remove(self, member_id: int):
+        """移除成员"""
+        previous = self._members.pop(member_id, None)
+        if previous is not None:
+            self._apply(*previous, sign=-1)
+
+    def clear(self):
+        """清空所有成员"""
+        for histogram in self._histograms.values():
+            histogram[:] = [0] * len(histogram)
+        self._members.clear()
+        self.age_sum = 0.0
+        self.age_count = 0
+        self.gender_counts = {'Male': 0, 'Female': 0}
+
+    @property
+    def avg_age(self) -> Optional[float]:
+        """有年龄的成员的平均年龄"""
+        return self.age_sum / self.age_count if self.age_count else None
+
+    def age_distribution(self, scheme: str = 'default') -> Dict[str, int]:
+        """年龄分布（分组标签 -> 人数）"""
+        return {
+            label: count
+            for (label, _), count in zip(self.schemes[scheme], self._histograms[scheme])
+        }
+
+    def get_gender_count(self, gender: str) -> int:
+        return self.gender_counts.get(gender, 0)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人员检测结果数组模块
+检测结果统一为 (N, 5) float32 数组，列为 x1, y1, x2, y2, confidence；
+Detections 是该数组的类型化视图（不复制数据），提供按列访问和格式转换
+"""
+
+import numpy as np
+from typing import List, Tuple
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 检测结果列数：x1, y1, x2, y2, confidence
+DETECTION_COLUMNS = 5
+
+class Detections(np.ndarray):
+    """(N, 5) float32 检测结果的类型化视图"""
+
+    @property
+    def xyxy(self) -> np.ndarray:
+        """(N, 4) 左上右下坐标"""
+        return np.asarray(self)[:, :4]
+
+    @property
+    def confidence(self) -> np.ndarray:
+        """(N,) 置信度"""
+        return np.asarray(self)[:, 4]
+
+    @property
+    def xywh(self) -> np.ndarray:
+        """(N, 4) 左上角坐标和宽高（DeepSORT输入格式）"""
+        boxes = np.asarray(self)[:, :4].copy()
+        boxes[:, 2:] -= boxes[:, :2]
+        return boxes
+
+    @property
+    def centers(self) -> np.ndarray:
+        """(N, 2) 框中心"""
+        boxes = np.asarray(self)
+        return (boxes[:, :2] + boxes[:, 2:4]) / 2
+
+    def to_tuples(self) -> List[Tuple[int, int, int, int, float]]:
+        """转换为旧接口的 [(x1, y1, x2, y2, confidence), ...]"""
+        boxes = np.asarray(self)
+        return list(zip(*boxes[:, :4].astype(int).T.tolist(), boxes[:, 4].tolist()))
+
+def empty_detections() -> np.ndarray:
+    """没有检测结果时的 (0, 5) 数组"""
+    return np.zeros((0, DETECTION_COLUMNS), dtype=np.float32)
+
+def as_detections(detections) -> Detections:
+    """
+    将检测结果（(N, 5)数组或旧接口的元组列表）转换为 Detections 视图
+
+    已是 float32 数组时不复制数据
+    """
+    array = np.asarray(detections, dtype=np.float32)
+    if array.size == 0:
+        array = empty_detections()
+    return array.reshape(-1, DETECTION_COLUMNS).view(Detections)
@@ -7,8 +7,9 @@
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from typing import List, Tuple, Optional
+from typing import Optional
+from detections import as_detections, empty_detections
+from detector_backends import BACKEND_TORCH, BACKENDS, create_backend
 import logging
 
 # 配置日志
@@ -18,29 +19,63 @@ logger = logging.getLogger(__name__)
 class PersonDetector:
     """人员检测器"""
     
-    def __init__(self, model_path: str = 'yolov8n.pt', confidence: float = 0.5):
+    def __init__(self, model_path: str = 'yolov8n.pt', confidence: float = 0.5,
+                 shared: bool = False, batched: bool = False,
+                 backend: Optional[str] = None, threads: Optional[int] = None):
         """
         初始化检测器
         
         Args:
             model_path: YOLO模型路径
             confidence: 置信度阈值
+            shared: 是否使用进程内共享的模型（多会话只加载一次）
+            batched: 是否通过跨会话批处理推理服务检测（需要shared=True）
+            backend: 推理后端 'torch'、'onnxruntime' 或 'openvino'
+                     （None时共享模式使用注册表配置，否则为'torch'；非PyTorch后端首次使用时自动导出模型）
+            threads: 推理线程数（None使用后端默认值）
         """
         self.model_path = model_path
         self.confidence = confidence
+        self.shared = shared
+        self.batched = batched and shared
+        self.backend_name = backend
+        self.threads = threads
         self.model = None
+        self.backend = None
+        self.batcher = None
         self._load_model()
     
     def _load_model(self):
         """加载YOLO模型"""
         try:
-            self.model = YOLO(self.model_path)
-            logger.info(f"成功加载YOLO模型: {self.model_path}")
+            registry = None
+            if self.shared:
+                from model_registry import get_model_registry
+                registry = get_model_registry()
+                if self.backend_name is None:
+                    self.backend_name = registry.detector_backend
+                    self.threads = self.threads or registry.detector_threads
+            self.backend_name = self.backend_name or BACKEND_TORCH
+            if self.backend_name not in BACKENDS:
+                raise ValueError(f"不支持的检测后端: {self.backend_name}")
+            
+            # 各后端在推理时只保留人员类别并按置信度过滤，返回 (N, 5) float32 数组，创建时已预热
+            if registry is not None:
+                # 共享后端按置信度下限过滤，本检测器的阈值在detect_persons中应用
+                self.backend = registry.get_detector_backend(self.backend_name, self.model_path, self.threads)
+                if self.batched:
+                    self.batcher = registry.get_yolo_batcher(self.model_path, backend=self.backend_name,
+                                                             threads=self.threads)
+            else:
+                self.backend = create_backend(self.backend_name, self.model_path,
+                                              threads=self.threads, conf=self.confidence)
+            self.model = self.backend
+            logger.info(f"成功加载YOLO模型: {self.model_path} [{self.backend_name}]{' (共享)' if self.shared else ''}")
         except Exception as e:
             logger.error(f"加载YOLO模型失败: {e}")
             raise
     
-    def detect_persons(self, frame: np.ndarray) -> List[Tuple[int, int, int, int, float]]:
+    def detect_persons(self, frame: np.ndarray) -> np.ndarray:
         """
         检测图像中的人员
         
@@ -48,53 +83,47 @@ class PersonDetector:
             frame: 输入图像 (BGR格式)
             
         Returns:
-            检测结果列表，每个元素为 (x1, y1, x2, y2, confidence)
+            (N, 5) float32 数组，每行为 [x1, y1, x2, y2, confidence]，
+            需要按列访问时可用 as_detections 转为 Detections 视图
         """
         if self.model is None:
             logger.error("模型未加载")
-            return []
+            return empty_detections()
         
         try:
-            # 运行检测
-            results = self.model(frame, verbose=False)
+            # 运行检测（批处理模式下与其他会话的帧合并为一次推理）
+            if self.batcher is not None:
+                detections = self.batcher(id(self), frame)
+            else:
+                detections = self.backend.infer([frame])[0]
             
-            detections = []
-            for result in results:
-                boxes = result.boxes
-                if boxes is not None:
-                    for box in boxes:
-                        # 获取类别ID (0 = person)
-                        class_id = int(box.cls[0])
-                        if class_id == 0:  # 只检测人员
-                            confidence = float(box.conf[0])
-                            if confidence >= self.confidence:
-                                # 获取边界框坐标
-                                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                                detections.append((
-                                    int(x1), int(y1), int(x2), int(y2), confidence
-                                ))
+            if self.shared:
+                detections = detections[detections[:, 4] >= self.confidence]
             
             logger.debug(f"检测到 {len(detections)} 个人员")
             return detections
             
         except Exception as e:
             logger.error(f"人员检测失败: {e}")
-            return []
+            return empty_detections()
     
-    def draw_detections(self, frame: np.ndarray, detections: List[Tuple[int, int, int, int, float]]) -> np.ndarray:
+    def draw_detections(self, frame: np.ndarray, detections: np.ndarray) -> np.ndarray:
         """
         在图像上绘制检测结果
         
         Args:
             frame: 输入图像
-            detections: 检测结果
+            detections: (N, 5) 检测结果数组
             
         Returns:
             绘制了检测框的图像
         """
         result_frame = frame.copy()
+        detections = as_detections(detections)
         
-        for x1, y1, x2, y2, conf in detections:
+        # 坐标整体取整后再逐框绘制
+        boxes = detections.xyxy.astype(int).tolist()
+        for (x1, y1, x2, y2), conf in zip(boxes, detections.confidence.tolist()):
             # 绘制边界框
             cv2.rectangle(result_frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
             
@@ -122,7 +151,7 @@ class YOLODetector(PersonDetector):
         """
         super().__init__(model_path=model_path, confidence=conf_threshold)
     
-    def detect(self, frame: np.ndarray) -> List[Tuple[int, int, int, int, float]]:
+    def detect(self, frame: np.ndarray) -> np.ndarray:
         """
         检测图像中的人员（兼容接口）
         
@@ -130,7 +159,7 @@ class YOLODetector(PersonDetector):
             frame: 输入图像
             
         Returns:
-            检测结果列表
+            (N, 5) 检测结果数组
         """
         return self.detect_persons(frame)
 
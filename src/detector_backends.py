@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人员检测推理后端模块
+PersonDetector 可选择 PyTorch（Ultralytics）、ONNX Runtime 或 OpenVINO 后端；
+非PyTorch后端首次使用时自动导出模型并缓存，支持线程数配置，加载后预热
+"""
+
+import os
+import shutil
+import threading
+import cv2
+import numpy as np
+from typing import List, Optional, Tuple
+from detections import DETECTION_COLUMNS, empty_detections
+import logging
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    import openvino as ov
+    OPENVINO_AVAILABLE = True
+except ImportError:
+    OPENVINO_AVAILABLE = False
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKEND_TORCH = 'torch'
+BACKEND_ONNXRUNTIME = 'onnxruntime'
+BACKEND_OPENVINO = 'openvino'
+BACKENDS = (BACKEND_TORCH, BACKEND_ONNXRUNTIME, BACKEND_OPENVINO)
+
+# 导出模型缓存目录
+MODEL_CACHE_DIR = 'models'
+
+# 共享后端的置信度下限和NMS阈值（与Ultralytics默认值一致，最终阈值由PersonDetector过滤）
+CONF_FLOOR = 0.25
+NMS_IOU = 0.7
+
+# COCO人员类别
+PERSON_CLASS = 0
+
+def available_backends() -> List[str]:
+    """当前环境可用的后端"""
+    backends = [BACKEND_TORCH]
+    if ONNXRUNTIME_AVAILABLE:
+        backends.append(BACKEND_ONNXRUNTIME)
+    if OPENVINO_AVAILABLE:
+        backends.append(BACKEND_OPENVINO)
+    return backends
+
+def export_model(model_path: str, fmt: str, imgsz: int = 640, dynamic: bool = False,
+                 cache_dir: str = MODEL_CACHE_DIR) -> str:
+    """
+    将Ultralytics模型导出为ONNX或OpenVINO IR并缓存，已缓存且不旧于权重文件时直接返回
+
+    Args:
+        model_path: .pt权重路径
+        fmt: 'onnx' 或 'openvino'
+        imgsz: 输入尺寸
+        dynamic: 是否导出动态批大小
+        cache_dir: 缓存目录
+
+    Returns:
+        ONNX文件路径或OpenVINO .xml文件路径
+    """
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    suffix = f"{stem}_{imgsz}{'_dynamic' if dynamic else ''}"
+    if fmt == 'onnx':
+        cached = os.path.join(cache_dir, f"{suffix}.onnx")
+    elif fmt == 'openvino':
+        cached = os.path.join(cache_dir, f"{suffix}_openvino_model", f"{stem}.xml")
+    else:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+
+    if os.path.exists(cached) and (not os.path.exists(model_path)
+                                   or os.path.getmtime(cached) >= os.path.getmtime(model_path)):
+        return cached
+
+    from ultralytics import YOLO
+    logger.info(f"导出 {model_path} -> {fmt}（首次使用，完成后缓存到 {cache_dir}）")
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz, dynamic=dynamic)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if fmt == 'onnx':
+        shutil.move(exported, cached)
+    else:
+        target_dir = os.path.dirname(cached)
+        if os.path.exists(target_dir):
+            shutil.rmtree(target_dir)
+        shutil.move(exported, target_dir)
+    return cached
+
+def letterbox(frame: np.ndarray, size: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    等比缩放并填充到 size x size（与Ultralytics LetterBox一致）
+
+    Returns:
+        (填充后的图像, 缩放比例, (左侧填充, 顶部填充))
+    """
+    height, width = frame.shape[:2]
+    gain = min(size / height, size / width)
+    new_width, new_height = int(round(width * gain)), int(round(height * gain))
+    pad_x, pad_y = (size - new_width) / 2, (size - new_height) / 2
+    if (new_width, new_height) != (width, height):
+        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    padded = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return padded, gain, (left, top)
+
+def preprocess(frames: List[np.ndarray], size: int) -> Tuple[np.ndarray, List[Tuple[float, Tuple[int, int]]]]:
+    """BGR帧列表 -> (B, 3, size, size) float32 输入，以及各帧的缩放/填充参数"""
+    batch, transforms = [], []
+    for frame in frames:
+        padded, gain, pad = letterbox(frame, size)
+        batch.append(padded[:, :, ::-1].transpose(2, 0, 1))
+        transforms.append((gain, pad))
+    blob = np.ascontiguousarray(np.stack(batch), dtype=np.float32) / 255.0
+    return blob, transforms
+
+def postprocess(output: np.ndarray, transform: Tuple[float, Tuple[int, int]],
+                frame_shape: Tuple[int, ...], conf_floor: float = CONF_FLOOR,
+                iou: float = NMS_IOU) -> np.ndarray:
+    """
+    解析单帧YOLOv8输出（84 x N：cx, cy, w, h, 80类得分），只保留人员并做NMS
+
+    Returns:
+        (N, 5) float32 数组 [x1, y1, x2, y2, confidence]（原图坐标，按置信度降序）
+    """
+    scores = output[4 + PERSON_CLASS]
+    keep = scores >= conf_floor
+    if not keep.any():
+        return empty_detections()
+    cx, cy, w, h = output[0][keep], output[1][keep], output[2][keep], output[3][keep]
+    scores = scores[keep]
+
+    indices = cv2.dnn.NMSBoxes(
+        np.stack([cx - w / 2, cy - h / 2, w, h], axis=1).tolist(), scores.tolist(), conf_floor, iou
+    )
+    if len(indices) == 0:
+        return empty_detections()
+    indices = np.array(indices).reshape(-1)
+    indices = indices[np.argsort(-scores[indices])]
+
+    gain, (pad_x, pad_y) = transform
+    frame_height, frame_width = frame_shape[:2]
+    detections = np.empty((len(indices), DETECTION_COLUMNS), dtype=np.float32)
+    detections[:, 0] = cx[indices] - w[indices] / 2
+    detections[:, 1] = cy[indices] - h[indices] / 2
+    detections[:, 2] = cx[indices] + w[indices] / 2
+    detections[:, 3] = cy[indices] + h[indices] / 2
+    detections[:, [0, 2]] = np.clip((detections[:, [0, 2]] - pad_x) / gain, 0, frame_width)
+    detections[:, [1, 3]] = np.clip((detections[:, [1, 3]] - pad_y) / gain, 0, frame_height)
+    detections[:, 4] = scores[indices]
+    return detections
+
+class DetectorBackend:
+    """推理后端基类：infer(帧列表) -> 每帧的 (N, 5) float32 人员检测数组"""
+
+    name = ''
+
+    def __init__(self, model_path: str, imgsz: int = 640, threads: Optional[int] = None,
+                 conf: float = CONF_FLOOR):
+        self.model_path = model_path
+        self.imgsz = imgsz
+        self.threads = threads
+        self.conf = conf
+
+    def infer(self, frames: List[np.ndarray]) -> List[np.ndarray]:
+        raise NotImplementedError
+
+    def warmup(self, runs: int = 2, frame_shape: Tuple[int, int, int] = (480, 640, 3)):
+        """用空白帧预热（首次推理的内存分配和图优化不计入会话延迟）"""
+        frame = np.zeros(frame_shape, dtype=np.uint8)
+        for _ in range(runs):
+            self.infer([frame])
+
+class TorchBackend(DetectorBackend):
+    """Ultralytics PyTorch 后端"""
+
+    name = BACKEND_TORCH
+
+    def __init__(self, model_path: str, imgsz: int = 640, threads: Optional[int] = None,
+                 conf: float = CONF_FLOOR, shared: bool = False):
+        super().__init__(model_path, imgsz, threads, conf)
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        if shared:
+            from model_registry import get_model_registry
+            self.model = get_model_registry().get_yolo(model_path)
+        else:
+            from ultralytics import YOLO
+            self.model = YOLO(model_path)
+
+    def infer(self, frames: List[np.ndarray]) -> List[np.ndarray]:
+        # 类别和置信度在模型NMS中过滤，结果张量 (N, 6) 的前5列即 x1, y1, x2, y2, conf
+        results = self.model(frames, verbose=False, imgsz=self.imgsz,
+                             classes=[PERSON_CLASS], conf=self.conf)
+        outputs = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                outputs.append(empty_detections())
+            else:
+                outputs.append(boxes.data[:, :DETECTION_COLUMNS].cpu().numpy().astype(np.float32, copy=False))
+        return outputs
+
+class OnnxRuntimeBackend(DetectorBackend):
+    """ONNX Runtime CPU 后端（导出动态批大小，整批一次推理）"""
+
+    name = BACKEND_ONNXRUNTIME
+
+    def __init__(self, model_path: str, imgsz: int = 640, threads: Optional[int] = None,
+                 conf: float = CONF_FLOOR):
+        super().__init__(model_path, imgsz, threads, conf)
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("onnxruntime未安装")
+        onnx_path = model_path if model_path.endswith('.onnx') else export_model(
+            model_path, 'onnx', imgsz, dynamic=True)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(onnx_path, sess_options=options,
+                                            providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        logger.info(f"ONNX Runtime后端已加载: {onnx_path}（线程数: {threads or '默认'}）")
+
+    def infer(self, frames: List[np.ndarray]) -> List[np.ndarray]:
+        blob, transforms = preprocess(frames, self.imgsz)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return [postprocess(output[i], transforms[i], frame.shape, self.conf) for i, frame in enumerate(frames)]
+
+class OpenVINOBackend(DetectorBackend):
+    """OpenVINO CPU 后端（静态输入，逐帧推理）"""
+
+    name = BACKEND_OPENVINO
+
+    def __init__(self, model_path: str, imgsz: int = 640, threads: Optional[int] = None,
+                 conf: float = CONF_FLOOR):
+        super().__init__(model_path, imgsz, threads, conf)
+        if not OPENVINO_AVAILABLE:
+            raise ImportError("openvino未安装")
+        xml_path = model_path if model_path.endswith('.xml') else export_model(model_path, 'openvino', imgsz)
+
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            config['INFERENCE_NUM_THREADS'] = threads
+        core = ov.Core()
+        self.compiled = core.compile_model(core.read_model(xml_path), 'CPU', config)
+        self.request = self.compiled.create_infer_request()
+        self._lock = threading.Lock()  # 推理请求不可并发使用
+        logger.info(f"OpenVINO后端已加载: {xml_path}（线程数: {threads or '默认'}）")
+
+    def infer(self, frames: List[np.ndarray]) -> List[np.ndarray]:
+        outputs = []
+        for frame in frames:
+            blob, transforms = preprocess([frame], self.imgsz)
+            with self._lock:
+                output = self.request.infer({0: blob})[self.compiled.output(0)]
+            outputs.append(postprocess(output[0], transforms[0], frame.shape, self.conf))
+        return outputs
+
+def create_backend(backend: str, model_path: str = 'yolov8n.pt', imgsz: int = 640,
+                   threads: Optional[int] = None, conf: float = CONF_FLOOR,
+                   shared: bool = False, warmup: bool = True) -> DetectorBackend:
+    """
+    创建推理后端
+
+    Args:
+        backend: 'torch'、'onnxruntime' 或 'openvino'
+        model_path: .pt权重路径（非PyTorch后端也可直接传入 .onnx / .xml）
+        imgsz: 输入尺寸
+        threads: 推理线程数（None使用后端默认值）
+        conf: 置信度下限（在NMS之前过滤）
+        shared: PyTorch后端是否使用进程内共享模型
+        warmup: 加载后是否预热
+    """
+    if backend == BACKEND_TORCH:
+        instance = TorchBackend(model_path, imgsz, threads, conf, shared=shared)
+    elif backend == BACKEND_ONNXRUNTIME:
+        instance = OnnxRuntimeBackend(model_path, imgsz, threads, conf)
+    elif backend == BACKEND_OPENVINO:
+        instance = OpenVINOBackend(model_path, imgsz, threads, conf)
+    else:
+        raise ValueError(f"不支持的检测后端: {backend}")
+
+    if warmup:
+        instance.warmup()
+    return instance
@@ -13,7 +13,11 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from collections import deque
 import statistics
+import threading
 from age_config import get_age_correction_factors, get_age_mapping, get_age_config
+from running_stats import WindowedAgeStats
+from association import assign_faces_to_tracks
+from face_roi import build_mosaic, map_detections
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -35,43 +39,40 @@ class FaceInfo:
     age_raw: Optional[float] = None  # 原始年龄预测值
     age_range: Optional[str] = None  # 年龄范围
     face_quality: Optional[float] = None  # 人脸质量评分
+    
+    # 关联到的人员轨迹ID（每帧由关联模块计算一次）
+    track_id: Optional[int] = None
 
 @dataclass
 class AgeHistory:
-    """年龄历史记录，用于多帧融合"""
+    """年龄历史记录，用于多帧融合（窗口内维护累加和，平滑年龄为O(1)）"""
+    __slots__ = ('window',)
+    
     def __init__(self, maxlen=20):
-        self.ages = deque(maxlen=maxlen)
-        self.confidences = deque(maxlen=maxlen)
-        self.qualities = deque(maxlen=maxlen)
+        self.window = WindowedAgeStats(maxlen=maxlen)
+    
+    @property
+    def ages(self) -> deque:
+        return self.window.ages
+    
+    @property
+    def confidences(self) -> deque:
+        return self.window.confidences
+    
+    @property
+    def qualities(self) -> deque:
+        return self.window.qualities
     
     def add_prediction(self, age: float, confidence: float, quality: float):
         """添加新的年龄预测"""
-        self.ages.append(age)
-        self.confidences.append(confidence)
-        self.qualities.append(quality)
+        self.window.add(age, confidence, quality)
     
     def get_smoothed_age(self) -> Tuple[int, float]:
-        """获取平滑后的年龄和置信度"""
-        if not self.ages:
+        """获取平滑后的年龄和置信度（基于质量和置信度的加权平均，权重都为0时使用简单平均）"""
+        if not self.window.ages:
             return 30, 0.5
         
-        # 基于质量和置信度的加权平均
-        weights = []
-        for conf, qual in zip(self.confidences, self.qualities):
-            weight = conf * qual
-            weights.append(weight)
-        
-        if sum(weights) == 0:
-            # 如果权重都为0，使用简单平均
-            smoothed_age = statistics.mean(self.ages)
-            avg_confidence = statistics.mean(self.confidences)
-        else:
-            # 加权平均
-            weighted_sum = sum(age * weight for age, weight in zip(self.ages, weights))
-            total_weight = sum(weights)
-            smoothed_age = weighted_sum / total_weight
-            avg_confidence = statistics.mean(self.confidences)
-        
+        smoothed_age, avg_confidence = self.window.smoothed()
         return int(round(smoothed_age)), avg_confidence
 
 class AgeOptimizer:
@@ -573,10 +574,32 @@ class OpenCVFaceAnalyzer:
 class InsightFaceAnalyzer:
     """基于InsightFace的人脸检测与属性识别"""
     
-    def __init__(self):
-        """初始化InsightFace分析器"""
+    # 预处理模式
+    PREPROCESS_FACE_REGION = 'face_region'  # 原图检测，仅增强人脸区域后做属性识别
+    PREPROCESS_FULL_FRAME = 'full_frame'    # 整帧增强后检测与识别（旧流程）
+    
+    # 人脸关键点类结果，需要从裁剪坐标映射回原图坐标
+    LANDMARK_KEYS = ('landmark_2d_106', 'landmark_3d_68')
+    
+    def __init__(self, preprocess_mode: str = PREPROCESS_FACE_REGION,
+                 detection_scale: float = 1.0, face_padding: float = 0.5,
+                 shared: bool = False):
+        """
+        初始化InsightFace分析器
+        
+        Args:
+            preprocess_mode: 预处理模式，'face_region'（默认）或 'full_frame'
+            detection_scale: 人脸检测前的缩放比例（<1时在缩小图上检测）
+            face_padding: 人脸裁剪外扩比例（相对人脸长边），需覆盖属性模型的1.5倍对齐区域
+            shared: 是否使用进程内共享的InsightFace模型（年龄历史等状态仍为本实例独有）
+        """
         self.app = None
         self.age_optimizer = AgeOptimizer()  # 添加年龄优化器
+        self.preprocess_mode = preprocess_mode
+        self.detection_scale = detection_scale
+        self.face_padding = face_padding
+        self.shared = shared
+        self._model_lock = threading.RLock()  # 模型推理锁，共享模式下与其他会话共用
         self._load_models()
     
     def preprocess_for_age_detection(self, frame: np.ndarray) -> np.ndarray:
@@ -651,10 +674,15 @@ class InsightFaceAnalyzer:
     def _load_models(self):
         """加载InsightFace模型"""
         try:
-            import insightface
-            self.app = insightface.app.FaceAnalysis(providers=['CPUExecutionProvider'])
-            self.app.prepare(ctx_id=0, det_size=(640, 640))
-            logger.info("InsightFace人脸分析器初始化完成")
+            if self.shared:
+                from model_registry import get_model_registry
+                self.app = get_model_registry().get_insightface(det_size=(640, 640))
+                self._model_lock = self.app.lock
+            else:
+                import insightface
+                self.app = insightface.app.FaceAnalysis(providers=['CPUExecutionProvider'])
+                self.app.prepare(ctx_id=0, det_size=(640, 640))
+            logger.info(f"InsightFace人脸分析器初始化完成{' (共享模型)' if self.shared else ''}")
         except ImportError:
             logger.error("InsightFace未安装，请使用OpenCV方案")
             raise
@@ -662,6 +690,96 @@ class InsightFaceAnalyzer:
             logger.error(f"InsightFace模型加载失败: {e}")
             raise
     
+    def _get_faces_with_region_preprocess(self, frame: np.ndarray) -> list:
+        """
+        两阶段人脸分析：先在原图（或缩小图）上检测人脸，
+        再只对外扩后的人脸区域做增强并运行属性模型
+        
+        Args:
+            frame: 输入图像
+            
+        Returns:
+            InsightFace Face对象列表（坐标为原图坐标）
+        """
+        # 1. 在原图或缩小图上检测
+        scale = self.detection_scale
+        if 0 < scale < 1.0:
+            det_input = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        else:
+            scale = 1.0
+            det_input = frame
+        
+        with self._model_lock:
+            bboxes, kpss = self.app.det_model.detect(det_input, max_num=0, metric='default')
+        if bboxes is None or bboxes.shape[0] == 0:
+            return []
+        
+        if scale != 1.0:
+            bboxes[:, :4] /= scale
+            if kpss is not None:
+                kpss /= scale
+        
+        return self._analyze_face_regions(
+            frame, [(bboxes[i], kpss[i] if kpss is not None else None) for i in range(bboxes.shape[0])]
+        )
+    
+    def _analyze_face_regions(self, frame: np.ndarray, detections: list) -> list:
+        """
+        对已检测到的人脸逐个外扩裁剪、增强并运行属性模型
+        
+        Args:
+            frame: 输入图像
+            detections: [((5,) 原图坐标检测框, 原图坐标关键点), ...]
+            
+        Returns:
+            InsightFace Face对象列表（坐标为原图坐标）
+        """
+        from insightface.app.common import Face
+        
+        frame_height, frame_width = frame.shape[:2]
+        faces = []
+        for detection, kps in detections:
+            bbox = detection[0:4]
+            det_score = detection[4]
+            
+            # 2. 外扩裁剪人脸区域
+            x1, y1, x2, y2 = bbox
+            pad = max(x2 - x1, y2 - y1) * self.face_padding
+            cx1 = int(max(0, np.floor(x1 - pad)))
+            cy1 = int(max(0, np.floor(y1 - pad)))
+            cx2 = int(min(frame_width, np.ceil(x2 + pad)))
+            cy2 = int(min(frame_height, np.ceil(y2 + pad)))
+            if cx2 <= cx1 or cy2 <= cy1:
+                continue
+            
+            # 3. 仅增强人脸区域
+            enhanced_crop = self.preprocess_for_age_detection(frame[cy1:cy2, cx1:cx2])
+            
+            # 4. 在裁剪坐标系下运行属性模型
+            offset = np.array([cx1, cy1], dtype=np.float32)
+            face = Face(
+                bbox=bbox - np.tile(offset, 2),
+                kps=kps - offset if kps is not None else None,
+                det_score=det_score
+            )
+            with self._model_lock:
+                for taskname, model in self.app.models.items():
+                    if taskname == 'detection':
+                        continue
+                    model.get(enhanced_crop, face)
+            
+            # 5. 坐标映射回原图
+            face.bbox = bbox
+            face.kps = kps
+            for key in self.LANDMARK_KEYS:
+                landmarks = face.get(key)
+                if landmarks is not None:
+                    landmarks[:, :2] += offset
+            
+            faces.append(face)
+        
+        return faces
+    
     def detect_faces(self, frame: np.ndarray) -> List[FaceInfo]:
         """
         检测人脸并分析属性
@@ -676,69 +794,125 @@ class InsightFaceAnalyzer:
             return []
         
         try:
-            # InsightFace检测
-            # 预处理图像提升年龄检测精度
-            processed_frame = self.preprocess_for_age_detection(frame)
-            faces = self.app.get(processed_frame)
+            if self.preprocess_mode == self.PREPROCESS_FULL_FRAME:
+                # 整帧预处理后检测（旧流程）
+                processed_frame = self.preprocess_for_age_detection(frame)
+                with self._model_lock:
+                    faces = self.app.get(processed_frame)
+            else:
+                # 原图检测，仅对人脸区域预处理
+                faces = self._get_faces_with_region_preprocess(frame)
             
-            face_infos = []
-            for face in faces:
-                # 获取边界框
-                bbox = face.bbox.astype(int)
-                x1, y1, x2, y2 = bbox
-                
-                # 获取人脸区域
-                face_roi = frame[y1:y2, x1:x2]
-                
-                # 计算人脸质量
-                # 计算增强的人脸质量
-                basic_quality = self.age_optimizer.calculate_face_quality(face_roi, tuple(bbox))
-                enhanced_quality = self.calculate_face_quality_score(face_roi)
-                quality = (basic_quality + enhanced_quality) / 2
-                
-                # 创建人脸信息
-                face_info = FaceInfo(
-                    bbox=(x1, y1, x2, y2),
-                    confidence=float(face.det_score),
-                    age=int(face.age),
-                    age_raw=float(face.age),
-                    age_confidence=0.9 * quality,  # InsightFace年龄预测较准确
-                    gender='Male' if face.gender == 1 else 'Female',
-                    gender_confidence=0.9,  # InsightFace性别预测很准确
-                    landmarks=face.kps.astype(int).tolist() if hasattr(face, 'kps') else None,
-                    embedding=face.embedding if hasattr(face, 'embedding') else None,
-                    face_quality=quality
-                )
-                
-                # 基于性别校正年龄
-                corrected_age = self.age_optimizer.correct_age_by_gender(face_info.age_raw, face_info.gender)
-                face_info.age = int(round(corrected_age))
-                
-                face_infos.append(face_info)
+            return self._to_face_infos(frame, faces)
+            
+        except Exception as e:
+            logger.error(f"InsightFace人脸检测失败: {e}")
+            return []
+    
+    def detect_faces_in_tracks(self, frame: np.ndarray, tracks: List) -> Optional[List[FaceInfo]]:
+        """
+        只在人员上半身区域检测人脸：各轨迹的ROI拼接为一张马赛克，检测器只运行一次，
+        结果映射回原图坐标并设置 face.track_id
+        
+        Args:
+            frame: 输入图像
+            tracks: 已确认的人员轨迹列表（带 track_id 和 bbox）
             
+        Returns:
+            人脸信息列表；马赛克放不下所有ROI时返回None（调用方应退回整帧检测）
+        """
+        if self.app is None or not tracks:
+            return []
+        
+        person_boxes = [track.bbox for track in tracks]
+        canvas_size = tuple(getattr(self.app.det_model, 'input_size', None) or (640, 640))
+        mosaic = build_mosaic(frame, person_boxes, canvas_size)
+        if mosaic is None:
+            return None
+        
+        try:
+            with self._model_lock:
+                bboxes, kpss = self.app.det_model.detect(mosaic.image, max_num=0, metric='default')
+            detections = map_detections(mosaic, bboxes, kpss, person_boxes)
+            if not detections:
+                return []
+            
+            face_infos = []
+            for owner, bbox, kps in detections:
+                faces = self._analyze_face_regions(frame, [(bbox, kps)])
+                for face_info in self._to_face_infos(frame, faces):
+                    face_info.track_id = tracks[owner].track_id
+                    face_infos.append(face_info)
             return face_infos
             
         except Exception as e:
-            logger.error(f"InsightFace人脸检测失败: {e}")
+            logger.error(f"InsightFace ROI人脸检测失败: {e}")
             return []
+    
+    def _to_face_infos(self, frame: np.ndarray, faces: list) -> List[FaceInfo]:
+        """InsightFace Face对象 -> FaceInfo（计算质量并按性别校正年龄）"""
+        face_infos = []
+        for face in faces:
+            # 获取边界框
+            bbox = face.bbox.astype(int)
+            x1, y1, x2, y2 = bbox
+            
+            # 获取人脸区域
+            face_roi = frame[y1:y2, x1:x2]
+            
+            # 计算人脸质量
+            # 计算增强的人脸质量
+            basic_quality = self.age_optimizer.calculate_face_quality(face_roi, tuple(bbox))
+            enhanced_quality = self.calculate_face_quality_score(face_roi)
+            quality = (basic_quality + enhanced_quality) / 2
+            
+            # 创建人脸信息
+            face_info = FaceInfo(
+                bbox=(x1, y1, x2, y2),
+                confidence=float(face.det_score),
+                age=int(face.age),
+                age_raw=float(face.age),
+                age_confidence=0.9 * quality,  # InsightFace年龄预测较准确
+                gender='Male' if face.gender == 1 else 'Female',
+                gender_confidence=0.9,  # InsightFace性别预测很准确
+                landmarks=face.kps.astype(int).tolist() if hasattr(face, 'kps') else None,
+                embedding=face.embedding if hasattr(face, 'embedding') else None,
+                face_quality=quality
+            )
+            
+            # 基于性别校正年龄
+            corrected_age = self.age_optimizer.correct_age_by_gender(face_info.age_raw, face_info.gender)
+            face_info.age = int(round(corrected_age))
+            
+            face_infos.append(face_info)
+        
+        return face_infos
 
 class FaceAnalyzer:
     """人脸分析器主类，支持多种后端"""
     
-    def __init__(self, use_insightface: bool = True):
+    def __init__(self, use_insightface: bool = True,
+                 preprocess_mode: str = InsightFaceAnalyzer.PREPROCESS_FACE_REGION,
+                 shared_models: bool = False, roi_detection: bool = False):
         """
         初始化人脸分析器
         
         Args:
             use_insightface: 是否使用InsightFace（默认True，使用高精度模式）
+            preprocess_mode: InsightFace预处理模式，'face_region'（默认）或 'full_frame'
+            shared_models: 是否使用进程内共享的InsightFace模型
+            roi_detection: 有人员轨迹时只在人员上半身区域检测人脸（仅InsightFace）
         """
         self.use_insightface = use_insightface
+        self.roi_detection = roi_detection
         self.analyzer = None
         self.age_histories: Dict[int, AgeHistory] = {}
+        self.demographics = None  # 人口统计聚合器（由IntegratedAnalyzer设置）
         
         try:
             if use_insightface:
-                self.analyzer = InsightFaceAnalyzer()
+                self.analyzer = InsightFaceAnalyzer(preprocess_mode=preprocess_mode,
+                                                    shared=shared_models)
                 logger.info("使用InsightFace人脸分析器")
             else:
                 self.analyzer = OpenCVFaceAnalyzer()
@@ -760,63 +934,47 @@ class FaceAnalyzer:
         """
         检测人脸并关联到跟踪的人员
         """
-        faces = self.detect_faces(frame)
-        
-        if person_tracks:
-            # 将人脸与跟踪的人员关联
-            for face in faces:
-                person_id = self._match_face_to_person(face, person_tracks)
-                if person_id is not None:
-                    # 更新年龄历史
-                    if hasattr(self.analyzer, 'age_optimizer'):
-                        self.analyzer.age_optimizer.update_age_history(
-                            person_id, face.age_raw or face.age, 
-                            face.age_confidence or 0.5, face.face_quality or 0.5
-                        )
-                        
-                        # 获取优化后的年龄
-                        optimized_age, optimized_conf = self.analyzer.age_optimizer.get_optimized_age(person_id)
-                        face.age = optimized_age
-                        face.age_confidence = optimized_conf
-        
+        faces = self.detect_faces_for_tracks(frame, person_tracks)
+        self.update_age_histories(faces)
         return faces
     
-    def _match_face_to_person(self, face: FaceInfo, person_tracks: Dict[int, any]) -> Optional[int]:
+    def detect_faces_for_tracks(self, frame: np.ndarray, person_tracks: Dict[int, any] = None) -> List[FaceInfo]:
         """
-        将人脸匹配到跟踪的人员
-        
-        Args:
-            face: 人脸信息
-            person_tracks: 人员跟踪信息
-            
-        Returns:
-            匹配的人员ID，如果没有匹配则返回None
+        检测人脸并设置 face.track_id（不修改年龄历史，可在工作线程中调用）
         """
-        face_center = (
-            (face.bbox[0] + face.bbox[2]) // 2,
-            (face.bbox[1] + face.bbox[3]) // 2
-        )
+        faces = None
+        if person_tracks and self.roi_detection and hasattr(self.analyzer, 'detect_faces_in_tracks'):
+            # 只在人员ROI内检测，结果已带有face.track_id，无需再做关联
+            faces = self.analyzer.detect_faces_in_tracks(frame, list(person_tracks.values()))
         
-        min_distance = float('inf')
-        matched_person_id = None
+        if faces is None:
+            faces = self.detect_faces(frame)
+            if person_tracks:
+                # 将人脸与跟踪的人员关联（最优一对一分配，结果写入face.track_id供后续复用）
+                assign_faces_to_tracks(faces, list(person_tracks.values()))
         
-        for person_id, track_info in person_tracks.items():
-            if hasattr(track_info, 'bbox'):
-                track_center = (
-                    (track_info.bbox[0] + track_info.bbox[2]) // 2,
-                    (track_info.bbox[1] + track_info.bbox[3]) // 2
-                )
-                
-                distance = np.sqrt(
-                    (face_center[0] - track_center[0]) ** 2 + 
-                    (face_center[1] - track_center[1]) ** 2
+        return faces
+    
+    def update_age_histories(self, faces: List[FaceInfo]):
+        """
+        将已关联人员的人脸计入年龄历史，并用多帧融合后的年龄替换单帧结果
+        """
+        if not hasattr(self.analyzer, 'age_optimizer'):
+            return
+        
+        for face in faces:
+            person_id = face.track_id
+            if person_id is not None:
+                # 更新年龄历史
+                self.analyzer.age_optimizer.update_age_history(
+                    person_id, face.age_raw or face.age, 
+                    face.age_confidence or 0.5, face.face_quality or 0.5
                 )
                 
-                if distance < min_distance and distance < 100:  # 阈值可调整
-                    min_distance = distance
-                    matched_person_id = person_id
-        
-        return matched_person_id
+                # 获取优化后的年龄
+                optimized_age, optimized_conf = self.analyzer.age_optimizer.get_optimized_age(person_id)
+                face.age = optimized_age
+                face.age_confidence = optimized_conf
     
     def get_age_statistics(self) -> Dict:
         """
@@ -825,6 +983,22 @@ class FaceAnalyzer:
         Returns:
             年龄统计字典
         """
+        if self.demographics is not None:
+            # 人员档案的增量聚合结果（O(1)，性别为实际统计值）
+            total_people = self.demographics.age_count
+            male = self.demographics.get_gender_count('Male')
+            female = self.demographics.get_gender_count('Female')
+            return {
+                'total_people': total_people,
+                'age_groups': self.demographics.age_distribution('face'),
+                'average_age': self.demographics.avg_age or 0,
+                'gender_distribution': {
+                    'Male': male,
+                    'Female': female,
+                    'Unknown': max(total_people - male - female, 0)
+                }
+            }
+        
         if not hasattr(self.analyzer, 'age_optimizer') or not self.analyzer.age_optimizer.age_histories:
             return {
                 'total_people': 0,
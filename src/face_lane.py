@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步人脸分析通道
+跟踪循环提交（人员区域裁剪图, 轨迹, 帧序号）任务后立即返回，人脸分析在独立工作线程中运行；
+结果带有原始帧序号，由跟踪循环在后续帧取回并合并到人员档案和年龄历史，
+使主循环的延迟只取决于人员检测和跟踪
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 裁剪区域在人员框并集外的边距（相对最大人员框的宽高，覆盖人脸ROI的外扩）
+CROP_MARGIN = 0.15
+
+@dataclass
+class FaceJob:
+    """人脸分析任务"""
+    frame_index: int
+    image: np.ndarray                 # 人员区域裁剪图（副本）
+    offset: Tuple[int, int]           # 裁剪图左上角在原图中的坐标
+    tracks: List                      # 原图坐标的轨迹（合并结果时使用）
+    local_tracks: List                # 裁剪图坐标的轨迹（分析时使用）
+    selected: List                    # 调度器选中的轨迹
+    submitted_at: float
+
+@dataclass
+class FaceLaneResult:
+    """人脸分析结果（坐标已映射回原图）"""
+    frame_index: int
+    faces: List
+    tracks: List
+    selected: List
+    elapsed_ms: float                 # 分析耗时
+    latency_ms: float                 # 从提交到完成的时间
+
+def crop_to_tracks(frame: np.ndarray, tracks: List,
+                   margin: float = CROP_MARGIN) -> Tuple[np.ndarray, Tuple[int, int], List]:
+    """
+    复制覆盖所有人员框的最小区域，并将轨迹坐标平移到裁剪图坐标系
+
+    Returns:
+        (裁剪图副本, 左上角坐标, 平移后的轨迹)；没有轨迹时复制整帧
+    """
+    if not tracks:
+        return frame.copy(), (0, 0), []
+
+    boxes = np.array([track.bbox for track in tracks], dtype=np.float32)
+    x1, y1 = boxes[:, 0].min(), boxes[:, 1].min()
+    x2, y2 = boxes[:, 2].max(), boxes[:, 3].max()
+    pad_x = (boxes[:, 2] - boxes[:, 0]).max() * margin
+    pad_y = (boxes[:, 3] - boxes[:, 1]).max() * margin
+    frame_height, frame_width = frame.shape[:2]
+    cx1 = int(max(0, np.floor(x1 - pad_x)))
+    cy1 = int(max(0, np.floor(y1 - pad_y)))
+    cx2 = int(min(frame_width, np.ceil(x2 + pad_x)))
+    cy2 = int(min(frame_height, np.ceil(y2 + pad_y)))
+    if cx2 <= cx1 or cy2 <= cy1:
+        return frame.copy(), (0, 0), list(tracks)
+
+    local_tracks = []
+    for track in tracks:
+        bx1, by1, bx2, by2 = track.bbox
+        local_tracks.append(replace(track, bbox=(bx1 - cx1, by1 - cy1, bx2 - cx1, by2 - cy1),
+                                    center=(track.center[0] - cx1, track.center[1] - cy1)))
+    return frame[cy1:cy2, cx1:cx2].copy(), (cx1, cy1), local_tracks
+
+def shift_faces(faces: List, offset: Tuple[int, int]):
+    """将裁剪图坐标的人脸框和关键点平移回原图坐标"""
+    ox, oy = offset
+    if ox == 0 and oy == 0:
+        return
+    for face in faces:
+        x1, y1, x2, y2 = face.bbox
+        face.bbox = (x1 + ox, y1 + oy, x2 + ox, y2 + oy)
+        if face.landmarks is not None:
+            face.landmarks = [[x + ox, y + oy] for x, y in face.landmarks]
+
+class FaceLane:
+    """单工作线程的人脸分析通道"""
+
+    def __init__(self, analyze: Callable[[np.ndarray, Dict[int, object]], List],
+                 max_pending: int = 1, name: str = 'face-lane'):
+        """
+        Args:
+            analyze: 人脸分析函数 (图像, 轨迹ID -> 轨迹) -> 带track_id的人脸列表，
+                     在工作线程中调用，不应修改跟踪循环的共享状态
+            max_pending: 最多排队的任务数（不含正在分析的任务），已满时丢弃新任务
+            name: 工作线程名称
+        """
+        self.analyze = analyze
+        self.max_pending = max_pending
+
+        self._pending: deque = deque()
+        self._completed: deque = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._in_flight = False
+        self._closed = False
+
+        # 统计信息
+        self.submitted = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_elapsed = 0.0
+        self.max_latency = 0.0
+        self.max_frames_behind = 0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """队列已满（新任务会被丢弃）"""
+        with self._cond:
+            return len(self._pending) >= self.max_pending
+
+    def submit(self, frame_index: int, frame: np.ndarray, tracks: List, selected: List = None) -> bool:
+        """
+        提交人脸分析任务（复制人员区域后立即返回）
+
+        Args:
+            frame_index: 帧序号
+            frame: 当前帧（调用返回后可被复用）
+            tracks: 需要分析并关联人脸的轨迹
+            selected: 调度器选中的轨迹
+
+        Returns:
+            任务是否进入队列
+        """
+        with self._cond:
+            if self._closed or len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+
+        image, offset, local_tracks = crop_to_tracks(frame, tracks)
+        job = FaceJob(frame_index=frame_index, image=image, offset=offset, tracks=list(tracks),
+                      local_tracks=local_tracks, selected=list(selected or []),
+                      submitted_at=time.monotonic())
+        with self._cond:
+            self._pending.append(job)
+            self.submitted += 1
+            self._cond.notify_all()
+        return True
+
+    def poll(self, current_frame: int = None) -> List[FaceLaneResult]:
+        """取回已完成的结果（不等待），按提交顺序"""
+        with self._cond:
+            results = list(self._completed)
+            self._completed.clear()
+        if current_frame is not None:
+            for result in results:
+                self.max_frames_behind = max(self.max_frames_behind, current_frame - result.frame_index)
+        return results
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                job = self._pending.popleft()
+                self._in_flight = True
+
+            start = time.monotonic()
+            try:
+                faces = self.analyze(job.image, {track.track_id: track for track in job.local_tracks})
+                shift_faces(faces, job.offset)
+            except Exception as e:
+                faces = None
+                logger.error(f"异步人脸分析失败 (帧 {job.frame_index}): {e}")
+            finished = time.monotonic()
+
+            with self._cond:
+                self._in_flight = False
+                if faces is None:
+                    self.failed += 1
+                else:
+                    self._completed.append(FaceLaneResult(
+                        frame_index=job.frame_index, faces=faces, tracks=job.tracks,
+                        selected=job.selected, elapsed_ms=(finished - start) * 1000,
+                        latency_ms=(finished - job.submitted_at) * 1000
+                    ))
+                    self.completed += 1
+                    self.total_elapsed += finished - start
+                    self.max_latency = max(self.max_latency, finished - job.submitted_at)
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """等待已提交的任务全部完成（结果仍需poll取回）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._in_flight:
+                if not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        """完成剩余任务后停止工作线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"人脸分析线程未在{timeout}秒内结束")
+
+    def get_statistics(self) -> Dict:
+        """获取任务数、耗时和滞后帧数等统计信息"""
+        with self._cond:
+            pending = len(self._pending)
+            in_flight = self._in_flight
+        completed = max(self.completed, 1)
+        return {
+            'pending': pending,
+            'in_flight': in_flight,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'avg_analysis_ms': self.total_elapsed / completed * 1000,
+            'max_latency_ms': self.max_latency * 1000,
+            'max_frames_behind': self.max_frames_behind
+        }
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人员ROI引导的人脸检测辅助模块
+从已确认轨迹的人员框中裁出上半身区域（外扩），按行排布拼接为一张马赛克图，
+人脸检测器只在马赛克上运行一次；检测结果映射回原图坐标并带上所属轨迹ID
+"""
+
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 人员框顶部用于检测人脸的高度比例
+HEAD_REGION_RATIO = 0.45
+
+# ROI外扩比例（相对ROI宽高）
+ROI_PADDING = 0.15
+
+# 马赛克中图块之间的间隔（像素），避免检测框跨越相邻图块
+TILE_GAP = 8
+
+# 依次尝试的图块最长边，人数较多时缩小图块以放入一张马赛克
+TILE_SIZES = (256, 192, 128)
+
+# 图块最大放大倍数（远处的小人脸适当放大有利于检测）
+MAX_UPSCALE = 2.0
+
+# 同一人脸出现在多个重叠人员ROI中时的去重阈值
+DUPLICATE_IOU = 0.5
+
+@dataclass
+class Tile:
+    """马赛克中的一个图块"""
+    owner: int                          # 所属人员下标
+    roi: Tuple[int, int, int, int]      # 原图坐标 (x1, y1, x2, y2)
+    offset: Tuple[int, int]             # 图块在马赛克中的左上角
+    size: Tuple[int, int]               # 图块宽高
+    scale: float                        # 马赛克坐标 = (原图坐标 - roi左上角) * scale
+
+@dataclass
+class FaceMosaic:
+    """拼接后的检测输入"""
+    image: np.ndarray
+    tiles: List[Tile]
+
+def head_roi(bbox: Sequence[float], frame_shape: Tuple[int, ...],
+             head_ratio: float = HEAD_REGION_RATIO,
+             padding: float = ROI_PADDING) -> Optional[Tuple[int, int, int, int]]:
+    """
+    人员框上部的人脸搜索区域（外扩并裁剪到图像范围内）
+
+    Args:
+        bbox: 人员框 (x1, y1, x2, y2)
+        frame_shape: 图像形状
+        head_ratio: 取人员框顶部的高度比例
+        padding: 外扩比例
+
+    Returns:
+        (x1, y1, x2, y2)，区域为空时返回None
+    """
+    frame_height, frame_width = frame_shape[:2]
+    x1, y1, x2, y2 = bbox
+    width = x2 - x1
+    height = (y2 - y1) * head_ratio
+    pad_x = width * padding
+    pad_y = height * padding
+
+    rx1 = int(max(0, np.floor(x1 - pad_x)))
+    ry1 = int(max(0, np.floor(y1 - pad_y)))
+    rx2 = int(min(frame_width, np.ceil(x2 + pad_x)))
+    ry2 = int(min(frame_height, np.ceil(y1 + height + pad_y)))
+    if rx2 <= rx1 or ry2 <= ry1:
+        return None
+    return rx1, ry1, rx2, ry2
+
+def _layout(rois: List[Tuple[int, int, int, int]], canvas_size: Tuple[int, int],
+            tile_size: int) -> Optional[List[Tuple[Tuple[int, int], Tuple[int, int], float]]]:
+    """
+    按行（shelf）排布图块，放不下时返回None
+
+    Returns:
+        [(左上角, 宽高, 缩放比例), ...]，与rois一一对应
+    """
+    canvas_width, canvas_height = canvas_size
+    placements = []
+    cursor_x, cursor_y, shelf_height = 0, 0, 0
+    for x1, y1, x2, y2 in rois:
+        width, height = x2 - x1, y2 - y1
+        scale = min(tile_size / max(width, height), MAX_UPSCALE)
+        tile_w = max(1, int(round(width * scale)))
+        tile_h = max(1, int(round(height * scale)))
+
+        if cursor_x + tile_w > canvas_width:
+            cursor_x = 0
+            cursor_y += shelf_height + TILE_GAP
+            shelf_height = 0
+        if cursor_x + tile_w > canvas_width or cursor_y + tile_h > canvas_height:
+            return None
+
+        placements.append(((cursor_x, cursor_y), (tile_w, tile_h), scale))
+        cursor_x += tile_w + TILE_GAP
+        shelf_height = max(shelf_height, tile_h)
+    return placements
+
+def build_mosaic(frame: np.ndarray, person_boxes: Sequence[Sequence[float]],
+                 canvas_size: Tuple[int, int] = (640, 640)) -> Optional[FaceMosaic]:
+    """
+    将所有人员的人脸搜索区域拼接为一张检测输入
+
+    Args:
+        frame: 原图
+        person_boxes: 人员框列表
+        canvas_size: 马赛克宽高（与检测器输入尺寸一致，避免再次缩放）
+
+    Returns:
+        FaceMosaic；没有有效区域或一张马赛克放不下时返回None（调用方应退回整帧检测）
+    """
+    owners, rois = [], []
+    for index, bbox in enumerate(person_boxes):
+        roi = head_roi(bbox, frame.shape)
+        if roi is not None:
+            owners.append(index)
+            rois.append(roi)
+    if not rois:
+        return None
+
+    # 先放高的图块，行高更紧凑
+    order = sorted(range(len(rois)), key=lambda i: rois[i][3] - rois[i][1], reverse=True)
+    sorted_rois = [rois[i] for i in order]
+    placements = None
+    for tile_size in TILE_SIZES:
+        placements = _layout(sorted_rois, canvas_size, tile_size)
+        if placements is not None:
+            break
+    if placements is None:
+        return None
+
+    canvas_width, canvas_height = canvas_size
+    image = np.zeros((canvas_height, canvas_width) + frame.shape[2:], dtype=frame.dtype)
+    tiles = []
+    for i, (offset, size, scale) in zip(order, placements):
+        x1, y1, x2, y2 = rois[i]
+        ox, oy = offset
+        tile_w, tile_h = size
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        image[oy:oy + tile_h, ox:ox + tile_w] = cv2.resize(frame[y1:y2, x1:x2], (tile_w, tile_h),
+                                                          interpolation=interpolation)
+        tiles.append(Tile(owner=owners[i], roi=rois[i], offset=offset, size=size, scale=scale))
+    return FaceMosaic(image=image, tiles=tiles)
+
+def _iou(box_a: np.ndarray, box_b: np.ndarray) -> float:
+    inter_w = max(0.0, min(box_a[2], box_b[2]) - max(box_a[0], box_b[0]))
+    inter_h = max(0.0, min(box_a[3], box_b[3]) - max(box_a[1], box_b[1]))
+    inter = inter_w * inter_h
+    union = ((box_a[2] - box_a[0]) * (box_a[3] - box_a[1]) +
+             (box_b[2] - box_b[0]) * (box_b[3] - box_b[1]) - inter)
+    return inter / union if union > 0 else 0.0
+
+def map_detections(mosaic: FaceMosaic, bboxes: np.ndarray, kpss: Optional[np.ndarray],
+                   person_boxes: Sequence[Sequence[float]]) -> List[Tuple[int, np.ndarray, Optional[np.ndarray]]]:
+    """
+    将马赛克上的检测结果映射回原图，每个人员最多保留一张人脸
+
+    Args:
+        mosaic: build_mosaic 的结果
+        bboxes: (N, 5) 马赛克坐标的检测框 x1, y1, x2, y2, score
+        kpss: (N, K, 2) 马赛克坐标的关键点，可为None
+        person_boxes: 人员框列表（与build_mosaic的输入相同）
+
+    Returns:
+        [(人员下标, (5,) 原图坐标检测框, 原图坐标关键点), ...]
+    """
+    if bboxes is None or len(bboxes) == 0:
+        return []
+
+    # 1. 按检测框中心所在图块归属人员，每个图块保留得分最高的人脸
+    best = {}
+    centers_x = (bboxes[:, 0] + bboxes[:, 2]) / 2
+    centers_y = (bboxes[:, 1] + bboxes[:, 3]) / 2
+    for tile_index, tile in enumerate(mosaic.tiles):
+        ox, oy = tile.offset
+        tile_w, tile_h = tile.size
+        inside = ((centers_x >= ox) & (centers_x < ox + tile_w) &
+                  (centers_y >= oy) & (centers_y < oy + tile_h))
+        candidates = np.nonzero(inside)[0]
+        if len(candidates) > 0:
+            best[tile_index] = int(candidates[np.argmax(bboxes[candidates, 4])])
+
+    # 2. 映射回原图坐标
+    results = []
+    for tile_index, det_index in best.items():
+        tile = mosaic.tiles[tile_index]
+        ox, oy = tile.offset
+        tile_w, tile_h = tile.size
+        rx1, ry1 = tile.roi[0], tile.roi[1]
+
+        bbox = bboxes[det_index].astype(np.float32).copy()
+        bbox[[0, 2]] = np.clip(bbox[[0, 2]], ox, ox + tile_w)
+        bbox[[1, 3]] = np.clip(bbox[[1, 3]], oy, oy + tile_h)
+        bbox[[0, 2]] = (bbox[[0, 2]] - ox) / tile.scale + rx1
+        bbox[[1, 3]] = (bbox[[1, 3]] - oy) / tile.scale + ry1
+
+        kps = None
+        if kpss is not None:
+            kps = kpss[det_index].astype(np.float32).copy()
+            kps[:, 0] = (kps[:, 0] - ox) / tile.scale + rx1
+            kps[:, 1] = (kps[:, 1] - oy) / tile.scale + ry1
+        results.append((tile.owner, bbox, kps))
+
+    # 3. 重叠人员框中同一张人脸只归属一个人员：保留人脸中心离人员框顶部中点较近者
+    def head_distance(item) -> float:
+        owner, bbox, _ = item
+        px1, py1, px2, py2 = person_boxes[owner]
+        face_cx = (bbox[0] + bbox[2]) / 2
+        face_cy = (bbox[1] + bbox[3]) / 2
+        return float(np.hypot(face_cx - (px1 + px2) / 2, face_cy - py1) / max(py2 - py1, 1.0))
+
+    results.sort(key=head_distance)
+    kept = []
+    for item in results:
+        if all(_iou(item[1], other[1]) < DUPLICATE_IOU for other in kept):
+            kept.append(item)
+    kept.sort(key=lambda item: item[0])
+    return kept
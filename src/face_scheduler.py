@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按轨迹调度的人脸分析模块
+为每条轨迹维护“属性需求”评分（样本数、AgeHistory年龄方差、最佳人脸质量、距上次采样时间），
+每帧在固定预算（人数或毫秒）内优先分析最需要的轨迹；新轨迹立即分析，估计已收敛的轨迹停止采样
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TrackAttributeState:
+    """单条轨迹的人脸采样状态"""
+    track_id: int
+    first_seen: float
+    last_seen: float
+    samples: int = 0                       # 得到人脸的次数
+    attempts: int = 0                      # 尝试分析的次数
+    best_quality: float = 0.0              # 目前最佳人脸质量
+    last_sample: Optional[float] = None    # 最近一次得到人脸的时间
+    last_attempt: Optional[float] = None   # 最近一次尝试分析的时间
+    converged: bool = False
+
+class FaceScheduler:
+    """人脸分析预算调度器"""
+
+    def __init__(self, max_tracks_per_frame: int = 3, budget_ms: Optional[float] = None,
+                 min_samples: int = 5, converged_age_std: float = 4.0,
+                 converged_quality: float = 0.5, retry_interval: float = 0.5,
+                 stale_after: float = 10.0, forget_after: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_tracks_per_frame: 每帧最多分析的轨迹数
+            budget_ms: 每帧人脸分析的时间预算（毫秒），None表示只按人数限制
+            min_samples: 判定收敛所需的最少人脸样本数
+            converged_age_std: 年龄历史标准差不超过该值视为收敛
+            converged_quality: 最佳人脸质量达到该值才视为收敛
+            retry_interval: 同一轨迹两次分析的最小间隔（秒），避免背对镜头的人占满预算
+            stale_after: 距上次采样超过该时间（秒）时陈旧度达到最大
+            forget_after: 轨迹消失超过该时间（秒）后删除其状态
+            clock: 时钟函数（秒）
+        """
+        self.max_tracks_per_frame = max_tracks_per_frame
+        self.budget_ms = budget_ms
+        self.min_samples = min_samples
+        self.converged_age_std = converged_age_std
+        self.converged_quality = converged_quality
+        self.retry_interval = retry_interval
+        self.stale_after = stale_after
+        self.forget_after = forget_after
+        self.clock = clock
+
+        self.states: Dict[int, TrackAttributeState] = {}
+        self.cost_per_track_ms: Optional[float] = None  # 单条轨迹分析耗时的滑动平均
+        self.frames_scheduled = 0
+        self.tracks_analyzed = 0
+
+    def _age_std(self, history) -> Optional[float]:
+        if history is None:
+            return None
+        return history.window.age_std()
+
+    def _is_converged(self, state: TrackAttributeState, history) -> bool:
+        if state.samples < self.min_samples or state.best_quality < self.converged_quality:
+            return False
+        age_std = self._age_std(history)
+        return age_std is not None and age_std <= self.converged_age_std
+
+    def need_score(self, state: TrackAttributeState, history, now: float) -> float:
+        """
+        属性需求评分，越高越需要分析
+
+        由四部分组成（各自归一化到0~1）：样本不足、年龄方差、质量不足、距上次采样的时间
+        """
+        sample_need = max(0, self.min_samples - state.samples) / self.min_samples
+        age_std = self._age_std(history)
+        variance_need = 1.0 if age_std is None else min(1.0, age_std / (2 * self.converged_age_std))
+        quality_need = 1.0 - min(1.0, state.best_quality)
+        since = now - (state.last_sample if state.last_sample is not None else state.first_seen)
+        staleness = min(1.0, since / self.stale_after)
+        return 2.0 * sample_need + variance_need + quality_need + 0.5 * staleness
+
+    def _frame_capacity(self) -> int:
+        """本帧可分析的轨迹数"""
+        capacity = self.max_tracks_per_frame
+        if self.budget_ms is not None and self.cost_per_track_ms:
+            capacity = min(capacity, max(1, int(self.budget_ms // self.cost_per_track_ms)))
+        return capacity
+
+    def select(self, tracks: List, age_histories: Dict[int, object] = None) -> List:
+        """
+        选出本帧需要做人脸分析的轨迹
+
+        Args:
+            tracks: 当前帧的人员轨迹（带 track_id）
+            age_histories: 轨迹ID -> AgeHistory
+
+        Returns:
+            需要分析的轨迹列表（新轨迹优先，其余按需求评分降序）
+        """
+        now = self.clock()
+        age_histories = age_histories or {}
+
+        new_tracks, candidates = [], []
+        for track in tracks:
+            state = self.states.get(track.track_id)
+            if state is None:
+                state = TrackAttributeState(track_id=track.track_id, first_seen=now, last_seen=now)
+                self.states[track.track_id] = state
+            state.last_seen = now
+
+            history = age_histories.get(track.track_id)
+            state.converged = self._is_converged(state, history)
+            if state.converged:
+                continue
+            if state.attempts == 0:
+                new_tracks.append(track)
+            elif now - state.last_attempt >= self.retry_interval:
+                candidates.append((self.need_score(state, history, now), track))
+
+        # 清理长时间未出现的轨迹
+        for track_id in [tid for tid, s in self.states.items() if now - s.last_seen > self.forget_after]:
+            del self.states[track_id]
+
+        # 新轨迹立即分析，不受预算限制
+        capacity = max(0, self._frame_capacity() - len(new_tracks))
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        selected = new_tracks + [track for _, track in candidates[:capacity]]
+
+        for track in selected:
+            state = self.states[track.track_id]
+            state.attempts += 1
+            state.last_attempt = now
+        if selected:
+            self.frames_scheduled += 1
+            self.tracks_analyzed += len(selected)
+        return selected
+
+    def record(self, selected: List, faces: List, elapsed_ms: float):
+        """
+        记录本帧的分析结果
+
+        Args:
+            selected: select 返回的轨迹
+            faces: 分析得到的人脸（带 track_id）
+            elapsed_ms: 人脸分析耗时
+        """
+        now = self.clock()
+        for face in faces:
+            state = self.states.get(face.track_id)
+            if state is None:
+                continue
+            state.samples += 1
+            state.last_sample = now
+            if face.face_quality is not None:
+                state.best_quality = max(state.best_quality, face.face_quality)
+
+        if selected:
+            cost = elapsed_ms / len(selected)
+            if self.cost_per_track_ms is None:
+                self.cost_per_track_ms = cost
+            else:
+                self.cost_per_track_ms = 0.8 * self.cost_per_track_ms + 0.2 * cost
+
+    def get_statistics(self) -> Dict:
+        """调度统计"""
+        return {
+            'tracked': len(self.states),
+            'converged': sum(1 for s in self.states.values() if s.converged),
+            'frames_scheduled': self.frames_scheduled,
+            'tracks_analyzed': self.tracks_analyzed,
+            'cost_per_track_ms': round(self.cost_per_track_ms, 2) if self.cost_per_track_ms else None,
+            'frame_capacity': self._frame_capacity()
+        }
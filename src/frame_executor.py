@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帧处理执行器模块
+将会话的帧分析等耗时调用派发到有界线程池/进程池，保证同一会话内调用顺序，
+使asyncio事件循环只负责I/O
+"""
+
+import asyncio
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# 进程池模式：会话对象常驻在固定的工作进程中
+# ---------------------------------------------------------------------------
+
+_worker_sessions: Dict[str, Any] = {}
+
+def _worker_attach(session_key: str, factory, args: tuple, kwargs: dict):
+    """在工作进程中创建会话对象"""
+    _worker_sessions[session_key] = factory(*args, **kwargs)
+
+def _worker_call(session_key: str, method: str, args: tuple, kwargs: dict) -> Tuple[Any, Dict]:
+    """在工作进程中调用会话方法，返回 (结果, 会话状态)"""
+    session = _worker_sessions[session_key]
+    result = getattr(session, method)(*args, **kwargs)
+    return result, session.export_state()
+
+def _worker_release(session_key: str):
+    """释放工作进程中的会话对象"""
+    session = _worker_sessions.pop(session_key, None)
+    if session is not None:
+        session.stop_analysis()
+
+class FrameExecutor:
+    """帧处理执行器"""
+
+    MODE_INLINE = 'inline'    # 直接在事件循环中执行（旧行为，仅用于对比测试）
+    MODE_THREAD = 'thread'    # 线程池执行（默认）
+    MODE_PROCESS = 'process'  # 会话固定到单工作进程分片执行
+
+    def __init__(self, mode: str = MODE_THREAD, max_workers: int = 4,
+                 max_pending: Optional[int] = None):
+        """
+        初始化帧处理执行器
+
+        Args:
+            mode: 执行模式，'thread'（默认）、'process' 或 'inline'
+            max_workers: 工作线程数/工作进程数
+            max_pending: 同时在途的最大调用数（默认 max_workers * 2）
+        """
+        if mode not in (self.MODE_INLINE, self.MODE_THREAD, self.MODE_PROCESS):
+            raise ValueError(f"未知的执行模式: {mode}")
+
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 2
+
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_shards: List[ProcessPoolExecutor] = []
+        if mode == self.MODE_THREAD:
+            self._thread_pool = ThreadPoolExecutor(max_workers=max_workers,
+                                                   thread_name_prefix='frame-worker')
+        elif mode == self.MODE_PROCESS:
+            # 每个分片只有一个进程，会话固定在分片上，天然保证顺序且状态常驻
+            self._process_shards = [ProcessPoolExecutor(max_workers=1) for _ in range(max_workers)]
+
+        # 按会话的顺序锁：asyncio.Lock按FIFO唤醒，保证同一会话的调用按提交顺序执行
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        # 按会话的互斥锁：与非异步调用方（如清理线程）互斥
+        self._session_mutexes: Dict[str, threading.Lock] = {}
+        self._pending: Optional[asyncio.Semaphore] = None
+
+        # 统计信息
+        self.submitted = 0
+        self.completed = 0
+        self.total_wait_time = 0.0
+        self.total_run_time = 0.0
+
+        logger.info(f"帧处理执行器初始化完成 - 模式: {mode}, 工作单元: {max_workers}")
+
+    def _get_session_lock(self, session_key: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session_key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_key] = lock
+        return lock
+
+    def _get_session_mutex(self, session_key: str) -> threading.Lock:
+        return self._session_mutexes.setdefault(session_key, threading.Lock())
+
+    def _get_shard(self, session_key: str) -> ProcessPoolExecutor:
+        index = zlib.crc32(session_key.encode('utf-8')) % len(self._process_shards)
+        return self._process_shards[index]
+
+    def _run_local(self, session, method: str, args: tuple, kwargs: dict):
+        """在当前线程中执行会话方法（持有会话互斥锁）"""
+        with self._get_session_mutex(session.user_id):
+            return getattr(session, method)(*args, **kwargs)
+
+    def attach(self, session):
+        """注册会话（进程池模式下在工作进程中创建对应的会话对象）"""
+        if self.mode == self.MODE_PROCESS:
+            self._get_shard(session.user_id).submit(
+                _worker_attach, session.user_id, type(session),
+                (session.user_id, session.username), {}
+            ).result()
+
+    def release(self, session):
+        """注销会话并释放资源"""
+        key = session.user_id
+        if self.mode == self.MODE_PROCESS:
+            self._get_shard(key).submit(_worker_release, key).result()
+        self._session_locks.pop(key, None)
+        self._session_mutexes.pop(key, None)
+
+    async def call(self, session, method: str, *args, **kwargs):
+        """
+        异步调用会话方法（不阻塞事件循环）
+
+        Args:
+            session: 用户会话对象（需提供 user_id，进程池模式下还需 export_state/import_state）
+            method: 方法名
+
+        Returns:
+            方法返回值
+        """
+        if self.mode == self.MODE_INLINE:
+            return getattr(session, method)(*args, **kwargs)
+
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+
+        loop = asyncio.get_running_loop()
+        key = session.user_id
+        queued_at = time.perf_counter()
+
+        async with self._get_session_lock(key):
+            async with self._pending:
+                started_at = time.perf_counter()
+                self.submitted += 1
+                try:
+                    if self.mode == self.MODE_THREAD:
+                        result = await loop.run_in_executor(
+                            self._thread_pool, self._run_local, session, method, args, kwargs
+                        )
+                    else:
+                        # memoryview（二进制帧负载）无法跨进程序列化
+                        args = tuple(bytes(arg) if isinstance(arg, memoryview) else arg for arg in args)
+                        result, state = await loop.run_in_executor(
+                            self._get_shard(key), _worker_call, key, method, args, kwargs
+                        )
+                        session.import_state(state)
+                    return result
+                finally:
+                    finished_at = time.perf_counter()
+                    self.completed += 1
+                    self.total_wait_time += started_at - queued_at
+                    self.total_run_time += finished_at - started_at
+
+    def call_sync(self, session, method: str, *args, **kwargs):
+        """同步调用会话方法（供后台线程使用，与异步调用互斥）"""
+        if self.mode == self.MODE_PROCESS:
+            result, state = self._get_shard(session.user_id).submit(
+                _worker_call, session.user_id, method, args, kwargs
+            ).result()
+            session.import_state(state)
+            return result
+        return self._run_local(session, method, args, kwargs)
+
+    def get_statistics(self) -> Dict:
+        """获取执行器统计信息"""
+        completed = max(self.completed, 1)
+        return {
+            'mode': self.mode,
+            'max_workers': self.max_workers,
+            'in_flight': self.submitted - self.completed,
+            'completed': self.completed,
+            'avg_wait_ms': self.total_wait_time / completed * 1000,
+            'avg_run_ms': self.total_run_time / completed * 1000
+        }
+
+    def shutdown(self):
+        """关闭执行器"""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False)
+        for shard in self._process_shards:
+            shard.shutdown(wait=False)
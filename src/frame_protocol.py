@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+二进制帧传输协议模块
+WebSocket二进制消息 = 16字节头部 + 原始JPEG字节，替代JSON中的base64 data URL；
+统计数据通过单独的紧凑文本消息发送
+
+头部格式（网络字节序）:
+    magic       2字节  b'PF'
+    version     1字节  协议版本
+    msg_type    1字节  消息类型（MSG_VIDEO_FRAME / MSG_FRAME_RESULT）
+    frame_id    4字节  帧序号（结果帧回传对应的输入帧序号）
+    timestamp   8字节  客户端采集时间戳（毫秒）
+"""
+
+import json
+import struct
+from typing import Dict, NamedTuple, Optional, Tuple
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROTOCOL_TEXT = 'text'
+PROTOCOL_BINARY = 'binary-v1'
+
+MAGIC = b'PF'
+VERSION = 1
+MSG_VIDEO_FRAME = 1   # 客户端 -> 服务端：待分析帧
+MSG_FRAME_RESULT = 2  # 服务端 -> 客户端：分析结果帧
+
+HEADER = struct.Struct('!2sBBIQ')
+HEADER_SIZE = HEADER.size
+
+class FrameProtocolError(ValueError):
+    """二进制帧格式错误"""
+
+class FrameHeader(NamedTuple):
+    """二进制帧头部"""
+    msg_type: int
+    frame_id: int
+    timestamp: int
+
+def encode_frame(msg_type: int, payload: bytes, frame_id: int = 0, timestamp: int = 0) -> bytes:
+    """
+    编码二进制帧消息
+
+    Args:
+        msg_type: 消息类型
+        payload: JPEG字节
+        frame_id: 帧序号
+        timestamp: 时间戳（毫秒）
+
+    Returns:
+        头部 + 负载
+    """
+    header = HEADER.pack(MAGIC, VERSION, msg_type, frame_id & 0xFFFFFFFF, timestamp)
+    return header + bytes(payload)
+
+def decode_frame(data: bytes) -> Tuple[FrameHeader, memoryview]:
+    """
+    解码二进制帧消息（负载以memoryview返回，不复制）
+
+    Args:
+        data: WebSocket二进制消息
+
+    Returns:
+        (头部, JPEG负载视图)
+    """
+    if len(data) < HEADER_SIZE:
+        raise FrameProtocolError(f"消息长度不足: {len(data)} 字节")
+
+    magic, version, msg_type, frame_id, timestamp = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise FrameProtocolError(f"无效的帧标识: {magic!r}")
+    if version != VERSION:
+        raise FrameProtocolError(f"不支持的协议版本: {version}")
+
+    return FrameHeader(msg_type, frame_id, timestamp), memoryview(data)[HEADER_SIZE:]
+
+def negotiate(requested) -> str:
+    """
+    根据客户端声明的协议列表选择传输协议
+
+    Args:
+        requested: 客户端connection消息中的protocols字段
+
+    Returns:
+        选定的协议名称（默认文本协议）
+    """
+    if isinstance(requested, (list, tuple)) and PROTOCOL_BINARY in requested:
+        return PROTOCOL_BINARY
+    return PROTOCOL_TEXT
+
+def encode_stats(frame_id: int, stats: Dict, overlay: Optional[Dict] = None) -> str:
+    """编码与结果帧配套的紧凑统计消息（叠加层模式下附带叠加层描述）"""
+    message = {'type': 'frame_stats', 'frame_id': frame_id, 'stats': stats}
+    if overlay is not None:
+        message['overlay'] = overlay
+    return json.dumps(message, separators=(',', ':'), ensure_ascii=False)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帧接收槽模块
+每个会话只保留最新一帧未解码数据（latest-frame-wins），分析跟不上采集速度时
+丢弃旧帧并计数，避免延迟无限增长
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class LatestFrameSlot:
+    """单帧接收槽"""
+
+    def __init__(self):
+        """初始化接收槽"""
+        self._frame: Optional[Any] = None
+        self._queued_at = 0.0
+        self._ready = asyncio.Event()
+        self._closed = False
+
+        # 统计信息
+        self.received_frames = 0
+        self.dropped_frames = 0
+        self.processed_frames = 0
+        self.last_queue_age = 0.0
+        self.last_processing_time = 0.0
+
+    def put(self, frame: Any) -> bool:
+        """
+        放入新帧（覆盖尚未处理的旧帧）
+
+        Args:
+            frame: 未解码的帧数据
+
+        Returns:
+            是否覆盖了旧帧
+        """
+        replaced = self._frame is not None
+        if replaced:
+            self.dropped_frames += 1
+        self._frame = frame
+        self._queued_at = time.perf_counter()
+        self.received_frames += 1
+        self._ready.set()
+        return replaced
+
+    async def get(self) -> Tuple[Optional[Any], float]:
+        """
+        等待并取出最新帧
+
+        Returns:
+            (帧数据, 排队时长秒)，接收槽关闭后返回 (None, 0.0)
+        """
+        while self._frame is None:
+            if self._closed:
+                return None, 0.0
+            self._ready.clear()
+            await self._ready.wait()
+
+        frame, self._frame = self._frame, None
+        self.last_queue_age = time.perf_counter() - self._queued_at
+        return frame, self.last_queue_age
+
+    def task_done(self, processing_time: float):
+        """记录一帧处理完成"""
+        self.processed_frames += 1
+        self.last_processing_time = processing_time
+
+    def close(self):
+        """关闭接收槽，唤醒等待方"""
+        self._closed = True
+        self._ready.set()
+
+    def get_statistics(self) -> Dict:
+        """获取接收统计（随frame_result下发给客户端用于节流）"""
+        return {
+            'received_frames': self.received_frames,
+            'processed_frames': self.processed_frames,
+            'dropped_frames': self.dropped_frames,
+            'drop_rate': self.dropped_frames / self.received_frames if self.received_frames else 0.0,
+            'queue_age_ms': self.last_queue_age * 1000,
+            'processing_ms': self.last_processing_time * 1000
+        }
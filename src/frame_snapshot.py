@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帧统计快照模块
+每处理一帧创建一个快照，各项统计在首次访问时计算并缓存，
+绘制、WebSocket响应、分析记录和REST统计接口共用同一份结果
+"""
+
+from typing import Callable, Dict
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SnapshotCounters:
+    """快照创建次数和各项统计的实际计算次数"""
+
+    def __init__(self):
+        self.snapshots = 0
+        self.computed: Dict[str, int] = {}
+        self.hits = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            'snapshots': self.snapshots,
+            'computed': dict(self.computed),
+            'hits': self.hits
+        }
+
+class FrameSnapshot:
+    """单帧统计快照（惰性计算，同一帧内只计算一次）"""
+
+    SECTIONS = ('realtime', 'behavior', 'zones', 'database', 'persistence')
+
+    def __init__(self, frame_number: int, providers: Dict[str, Callable[[], Dict]],
+                 counters: SnapshotCounters = None):
+        """
+        Args:
+            frame_number: 帧序号
+            providers: 统计项名称 -> 计算函数
+            counters: 计数器（由所属分析器持有）
+        """
+        self.frame_number = frame_number
+        self._providers = providers
+        self._values: Dict[str, Dict] = {}
+        self._counters = counters
+        if counters is not None:
+            counters.snapshots += 1
+
+    def get(self, section: str) -> Dict:
+        """获取统计项（首次访问时计算）"""
+        if section in self._values:
+            if self._counters is not None:
+                self._counters.hits += 1
+            return self._values[section]
+
+        value = self._providers[section]()
+        self._values[section] = value
+        if self._counters is not None:
+            self._counters.computed[section] = self._counters.computed.get(section, 0) + 1
+        return value
+
+    @property
+    def realtime(self) -> Dict:
+        return self.get('realtime')
+
+    @property
+    def behavior(self) -> Dict:
+        return self.get('behavior')
+
+    @property
+    def zones(self) -> Dict:
+        return self.get('zones')
+
+    @property
+    def database(self) -> Dict:
+        return self.get('database')
+
+    @property
+    def persistence(self) -> Dict:
+        return self.get('persistence')
+
+    @property
+    def age_distribution(self) -> Dict:
+        return self.realtime.get('age_distribution', {})
+
+    def to_dict(self) -> Dict:
+        """全部统计项（WebSocket响应和统计导出使用）"""
+        return {section: self.get(section) for section in self.SECTIONS}
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热力图累加模块
+使用预计算高斯核进行切片叠加，并采用惰性衰减避免每帧整图乘法
+"""
+
+import numpy as np
+from typing import Dict, Iterable, Optional, Tuple
+import logging
+import time
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def gaussian_kernel(radius: int, intensity: float = 1.0) -> np.ndarray:
+    """
+    生成圆形截断的高斯核
+
+    与原逐像素实现保持一致：sigma = radius / 3，距离大于radius的像素为0
+
+    Args:
+        radius: 核半径（像素）
+        intensity: 峰值强度
+
+    Returns:
+        (2r+1, 2r+1) 的float32高斯核
+    """
+    offsets = np.arange(-radius, radius + 1, dtype=np.float32)
+    dist_sq = offsets[np.newaxis, :] ** 2 + offsets[:, np.newaxis] ** 2
+    sigma = radius / 3
+    kernel = intensity * np.exp(-dist_sq / (2 * sigma ** 2))
+    kernel[dist_sq > radius ** 2] = 0.0
+    return kernel.astype(np.float32)
+
+class HeatmapAccumulator:
+    """热力图累加器"""
+
+    # 缩放因子低于该值时将其折算回数组，避免叠加值溢出
+    RENORMALIZE_THRESHOLD = 1e-6
+
+    def __init__(self, width: int, height: int, decay: float = 0.995,
+                 time_scaled: bool = False, reference_fps: float = 10.0):
+        """
+        初始化热力图累加器
+
+        Args:
+            width: 热力图宽度
+            height: 热力图高度
+            decay: 每帧衰减系数
+            time_scaled: 是否按实际经过时间衰减（否则按调用次数衰减）
+            reference_fps: 按时间衰减时，decay对应的参考帧率
+        """
+        self.width = width
+        self.height = height
+        self.decay = decay
+        self.time_scaled = time_scaled
+        self.reference_fps = reference_fps
+
+        # 存储值 = 真实热度 / scale，衰减只需更新scale
+        self._data = np.zeros((height, width), dtype=np.float32)
+        self._scale = 1.0
+        self._last_decay_time: Optional[float] = None
+
+        # 高斯核缓存 (radius, intensity) -> kernel
+        self._kernels: Dict[Tuple[int, float], np.ndarray] = {}
+
+    def _get_kernel(self, radius: int, intensity: float) -> np.ndarray:
+        """获取（缓存的）高斯核"""
+        key = (radius, intensity)
+        kernel = self._kernels.get(key)
+        if kernel is None:
+            kernel = gaussian_kernel(radius, intensity)
+            self._kernels[key] = kernel
+        return kernel
+
+    def step(self, now: Optional[float] = None):
+        """
+        推进一帧的衰减
+
+        Args:
+            now: 当前时间戳（秒），仅在time_scaled模式下使用
+        """
+        if self.time_scaled:
+            now = time.time() if now is None else now
+            if self._last_decay_time is None:
+                self._last_decay_time = now
+                return
+            elapsed_frames = max(0.0, now - self._last_decay_time) * self.reference_fps
+            self._last_decay_time = now
+            factor = self.decay ** elapsed_frames
+        else:
+            factor = self.decay
+
+        self._scale *= factor
+        if self._scale < self.RENORMALIZE_THRESHOLD:
+            self._renormalize()
+
+    def _renormalize(self):
+        """将缩放因子折算进数组"""
+        self._data *= self._scale
+        self._scale = 1.0
+
+    def add_point(self, x: int, y: int, intensity: float = 1.0, radius: int = 20):
+        """
+        在指定位置叠加高斯热度（边界处自动裁剪）
+
+        Args:
+            x: 中心X坐标
+            y: 中心Y坐标
+            intensity: 峰值强度
+            radius: 高斯半径
+        """
+        y_min = max(0, y - radius)
+        y_max = min(self.height, y + radius + 1)
+        x_min = max(0, x - radius)
+        x_max = min(self.width, x + radius + 1)
+        if y_min >= y_max or x_min >= x_max:
+            return
+
+        kernel = self._get_kernel(radius, intensity)
+        ky = y_min - (y - radius)
+        kx = x_min - (x - radius)
+        self._data[y_min:y_max, x_min:x_max] += (
+            kernel[ky:ky + (y_max - y_min), kx:kx + (x_max - x_min)] / self._scale
+        )
+
+    def add_points(self, points: Iterable[Tuple[int, int]], intensity: float = 1.0, radius: int = 20):
+        """批量叠加多个位置的热度"""
+        for x, y in points:
+            self.add_point(int(x), int(y), intensity=intensity, radius=radius)
+
+    def get(self) -> np.ndarray:
+        """获取当前热力图（真实值）"""
+        if self._scale == 1.0:
+            return self._data
+        return self._data * self._scale
+
+    def stored(self) -> np.ndarray:
+        """存储数组（真实值 / 缩放因子，不复制）；只用于与整体比例无关的计算，不要修改"""
+        return self._data
+
+    def normalized(self) -> np.ndarray:
+        """
+        归一化到0-255的uint8热力图（绘制用）
+
+        缩放因子在归一化中抵消，直接使用存储数组，不先复制出真实值
+        """
+        data_max = float(self._data.max())
+        if data_max <= 0:
+            return np.zeros(self._data.shape, dtype=np.uint8)
+        return (self._data * (255.0 / data_max)).astype(np.uint8)
+
+    def set(self, heatmap: np.ndarray):
+        """替换热力图数据（例如尺寸调整后）"""
+        self._data = np.ascontiguousarray(heatmap, dtype=np.float32)
+        self.height, self.width = self._data.shape[:2]
+        self._scale = 1.0
+
+    def max(self) -> float:
+        """获取热力图最大值"""
+        return float(self._data.max()) * self._scale
+
+    def reset(self):
+        """清空热力图"""
+        self._data.fill(0.0)
+        self._scale = 1.0
+        self._last_decay_time = None
@@ -7,14 +7,22 @@
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Deque
 import logging
+import time
 from dataclasses import dataclass, field
+from collections import deque
 from datetime import datetime
 
 from detector import PersonDetector
 from tracker import PersonTracker, PersonTrack
 from face_analyzer import FaceAnalyzer, FaceInfo
+from demographics import DemographicAggregator
+from running_stats import AgeEstimate, GenderVotes
+from association import assign_faces_to_tracks
+from face_scheduler import FaceScheduler
+from face_lane import FaceLane
+from motion_gate import MotionGate, STATIC_SCENE
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -28,12 +36,10 @@ class PersonProfile:
     last_seen: datetime
     total_frames: int = 0
     
-    # 人脸信息
+    # 人脸信息（累加和估计器，不保存完整历史）
     faces_detected: int = 0
-    age_estimates: List[int] = field(default_factory=list)
-    age_confidences: List[float] = field(default_factory=list)  # 年龄置信度
-    age_qualities: List[float] = field(default_factory=list)    # 人脸质量
-    gender_estimates: List[str] = field(default_factory=list)
+    age_stats: AgeEstimate = field(default_factory=AgeEstimate, repr=False)
+    gender_votes: GenderVotes = field(default_factory=GenderVotes, repr=False)
     
     # 统计属性
     avg_age: Optional[float] = None
@@ -42,85 +48,91 @@ class PersonProfile:
     dominant_gender: Optional[str] = None
     gender_confidence: float = 0.0
     
-    # 轨迹信息
-    positions: List[Tuple[int, int, datetime]] = field(default_factory=list)
+    # 轨迹信息（只保留最近100个位置）
+    positions: Deque[Tuple[int, int, datetime]] = field(default_factory=lambda: deque(maxlen=100))
+    
+    # 修订号：每次更新递增，持久化层据此判断档案自上次保存后是否变化
+    revision: int = 0
+    
+    # 人口统计聚合器：平均年龄或主要性别变化时通知
+    demographics: Optional[DemographicAggregator] = field(default=None, repr=False, compare=False)
     
     def update_face_info(self, face: FaceInfo):
         """更新人脸信息"""
+        self.revision += 1
         self.faces_detected += 1
         
         if face.age is not None:
-            self.age_estimates.append(face.age)
+            self.age_stats.add(face.age, face.age_confidence, face.face_quality)
             
-            # 更新年龄置信度
+            # 平均年龄置信度和平均人脸质量
             if face.age_confidence is not None:
-                self.age_confidences.append(face.age_confidence)
-                self.age_confidence = sum(self.age_confidences) / len(self.age_confidences)
-            
-            # 更新人脸质量
+                self.age_confidence = self.age_stats.avg_confidence
             if face.face_quality is not None:
-                self.age_qualities.append(face.face_quality)
-                self.avg_face_quality = sum(self.age_qualities) / len(self.age_qualities)
+                self.avg_face_quality = self.age_stats.avg_quality
             
-            # 计算加权平均年龄（基于置信度和质量）
-            if self.age_confidences and self.age_qualities:
-                weights = []
-                for conf, qual in zip(self.age_confidences, self.age_qualities):
-                    weight = conf * qual
-                    weights.append(weight)
-                
-                if sum(weights) > 0:
-                    weighted_sum = sum(age * weight for age, weight in zip(self.age_estimates, weights))
-                    total_weight = sum(weights)
-                    self.avg_age = weighted_sum / total_weight
-                else:
-                    self.avg_age = sum(self.age_estimates) / len(self.age_estimates)
-            else:
-                self.avg_age = sum(self.age_estimates) / len(self.age_estimates)
+            # 加权平均年龄（基于置信度和质量）
+            self.avg_age = self.age_stats.avg_age
         
         if face.gender is not None:
-            self.gender_estimates.append(face.gender)
             # 计算主要性别
-            if self.gender_estimates:
-                male_count = self.gender_estimates.count('Male')
-                female_count = self.gender_estimates.count('Female')
-                if male_count > female_count:
-                    self.dominant_gender = 'Male'
-                    self.gender_confidence = male_count / len(self.gender_estimates)
-                else:
-                    self.dominant_gender = 'Female'
-                    self.gender_confidence = female_count / len(self.gender_estimates)
+            self.gender_votes.add(face.gender)
+            self.dominant_gender, self.gender_confidence = self.gender_votes.dominant()
+        
+        if self.demographics is not None:
+            self.demographics.update(self.track_id, self.avg_age, self.dominant_gender)
     
     def update_position(self, center: Tuple[int, int], timestamp: datetime):
         """更新位置信息"""
+        self.revision += 1
         self.positions.append((center[0], center[1], timestamp))
         self.last_seen = timestamp
         self.total_frames += 1
-        
-        # 限制位置历史长度
-        if len(self.positions) > 100:
-            self.positions = self.positions[-100:]
 
 class IntegratedAnalyzer:
     """集成分析器"""
     
-    def __init__(self, use_insightface: bool = True):
+    def __init__(self, use_insightface: bool = True, shared_models: bool = False,
+                 roi_face_detection: bool = False, face_scheduling: bool = False,
+                 async_faces: bool = False, motion_gating: bool = False):
         """
         初始化集成分析器
         
         Args:
             use_insightface: 是否使用InsightFace进行人脸分析（默认True，使用高精度模式）
+            shared_models: 是否使用进程内共享模型（模型只加载一次，YOLO检测跨会话批处理；跟踪状态和档案仍为本实例独有）
+            roi_face_detection: 只在已确认轨迹的人员上半身区域检测人脸（ROI拼接后检测一次；画面中未被跟踪到的人脸不会被检测）
+            face_scheduling: 按轨迹属性需求在每帧预算内调度人脸分析（否则按固定间隔整帧分析）
+            async_faces: 人脸分析在独立工作线程中运行，结果在后续帧合并（主循环只等待检测和跟踪；
+                         人脸结果晚一帧或多帧返回，启用后须调用 close() 停止工作线程）
+            motion_gating: 画面与上次检测时相比没有变化时跳过检测和跟踪，沿用上一帧轨迹
         """
         # 初始化各个组件
-        self.person_detector = PersonDetector()
-        self.person_tracker = PersonTracker()
-        self.face_analyzer = FaceAnalyzer(use_insightface=use_insightface)
+        self.person_detector = PersonDetector(shared=shared_models, batched=shared_models)
+        self.person_tracker = PersonTracker(shared_embedder=shared_models)
+        self.face_analyzer = FaceAnalyzer(use_insightface=use_insightface,
+                                          shared_models=shared_models,
+                                          roi_detection=roi_face_detection)
         
         # 人员档案存储
         self.person_profiles: Dict[int, PersonProfile] = {}
         
+        # 年龄/性别增量统计（由档案更新时通知，读取为O(1)）
+        self.demographics = DemographicAggregator()
+        self.face_analyzer.demographics = self.demographics
+        
+        # 按轨迹调度人脸分析（新轨迹立即分析，已收敛的轨迹停止采样）
+        self.face_scheduler = FaceScheduler() if face_scheduling else None
+        
+        # 异步人脸分析通道（工作线程只做检测和关联，年龄历史和档案在本线程合并）
+        self.face_lane = FaceLane(self.face_analyzer.detect_faces_for_tracks) if async_faces else None
+        
+        # 运动门控（静止画面跳过YOLO和DeepSORT，定期强制刷新）
+        self.motion_gate = MotionGate() if motion_gating else None
+        
         # 配置参数
-        self.face_detection_interval = 6  # 每6帧进行一次人脸检测（准确性优化）
+        self.face_detection_interval = 6  # 每6帧进行一次人脸检测（准确性优化；调度模式下仅用于无轨迹时）
+        self.adaptive_skip_frames = 2  # 自适应模式下每次跳过检测的帧数（跳过的帧输出卡尔曼预测框）
         self.frame_count = 0
         
         # 当前轨迹信息（用于准确计算当前人数）
@@ -133,12 +145,15 @@ class IntegratedAnalyzer:
         
         logger.info("集成分析器初始化完成")
     
-    def process_frame(self, frame: np.ndarray) -> Tuple[List[PersonTrack], List[FaceInfo], Dict[int, PersonProfile]]:
+    def process_frame(self, frame: np.ndarray,
+                      detections: np.ndarray = None) -> Tuple[List[PersonTrack], List[FaceInfo], Dict[int, PersonProfile]]:
         """
         处理单帧图像
         
         Args:
             frame: 输入图像
+            detections: 已完成的 (N, 5) 人员检测数组（流水线模式下由检测阶段提供；
+                        STATIC_SCENE 表示检测阶段的运动门控判定画面未变化），None时在此检测
             
         Returns:
             (人员轨迹列表, 人脸信息列表, 人员档案字典)
@@ -147,28 +162,41 @@ class IntegratedAnalyzer:
         current_time = datetime.now()
         start_time = current_time
         
-        # 高级优化：自适应处理
+        # 高级优化：自适应处理（跳过的帧只做卡尔曼预测，轨迹框继续移动，档案和行为按实际时间更新）
         if self._adaptive_mode and self._skip_frames > 0:
             self._skip_frames -= 1
-            return self._current_tracks, [], self.person_profiles
+            return self._process_predicted_frame(current_time)
         
-        # 1. 人员检测
-        detections = self.person_detector.detect_persons(frame)
+        # 1. 人员检测（画面未变化时由运动门控跳过）
+        if detections is None:
+            detections = self.detect_persons(frame)
+        static_scene = detections is STATIC_SCENE
         
-        # 2. 人员跟踪
-        tracks = self.person_tracker.update(detections, frame)
-        
-        # 3. 人脸检测（间隔执行以提高性能）
-        faces = []
-        if self.frame_count % self.face_detection_interval == 0:
-            # 创建跟踪信息字典供人脸分析器使用
-            track_dict = {track.track_id: track for track in tracks}
+        # 2. 人员跟踪（跳过检测的帧沿用上一帧轨迹）
+        if static_scene:
+            tracks = self._current_tracks
+        else:
+            tracks = self.person_tracker.update(detections, frame)
+        
+        # 3. 人脸检测（有轨迹时按调度器预算分析，否则间隔执行以提高性能；静止的空画面不做整帧人脸检测）
+        if self.face_lane is not None:
+            # 异步模式：合并已完成的结果（来自之前的帧），再提交本帧任务
+            faces = self._merge_face_lane_results(current_time)
+            if not self.face_lane.busy and (tracks or not static_scene):
+                self._submit_face_job(frame, tracks)
+        else:
+            faces = []
+            if self.face_scheduler is not None and tracks:
+                faces = self._detect_scheduled_faces(frame, tracks)
+            elif (tracks or not static_scene) and self.frame_count % self.face_detection_interval == 0:
+                # 创建跟踪信息字典供人脸分析器使用
+                track_dict = {track.track_id: track for track in tracks}
+                
+                # 使用优化的人脸检测（包含多帧融合）
+                faces = self.face_analyzer.detect_faces_with_tracking(frame, track_dict)
             
-            # 使用优化的人脸检测（包含多帧融合）
-            faces = self.face_analyzer.detect_faces_with_tracking(frame, track_dict)
-        
-        # 4. 关联人脸与轨迹
-        self._associate_faces_with_tracks(tracks, faces, current_time)
+            # 4. 关联人脸与轨迹
+            self._associate_faces_with_tracks(tracks, faces, current_time)
         
         # 5. 更新人员档案
         self._update_person_profiles(tracks, current_time)
@@ -189,7 +217,7 @@ class IntegratedAnalyzer:
             avg_time = sum(self._processing_times[-10:]) / 10
             if avg_time > 0.25:  # 如果平均处理时间超过250ms（更宽松的阈值）
                 self._adaptive_mode = True
-                self._skip_frames = 2  # 跳过接下来的2帧
+                self._skip_frames = self.adaptive_skip_frames  # 跳过接下来的几帧
                 self.face_detection_interval = min(10, self.face_detection_interval + 1)
                 logger.debug(f"启用自适应模式：平均处理时间 {avg_time:.3f}s")
             elif avg_time < 0.1 and self._adaptive_mode:
@@ -199,6 +227,85 @@ class IntegratedAnalyzer:
         
         return tracks, faces, self.person_profiles
     
+    def _process_predicted_frame(self, current_time: datetime) -> Tuple[List[PersonTrack], List[FaceInfo], Dict[int, PersonProfile]]:
+        """
+        跳过检测的帧：推进跟踪器的卡尔曼预测，返回标记为predicted的预测框
+        
+        不运行检测、外观特征提取和人脸分析；异步人脸分析已完成的结果照常合并
+        """
+        tracks = self.person_tracker.predict()
+        faces = self._merge_face_lane_results(current_time) if self.face_lane is not None else []
+        self._update_person_profiles(tracks, current_time)
+        self._current_tracks = tracks
+        return tracks, faces, self.person_profiles
+    
+    def detect_persons(self, frame: np.ndarray):
+        """
+        经过运动门控的人员检测
+        
+        Returns:
+            (N, 5) 人员检测数组；画面与上次检测时相比没有变化时返回 STATIC_SCENE
+        """
+        if self.motion_gate is not None and not self.motion_gate.should_detect(frame):
+            return STATIC_SCENE
+        return self.person_detector.detect_persons(frame)
+    
+    def _select_face_tracks(self, tracks: List[PersonTrack]) -> Tuple[List[PersonTrack], List[PersonTrack]]:
+        """
+        由调度器选出本帧需要人脸分析的轨迹
+        
+        ROI模式下只检测选中轨迹的区域，预算直接限制推理量；
+        整帧模式下调度器只决定本帧是否分析，关联仍使用全部轨迹
+        
+        Returns:
+            (选中的轨迹, 需要检测并关联人脸的轨迹)，未选中任何轨迹时都为空
+        """
+        age_optimizer = getattr(self.face_analyzer.analyzer, 'age_optimizer', None)
+        age_histories = age_optimizer.age_histories if age_optimizer is not None else {}
+        selected = self.face_scheduler.select(tracks, age_histories)
+        if not selected:
+            return [], []
+        return selected, selected if self.face_analyzer.roi_detection else tracks
+    
+    def _submit_face_job(self, frame: np.ndarray, tracks: List[PersonTrack]):
+        """向异步人脸分析通道提交本帧任务"""
+        if self.face_scheduler is not None and tracks:
+            selected, analyzed = self._select_face_tracks(tracks)
+            if selected:
+                self.face_lane.submit(self.frame_count, frame, analyzed, selected)
+        elif self.frame_count % self.face_detection_interval == 0:
+            self.face_lane.submit(self.frame_count, frame, tracks)
+    
+    def _merge_face_lane_results(self, timestamp: datetime) -> List[FaceInfo]:
+        """
+        合并异步人脸分析结果：更新年龄历史、调度器状态和人员档案
+        
+        Returns:
+            本次合并的人脸（坐标来自各自的原始帧）
+        """
+        merged = []
+        for result in self.face_lane.poll(self.frame_count):
+            self.face_analyzer.update_age_histories(result.faces)
+            if self.face_scheduler is not None and result.selected:
+                self.face_scheduler.record(result.selected, result.faces, result.elapsed_ms)
+            # 按提交时的轨迹关联，轨迹在此期间消失也能更新其档案
+            self._associate_faces_with_tracks(result.tracks, result.faces, timestamp)
+            merged.extend(result.faces)
+        return merged
+    
+    def _detect_scheduled_faces(self, frame: np.ndarray, tracks: List[PersonTrack]) -> List[FaceInfo]:
+        """只对调度器选出的轨迹做人脸分析（同步模式）"""
+        selected, analyzed = self._select_face_tracks(tracks)
+        if not selected:
+            return []
+        
+        start = time.perf_counter()
+        faces = self.face_analyzer.detect_faces_with_tracking(
+            frame, {track.track_id: track for track in analyzed}
+        )
+        self.face_scheduler.record(selected, faces, (time.perf_counter() - start) * 1000)
+        return faces
+    
     def _associate_faces_with_tracks(self, tracks: List[PersonTrack], faces: List[FaceInfo], timestamp: datetime):
         """
         关联人脸检测结果与人员轨迹
@@ -211,43 +318,26 @@ class IntegratedAnalyzer:
         if not faces or not tracks:
             return
         
-        # 计算人脸与轨迹的重叠度
+        # detect_faces_with_tracking 已完成本帧的关联（face.track_id），否则在此计算一次
+        if not any(face.track_id is not None for face in faces):
+            assign_faces_to_tracks(faces, tracks)
+        
+        track_ids = {track.track_id for track in tracks}
         for face in faces:
-            face_x1, face_y1, face_x2, face_y2 = face.bbox
-            face_center = ((face_x1 + face_x2) // 2, (face_y1 + face_y2) // 2)
-            
-            best_track = None
-            best_overlap = 0
+            track_id = face.track_id
+            if track_id is None or track_id not in track_ids:
+                continue
             
-            for track in tracks:
-                track_x1, track_y1, track_x2, track_y2 = track.bbox
-                
-                # 计算重叠区域
-                overlap_x1 = max(face_x1, track_x1)
-                overlap_y1 = max(face_y1, track_y1)
-                overlap_x2 = min(face_x2, track_x2)
-                overlap_y2 = min(face_y2, track_y2)
-                
-                if overlap_x1 < overlap_x2 and overlap_y1 < overlap_y2:
-                    overlap_area = (overlap_x2 - overlap_x1) * (overlap_y2 - overlap_y1)
-                    face_area = (face_x2 - face_x1) * (face_y2 - face_y1)
-                    overlap_ratio = overlap_area / face_area if face_area > 0 else 0
-                    
-                    if overlap_ratio > best_overlap and overlap_ratio > 0.3:  # 至少30%重叠
-                        best_overlap = overlap_ratio
-                        best_track = track
+            # 更新档案
+            if track_id not in self.person_profiles:
+                self.person_profiles[track_id] = PersonProfile(
+                    track_id=track_id,
+                    first_seen=timestamp,
+                    last_seen=timestamp,
+                    demographics=self.demographics
+                )
             
-            # 如果找到匹配的轨迹，更新档案
-            if best_track is not None:
-                track_id = best_track.track_id
-                if track_id not in self.person_profiles:
-                    self.person_profiles[track_id] = PersonProfile(
-                        track_id=track_id,
-                        first_seen=timestamp,
-                        last_seen=timestamp
-                    )
-                
-                self.person_profiles[track_id].update_face_info(face)
+            self.person_profiles[track_id].update_face_info(face)
     
     def _update_person_profiles(self, tracks: List[PersonTrack], timestamp: datetime):
         """
@@ -265,7 +355,8 @@ class IntegratedAnalyzer:
                 self.person_profiles[track_id] = PersonProfile(
                     track_id=track_id,
                     first_seen=timestamp,
-                    last_seen=timestamp
+                    last_seen=timestamp,
+                    demographics=self.demographics
                 )
             
             # 更新位置信息
@@ -364,39 +455,11 @@ class IntegratedAnalyzer:
             active_tracks = len([p for p in self.person_profiles.values() 
                                if (datetime.now() - p.last_seen).seconds < 30])
         
-        # 年龄统计
-        ages = [p.avg_age for p in self.person_profiles.values() if p.avg_age is not None]
-        avg_age = sum(ages) / len(ages) if ages else None
-        
-        # 性别统计
-        genders = [p.dominant_gender for p in self.person_profiles.values() 
-                  if p.dominant_gender is not None]
-        male_count = genders.count('Male')
-        female_count = genders.count('Female')
-        
-        # 年龄分布统计
-        age_distribution = {
-            "0-17": 0, "18-25": 0, "26-35": 0, 
-            "36-45": 0, "46-55": 0, "56-65": 0, "65+": 0
-        }
-        
-        for profile in self.person_profiles.values():
-            if profile.avg_age is not None:
-                age = profile.avg_age
-                if age < 18:
-                    age_distribution["0-17"] += 1
-                elif age < 26:
-                    age_distribution["18-25"] += 1
-                elif age < 36:
-                    age_distribution["26-35"] += 1
-                elif age < 46:
-                    age_distribution["36-45"] += 1
-                elif age < 56:
-                    age_distribution["46-55"] += 1
-                elif age < 66:
-                    age_distribution["56-65"] += 1
-                else:
-                    age_distribution["65+"] += 1
+        # 年龄、性别和年龄分布取自增量聚合器
+        avg_age = self.demographics.avg_age
+        male_count = self.demographics.get_gender_count('Male')
+        female_count = self.demographics.get_gender_count('Female')
+        age_distribution = self.demographics.age_distribution()
         
         return {
             'total_people': total_people,
@@ -405,8 +468,16 @@ class IntegratedAnalyzer:
             'male_count': male_count,
             'female_count': female_count,
             'frame_count': self.frame_count,
-            'age_distribution': age_distribution
+            'age_distribution': age_distribution,
+            'face_scheduler': self.face_scheduler.get_statistics() if self.face_scheduler else None,
+            'face_lane': self.face_lane.get_statistics() if self.face_lane else None,
+            'motion_gate': self.motion_gate.get_statistics() if self.motion_gate else None
         }
+    
+    def close(self):
+        """停止异步人脸分析线程"""
+        if self.face_lane is not None:
+            self.face_lane.close()
 
 def test_integrated_analyzer():
     """测试集成分析器"""
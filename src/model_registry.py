@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型注册表模块
+进程内共享YOLO、DeepSORT特征提取器和InsightFace模型，每个模型只加载一次
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SharedModel:
+    """线程安全的共享模型句柄"""
+
+    def __init__(self, name: str, model: Any):
+        """
+        初始化共享模型句柄
+
+        Args:
+            name: 模型名称
+            model: 实际模型对象
+        """
+        self.name = name
+        self.model = model
+        self.lock = threading.RLock()  # 串行化推理调用
+        self.call_count = 0
+
+    def __call__(self, *args, **kwargs):
+        """加锁调用模型（如YOLO推理）"""
+        with self.lock:
+            self.call_count += 1
+            return self.model(*args, **kwargs)
+
+    def predict(self, *args, **kwargs):
+        """加锁调用模型的predict方法（如DeepSORT特征提取器）"""
+        with self.lock:
+            self.call_count += 1
+            return self.model.predict(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        # 其余属性直接转发给模型，需要加锁的复合调用由调用方持有self.lock
+        return getattr(self.model, name)
+
+class ModelRegistry:
+    """进程级模型注册表"""
+
+    def __init__(self):
+        """初始化模型注册表"""
+        self._models: Dict[Tuple, SharedModel] = {}
+        self._load_locks: Dict[Tuple, threading.Lock] = {}
+        self._batchers: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+        
+        # 共享检测器使用的推理后端（环境变量可让进程池中的工作进程使用相同配置）
+        self.detector_backend = os.getenv('DETECTOR_BACKEND', 'torch')
+        threads = os.getenv('DETECTOR_THREADS')
+        self.detector_threads: Optional[int] = int(threads) if threads else None
+
+    def _get_or_load(self, key: Tuple, loader: Callable[[], Any]) -> SharedModel:
+        """获取已加载模型，不存在时加载（同一模型并发请求只加载一次）"""
+        shared = self._models.get(key)
+        if shared is not None:
+            return shared
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            shared = self._models.get(key)
+            if shared is None:
+                logger.info(f"加载共享模型: {key}")
+                shared = SharedModel(key[0], loader())
+                self._models[key] = shared
+            return shared
+
+    def get_yolo(self, model_path: str = 'yolov8n.pt') -> SharedModel:
+        """获取共享的YOLO检测模型"""
+        def load():
+            from ultralytics import YOLO
+            return YOLO(model_path)
+
+        return self._get_or_load(('yolo', model_path), load)
+
+    def configure_detector(self, backend: str = 'torch', threads: Optional[int] = None):
+        """
+        设置共享检测器的推理后端（在创建会话前调用）
+
+        Args:
+            backend: 'torch'、'onnxruntime' 或 'openvino'
+            threads: 推理线程数（None使用后端默认值）
+        """
+        from detector_backends import BACKENDS
+        if backend not in BACKENDS:
+            raise ValueError(f"不支持的检测后端: {backend}")
+        self.detector_backend = backend
+        self.detector_threads = threads
+        logger.info(f"检测后端: {backend}（线程数: {threads or '默认'}）")
+
+    def get_detector_backend(self, backend: str, model_path: str = 'yolov8n.pt',
+                             threads: Optional[int] = None) -> SharedModel:
+        """
+        获取共享的检测后端（首次使用时加载或导出模型并预热）
+        
+        PyTorch后端复用 get_yolo 的共享模型；后端只按人员类别和置信度下限过滤，
+        各检测器再按自己的阈值筛选
+        """
+        def load():
+            from detector_backends import create_backend
+            return create_backend(backend, model_path, threads=threads, shared=True)
+
+        return self._get_or_load(('detector_backend', backend, model_path, threads), load)
+
+    def get_yolo_batcher(self, model_path: str = 'yolov8n.pt', max_batch: int = 8,
+                         max_wait_ms: float = 5.0, backend: str = 'torch',
+                         threads: Optional[int] = None):
+        """
+        获取共享YOLO模型的跨会话批处理推理服务（同一模型和后端只创建一个）
+        
+        返回的服务对象提交单帧、返回该帧的 (N, 5) float32 人员检测数组
+        """
+        key = ('yolo_batcher', model_path, backend, threads)
+        batcher = self._batchers.get(key)
+        if batcher is not None:
+            return batcher
+
+        infer = self.get_detector_backend(backend, model_path, threads).infer
+        with self._lock:
+            batcher = self._batchers.get(key)
+            if batcher is None:
+                from batch_inference import BatchInferenceServer
+                batcher = BatchInferenceServer(
+                    infer, max_batch=max_batch, max_wait_ms=max_wait_ms, name='yolo-batcher'
+                )
+                self._batchers[key] = batcher
+                logger.info(f"创建YOLO批处理推理服务: {model_path} [{backend}] (最大批 {max_batch}, 最长等待 {max_wait_ms}ms)")
+            return batcher
+
+    def get_reid_embedder(self, half: bool = True, gpu: bool = True) -> SharedModel:
+        """获取共享的DeepSORT外观特征提取器（MobileNetV2）"""
+        def load():
+            from deep_sort_realtime.embedder.embedder_pytorch import MobileNetv2_Embedder
+            return MobileNetv2_Embedder(half=half, max_batch_size=16, bgr=True, gpu=gpu)
+
+        return self._get_or_load(('reid_embedder', half, gpu), load)
+
+    def get_insightface(self, det_size: Tuple[int, int] = (640, 640),
+                        providers: Tuple[str, ...] = ('CPUExecutionProvider',)) -> SharedModel:
+        """获取共享的InsightFace FaceAnalysis应用"""
+        def load():
+            import insightface
+            app = insightface.app.FaceAnalysis(providers=list(providers))
+            app.prepare(ctx_id=0, det_size=det_size)
+            return app
+
+        return self._get_or_load(('insightface', tuple(det_size), tuple(providers)), load)
+
+    def preload(self, use_insightface: bool = True):
+        """预加载Web会话使用的全部模型"""
+        if self.detector_backend == 'torch':
+            self.get_yolo()
+        else:
+            self.get_detector_backend(self.detector_backend, threads=self.detector_threads)
+        self.get_reid_embedder()
+        if use_insightface:
+            try:
+                self.get_insightface()
+            except Exception as e:
+                logger.warning(f"InsightFace预加载失败，将在会话中降级: {e}")
+        logger.info(f"模型预加载完成: {self.loaded_models()}")
+
+    def loaded_models(self) -> List[str]:
+        """获取已加载模型列表"""
+        return [str(key) for key in self._models]
+
+    def get_statistics(self) -> Dict:
+        """获取模型调用统计（含批处理服务的批大小和排队等待统计）"""
+        stats = {str(key): shared.call_count for key, shared in self._models.items()}
+        for key, batcher in self._batchers.items():
+            stats[str(key)] = batcher.get_statistics()
+        return stats
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """获取进程级模型注册表单例"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
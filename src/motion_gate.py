@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运动门控模块
+在人员检测之前用缩小的灰度帧与上次检测时的参考帧做差分，画面没有变化时跳过YOLO和DeepSORT，
+沿用上一帧的轨迹；超过强制刷新间隔时无论是否有变化都重新检测
+"""
+
+import cv2
+import numpy as np
+from typing import Dict, Optional
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 场景未变化、本帧跳过检测的标记（流水线检测阶段传给分析阶段）
+STATIC_SCENE = object()
+
+class MotionGate:
+    """基于帧差分的检测门控"""
+
+    def __init__(self, change_threshold: float = 0.003, pixel_threshold: int = 20,
+                 width: int = 160, refresh_interval: int = 30):
+        """
+        Args:
+            change_threshold: 变化像素占比超过该值视为画面有变化（需要检测）
+            pixel_threshold: 灰度差超过该值的像素计为变化像素
+            width: 差分前将帧缩小到的宽度（保持宽高比）
+            refresh_interval: 连续跳过该帧数后强制检测一次（人员静止时也能刷新轨迹）
+        """
+        self.change_threshold = change_threshold
+        self.pixel_threshold = pixel_threshold
+        self.width = width
+        self.refresh_interval = refresh_interval
+
+        # 上次检测时的缩小灰度帧；与参考帧比较而不是与上一帧比较，缓慢的移动也会累积触发
+        self._reference: Optional[np.ndarray] = None
+        self._since_detect = 0
+
+        # 统计信息
+        self.frames = 0
+        self.skipped = 0
+        self.motion_triggers = 0
+        self.forced_refreshes = 0
+        self.last_change_ratio = 0.0
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        """缩小、转灰度并模糊（抑制噪声和压缩伪影）"""
+        height, width = frame.shape[:2]
+        if width > self.width:
+            frame = cv2.resize(frame, (self.width, max(1, round(height * self.width / width))),
+                               interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_detect(self, frame: np.ndarray) -> bool:
+        """
+        判断本帧是否需要运行人员检测（需要检测时以本帧作为新的参考帧）
+
+        Args:
+            frame: 输入图像 (BGR格式)
+
+        Returns:
+            True表示画面有变化、尚无参考帧、尺寸变化或达到强制刷新间隔
+        """
+        self.frames += 1
+        small = self._prepare(frame)
+
+        if self._reference is None or self._reference.shape != small.shape:
+            detect = True
+        else:
+            diff = cv2.absdiff(small, self._reference)
+            self.last_change_ratio = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+            if self.last_change_ratio > self.change_threshold:
+                self.motion_triggers += 1
+                detect = True
+            elif self._since_detect + 1 >= self.refresh_interval:
+                self.forced_refreshes += 1
+                detect = True
+            else:
+                detect = False
+
+        if detect:
+            self._reference = small
+            self._since_detect = 0
+        else:
+            self._since_detect += 1
+            self.skipped += 1
+        return detect
+
+    def reset(self):
+        """丢弃参考帧（下一帧必定检测）"""
+        self._reference = None
+        self._since_detect = 0
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def get_statistics(self) -> Dict:
+        """跳过比例和触发原因统计"""
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skip_ratio, 3),
+            'motion_triggers': self.motion_triggers,
+            'forced_refreshes': self.forced_refreshes,
+            'last_change_ratio': round(self.last_change_ratio, 4)
+        }
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步持久化写入模块
+后台线程从有界队列中取出持久化事件，合并同一会话的连续保存批次后写入数据库，
+使帧处理路径不再等待MySQL；数据库变慢时按策略阻塞或丢弃事件
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SaveBatchEvent:
+    """一个保存周期的人员/位置/人脸数据"""
+
+    kind = 'save_batch'
+
+    def __init__(self, db, session_id: int, persons: List[Dict], positions: List[Dict],
+                 faces: List[Dict], person_ids: Dict[int, int] = None,
+                 on_saved: Callable[[Dict[int, int]], None] = None):
+        """
+        Args:
+            db: DatabaseManager
+            session_id: 会话ID
+            persons: 人员数据列表（需包含track_id）
+            positions: 位置数据列表
+            faces: 人脸数据列表
+            person_ids: 已有的 track_id -> 人员记录ID 映射（写入时读取）
+            on_saved: 写入成功后的回调（参数为本批人员的 track_id -> 记录ID），在写入线程中调用
+        """
+        self.db = db
+        self.session_id = session_id
+        self.persons = {p['track_id']: p for p in persons}
+        self.positions = list(positions)
+        self.faces = list(faces)
+        self.person_ids = person_ids
+        self.callbacks = [on_saved] if on_saved else []
+        self.created_at = time.monotonic()
+
+    def can_merge(self, other) -> bool:
+        return (other.kind == self.kind and other.db is self.db
+                and other.session_id == self.session_id)
+
+    def merge(self, other: 'SaveBatchEvent'):
+        """合并后续批次：人员以最新档案为准，位置和人脸追加"""
+        self.persons.update(other.persons)
+        self.positions.extend(other.positions)
+        self.faces.extend(other.faces)
+        self.callbacks.extend(other.callbacks)
+        if other.person_ids is not None:
+            self.person_ids = other.person_ids
+
+    def apply(self):
+        person_ids = self.db.save_batch(
+            self.session_id, list(self.persons.values()), self.positions, self.faces,
+            person_ids=dict(self.person_ids or {})
+        )
+        for callback in self.callbacks:
+            callback(person_ids)
+
+class AnalysisRecordEvent:
+    """一条分析记录"""
+
+    kind = 'analysis_record'
+
+    def __init__(self, db, record_data: Dict, on_saved: Callable[[int], None] = None):
+        self.db = db
+        self.record_data = record_data
+        self.on_saved = on_saved
+        self.created_at = time.monotonic()
+
+    def can_merge(self, other) -> bool:
+        return False
+
+    def apply(self):
+        record_id = self.db.save_analysis_record(self.record_data)
+        if self.on_saved:
+            self.on_saved(record_id)
+
+class TaskEvent:
+    """在写入线程中按提交顺序执行的任务（如统计校准查询）"""
+
+    kind = 'task'
+
+    def __init__(self, func: Callable[[], None]):
+        self.func = func
+        self.created_at = time.monotonic()
+
+    def can_merge(self, other) -> bool:
+        return False
+
+    def apply(self):
+        self.func()
+
+class PersistenceWriter:
+    """后台持久化写入器"""
+
+    POLICY_BLOCK = 'block'              # 队列满时阻塞提交方（最多block_timeout秒，超时后丢弃）
+    POLICY_DROP_NEWEST = 'drop_newest'  # 队列满时丢弃新事件
+    POLICY_DROP_OLDEST = 'drop_oldest'  # 队列满时丢弃最旧事件
+    POLICIES = (POLICY_BLOCK, POLICY_DROP_NEWEST, POLICY_DROP_OLDEST)
+
+    def __init__(self, max_queue: int = 256, policy: str = POLICY_BLOCK,
+                 block_timeout: float = 0.05, max_batch: int = 64, name: str = 'persistence-writer'):
+        """
+        初始化持久化写入器
+
+        Args:
+            max_queue: 队列最大事件数
+            policy: 队列满时的处理策略
+            block_timeout: 阻塞策略下提交方的最长等待时间（秒）
+            max_batch: 每轮最多取出的事件数（在其中合并同一会话的保存批次）
+            name: 写入线程名称
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"不支持的队列策略: {policy}")
+
+        self.max_queue = max_queue
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.max_batch = max_batch
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._in_flight = 0
+        self._closed = False
+
+        # 统计信息
+        self.submitted = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.written = 0
+        self.failed = 0
+        self.blocked_time = 0.0
+        self.max_queue_depth = 0
+        self.flushes = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.last_flush_time = 0.0
+        self.max_event_age = 0.0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def submit(self, event) -> bool:
+        """
+        提交持久化事件（不等待写入）
+
+        Returns:
+            事件是否进入队列
+        """
+        with self._cond:
+            if self._closed:
+                return False
+
+            if len(self._queue) >= self.max_queue:
+                if self.policy == self.POLICY_DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif self.policy == self.POLICY_BLOCK:
+                    start = time.monotonic()
+                    deadline = start + self.block_timeout
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    self.blocked_time += time.monotonic() - start
+                    if self._closed or len(self._queue) >= self.max_queue:
+                        self.dropped += 1
+                        logger.warning("持久化队列已满，丢弃事件")
+                        return False
+                else:
+                    self.dropped += 1
+                    return False
+
+            self._queue.append(event)
+            self.submitted += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify_all()
+            return True
+
+    def _take_batch(self) -> Optional[List]:
+        """取出一批事件并合并相邻的同会话保存批次（队列为空且已关闭时返回None）"""
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return None
+
+            batch = []
+            while self._queue and len(batch) < self.max_batch:
+                event = self._queue.popleft()
+                if batch and batch[-1].can_merge(event):
+                    batch[-1].merge(event)
+                    self.coalesced += 1
+                else:
+                    batch.append(event)
+            self._in_flight = len(batch)
+            # 腾出队列空间，唤醒被阻塞的提交方
+            self._cond.notify_all()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+
+            start = time.monotonic()
+            for event in batch:
+                self.max_event_age = max(self.max_event_age, start - event.created_at)
+                try:
+                    event.apply()
+                    self.written += 1
+                except Exception as e:
+                    self.failed += 1
+                    logger.error(f"异步持久化写入失败 ({event.kind}): {e}")
+
+            elapsed = time.monotonic() - start
+            with self._cond:
+                self.flushes += 1
+                self.total_flush_time += elapsed
+                self.max_flush_time = max(self.max_flush_time, elapsed)
+                self.last_flush_time = elapsed
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待已提交的事件全部写入
+
+        Returns:
+            是否在超时前写完
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight:
+                if not self._thread.is_alive():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 30.0):
+        """写完剩余事件后停止写入线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"持久化写入线程未在{timeout}秒内结束，剩余 {len(self._queue)} 个事件")
+
+    def get_statistics(self) -> Dict:
+        """获取队列深度、刷写延迟等统计信息"""
+        with self._cond:
+            depth = len(self._queue)
+            in_flight = self._in_flight
+        flushes = max(self.flushes, 1)
+        return {
+            'policy': self.policy,
+            'queue_depth': depth,
+            'max_queue_depth': self.max_queue_depth,
+            'queue_capacity': self.max_queue,
+            'in_flight': in_flight,
+            'submitted': self.submitted,
+            'written': self.written,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'blocked_time_ms': self.blocked_time * 1000,
+            'flushes': self.flushes,
+            'avg_flush_ms': self.total_flush_time / flushes * 1000,
+            'max_flush_ms': self.max_flush_time * 1000,
+            'last_flush_ms': self.last_flush_time * 1000,
+            'max_event_age_ms': self.max_event_age * 1000
+        }
@@ -15,6 +15,8 @@ import time
 
 from integrated_analyzer import IntegratedAnalyzer, PersonProfile
 from database import DatabaseManager
+from persistence_writer import PersistenceWriter, SaveBatchEvent, AnalysisRecordEvent, TaskEvent
+from session_stats import SessionStatsCounter
 from tracker import PersonTrack
 from face_analyzer import FaceInfo
 
@@ -27,7 +29,9 @@ class PersistentAnalyzer:
     
     def __init__(self, session_name: str = None, use_insightface: bool = True, 
                  db_config: Dict = None, save_interval: int = 30,
-                 record_interval: int = 300):
+                 record_interval: int = 300, shared_models: bool = False,
+                 async_writes: bool = True, writer: PersistenceWriter = None,
+                 stats_reconcile_interval: float = 300, analyzer_options: Dict = None):
         """
         初始化持久化分析器
         
@@ -37,9 +41,16 @@ class PersistentAnalyzer:
             db_config: 数据库配置字典，如果为None则使用默认MySQL配置
             save_interval: 数据保存间隔（秒）
             record_interval: 分析记录生成间隔（秒），默认5分钟
+            shared_models: 是否使用进程内共享模型
+            async_writes: 是否由后台线程异步写入数据库（帧处理路径不等待MySQL）
+            writer: 共享的持久化写入器，为None且启用异步写入时创建本会话专用写入器
+            stats_reconcile_interval: 内存会话统计用数据库查询校准的间隔（秒），<=0表示不校准
+            analyzer_options: 传给 IntegratedAnalyzer 的可选优化开关（如 roi_face_detection）
         """
         # 初始化集成分析器
-        self.analyzer = IntegratedAnalyzer(use_insightface=use_insightface)
+        self.analyzer = IntegratedAnalyzer(use_insightface=use_insightface,
+                                           shared_models=shared_models,
+                                           **(analyzer_options or {}))
         
         # 初始化数据库
         self.db = DatabaseManager(db_config)
@@ -55,29 +66,47 @@ class PersistentAnalyzer:
         self.save_interval = save_interval
         self.last_save_time = time.time()
         self.person_db_ids = {}  # track_id -> person_id 映射
+        self.saved_revisions = {}  # track_id -> 上次保存时的档案修订号
+        
+        # 会话数据库统计（写入时更新的内存计数器，按间隔校准）
+        self.stats_counter = SessionStatsCounter({
+            'id': self.session_id,
+            'session_name': session_name,
+            'start_time': datetime.now()
+        })
+        self.stats_reconcile_interval = stats_reconcile_interval
+        self._reconcile_pending = False
         
         # 分析记录配置
         self.record_interval = record_interval
         self.last_record_time = time.time()
         self.record_count = 0
         
-        # 线程安全锁
-        self.lock = threading.Lock()
+        # 线程安全锁（可重入：同步写入时批次回调在持锁的保存线程中执行）
+        self.lock = threading.RLock()
+        
+        # 异步持久化写入器
+        self._owns_writer = async_writes and writer is None
+        if self._owns_writer:
+            writer = PersistenceWriter(name=f"persistence-writer-{self.session_id}")
+        self.writer = writer if async_writes else None
         
         logger.info(f"持久化分析器初始化完成 - 会话: {session_name} (ID: {self.session_id})")
     
-    def process_frame(self, frame: np.ndarray) -> Tuple[List[PersonTrack], List[FaceInfo], Dict[int, PersonProfile]]:
+    def process_frame(self, frame: np.ndarray,
+                      detections: np.ndarray = None) -> Tuple[List[PersonTrack], List[FaceInfo], Dict[int, PersonProfile]]:
         """
         处理单帧图像并保存数据
         
         Args:
             frame: 输入图像
+            detections: 已完成的人员检测结果，None时由集成分析器检测
             
         Returns:
             (人员轨迹列表, 人脸信息列表, 人员档案字典)
         """
         # 使用集成分析器处理帧
-        tracks, faces, profiles = self.analyzer.process_frame(frame)
+        tracks, faces, profiles = self.analyzer.process_frame(frame, detections)
         
         current_time = time.time()
         
@@ -105,9 +134,16 @@ class PersistentAnalyzer:
         """
         with self.lock:
             try:
-                # 保存人员档案
-                for track_id, profile in profiles.items():
-                    person_data = {
+                now = datetime.now()
+                
+                # 只写入自上次保存后有变化的人员档案
+                dirty = {
+                    track_id: profile for track_id, profile in profiles.items()
+                    if self.saved_revisions.get(track_id) != profile.revision
+                }
+                revisions = {track_id: profile.revision for track_id, profile in dirty.items()}
+                persons = [
+                    {
                         'track_id': track_id,
                         'first_seen': profile.first_seen,
                         'last_seen': profile.last_seen,
@@ -117,43 +153,91 @@ class PersistentAnalyzer:
                         'dominant_gender': profile.dominant_gender,
                         'gender_confidence': profile.gender_confidence
                     }
-                    
-                    person_id = self.db.save_person(self.session_id, person_data)
-                    self.person_db_ids[track_id] = person_id
+                    for track_id, profile in dirty.items()
+                ]
                 
-                # 保存当前活跃轨迹的位置信息
-                for track in tracks:
-                    if track.track_id in self.person_db_ids:
-                        person_id = self.person_db_ids[track.track_id]
-                        self.db.save_position(
-                            person_id, 
-                            track.center[0], 
-                            track.center[1], 
-                            datetime.now(),
-                            self.analyzer.frame_count
-                        )
+                # 当前活跃轨迹的位置信息
+                positions = [
+                    {
+                        'track_id': track.track_id,
+                        'x': track.center[0],
+                        'y': track.center[1],
+                        'timestamp': now,
+                        'frame_number': self.analyzer.frame_count
+                    }
+                    for track in tracks
+                ]
                 
-                # 保存人脸信息（如果有的话）
+                # 人脸信息：使用本帧关联到的人员（face.track_id）；
+                # 未关联的人脸沿用原逻辑，记到第一个已保存人员
+                fallback_track_id = next(iter(self.person_db_ids), None)
+                if fallback_track_id is None:
+                    fallback_track_id = next(iter(profiles), None)
+                face_rows = []
                 for face in faces:
-                    # 这里需要关联人脸到具体的人员，简化处理
-                    # 实际应用中可能需要更复杂的关联逻辑
-                    if self.person_db_ids:
-                        # 使用第一个可用的person_id（简化处理）
-                        person_id = list(self.person_db_ids.values())[0]
-                        face_data = {
-                            'age': face.age,
-                            'gender': face.gender,
-                            'gender_confidence': face.gender_confidence,
-                            'bbox': face.bbox,
-                            'confidence': face.confidence,
-                            'timestamp': datetime.now()
-                        }
-                        self.db.save_face(person_id, face_data)
+                    track_id = face.track_id if face.track_id in profiles else fallback_track_id
+                    if track_id is None:
+                        continue
+                    face_rows.append({
+                        'track_id': track_id,
+                        'age': face.age,
+                        'gender': face.gender,
+                        'gender_confidence': face.gender_confidence,
+                        'bbox': face.bbox,
+                        'confidence': face.confidence,
+                        'timestamp': now
+                    })
                 
-                logger.debug(f"批量保存数据完成 - 人员: {len(profiles)}, 轨迹: {len(tracks)}, 人脸: {len(faces)}")
+                # 传入映射本身而非副本：写入时才读取，可解析到先写完的批次新建的人员记录；
+                # 映射只在持锁的 _on_batch_saved 中修改，该回调与写入时的读取在同一线程中执行
+                event = SaveBatchEvent(
+                    self.db, self.session_id, persons, positions, face_rows,
+                    person_ids=self.person_db_ids,
+                    on_saved=lambda ids, revisions=revisions, persons=persons, positions=positions, faces=face_rows:
+                        self._on_batch_saved(ids, revisions, persons, positions, faces)
+                )
+                if not self._writer_active():
+                    # 同步模式：在当前线程中单事务批量写入
+                    event.apply()
+                    logger.debug(f"批量保存数据完成 - 人员: {len(dirty)}/{len(profiles)}, 轨迹: {len(tracks)}, 人脸: {len(faces)}")
+                    return
                 
             except Exception as e:
                 logger.error(f"数据保存失败: {e}")
+                return
+        
+        # 在锁外提交，避免写入线程的回调与阻塞中的提交方互相等待；
+        # 队列满被丢弃时档案修订号未更新，下个保存周期会重新写入
+        self.writer.submit(event)
+    
+    def _writer_active(self) -> bool:
+        """异步写入器是否可用（未启用或已关闭时同步写入）"""
+        return self.writer is not None and not self.writer.closed
+    
+    def _on_batch_saved(self, person_ids: Dict[int, int], revisions: Dict[int, int],
+                        persons: List[Dict], positions: List[Dict], faces: List[Dict]):
+        """批次写入成功：记录人员ID、已保存的档案修订号，并更新会话统计计数器（异步模式下在写入线程中调用）"""
+        with self.lock:
+            self.person_db_ids.update(person_ids)
+            self.saved_revisions.update(revisions)
+            # 与 save_batch 一致：只有能解析到人员记录的位置和人脸会被写入
+            self.stats_counter.record_write(
+                persons,
+                positions=sum(1 for p in positions if p['track_id'] in self.person_db_ids),
+                faces=sum(1 for f in faces if f['track_id'] in self.person_db_ids)
+            )
+    
+    def flush(self, timeout: float = None) -> bool:
+        """等待已提交的异步写入完成"""
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout)
+    
+    def get_persistence_statistics(self) -> Dict:
+        """获取异步写入队列统计信息（队列深度、刷写延迟等）"""
+        if self.writer is None:
+            return {'async_writes': False}
+        return {'async_writes': True, **self.writer.get_statistics()}
     
     def _create_analysis_record(self, tracks: List[PersonTrack], faces: List[FaceInfo], 
                                profiles: Dict[int, PersonProfile]):
@@ -167,19 +251,7 @@ class PersistentAnalyzer:
         """
         with self.lock:
             try:
-                # 获取实时统计信息
-                realtime_stats = self.get_realtime_statistics()
-                
-                # 尝试获取行为分析统计信息（如果有的话）
-                behavior_stats = {}
-                zone_stats = {}
-                try:
-                    from complete_analyzer import CompleteAnalyzer
-                    if hasattr(self, 'parent_analyzer') and isinstance(self.parent_analyzer, CompleteAnalyzer):
-                        behavior_stats = self.parent_analyzer.behavior_analyzer.get_behavior_summary()
-                        zone_stats = self.parent_analyzer.behavior_analyzer.get_zone_statistics()
-                except (ImportError, AttributeError):
-                    pass
+                realtime_stats, behavior_stats, zone_stats = self._record_statistics()
                 
                 # 准备分析记录数据
                 self.record_count += 1
@@ -210,9 +282,18 @@ class PersistentAnalyzer:
                     }
                 }
                 
-                # 保存分析记录
+                # 保存分析记录（异步模式下交给写入线程，记录ID在写入后记录到日志）
+                record_name = record_data['record_name']
+                event = AnalysisRecordEvent(
+                    self.db, record_data,
+                    on_saved=lambda record_id: logger.info(f"创建分析记录: {record_name} (ID: {record_id})")
+                )
+                if self._writer_active():
+                    self.writer.submit(event)
+                    return None
+                
                 record_id = self.db.save_analysis_record(record_data)
-                logger.info(f"创建分析记录: {record_data['record_name']} (ID: {record_id})")
+                logger.info(f"创建分析记录: {record_name} (ID: {record_id})")
                 
                 return record_id
                 
@@ -222,6 +303,21 @@ class PersistentAnalyzer:
                 logger.error(traceback.format_exc())
                 return None
     
+    def _record_statistics(self) -> Tuple[Dict, Dict, Dict]:
+        """
+        获取分析记录所需的实时统计、行为统计和区域统计
+        
+        有父级完整分析器时复用其最近一帧的统计快照，否则只计算实时统计
+        """
+        try:
+            from complete_analyzer import CompleteAnalyzer
+            if hasattr(self, 'parent_analyzer') and isinstance(self.parent_analyzer, CompleteAnalyzer):
+                snapshot = self.parent_analyzer.get_snapshot(('realtime', 'behavior', 'zones'))
+                return snapshot.realtime, snapshot.behavior, snapshot.zones
+        except (ImportError, AttributeError):
+            pass
+        return self.get_realtime_statistics(), {}, {}
+    
     def save_current_frame_data(self, tracks: List[PersonTrack], faces: List[FaceInfo]):
         """
         立即保存当前帧数据
@@ -252,25 +348,14 @@ class PersistentAnalyzer:
         """
         profiles = self.analyzer.person_profiles
         
-        # 保存当前帧数据
+        # 保存当前帧数据，并等待之前提交的异步写入完成（手动记录需要立即返回记录ID）
         self._save_data_batch(profiles, tracks, faces)
+        self.flush()
         
         # 创建分析记录
         with self.lock:
             try:
-                # 获取实时统计信息
-                realtime_stats = self.get_realtime_statistics()
-                
-                # 尝试获取行为分析统计信息（如果有的话）
-                behavior_stats = {}
-                zone_stats = {}
-                try:
-                    from complete_analyzer import CompleteAnalyzer
-                    if hasattr(self, 'parent_analyzer') and isinstance(self.parent_analyzer, CompleteAnalyzer):
-                        behavior_stats = self.parent_analyzer.behavior_analyzer.get_behavior_summary()
-                        zone_stats = self.parent_analyzer.behavior_analyzer.get_zone_statistics()
-                except (ImportError, AttributeError):
-                    pass
+                realtime_stats, behavior_stats, zone_stats = self._record_statistics()
                 
                 # 准备分析记录数据
                 self.record_count += 1
@@ -335,6 +420,9 @@ class PersistentAnalyzer:
             # 创建最终分析记录 - 只创建一次
             self._create_analysis_record([], [], profiles)
             
+            # 等待异步写入完成后再结束会话
+            self.flush()
+            
             # 结束会话
             self.db.end_session(self.session_id, stats)
             
@@ -347,9 +435,33 @@ class PersistentAnalyzer:
             logger.error(f"结束会话失败: {e}")
     
     def get_session_statistics(self) -> Dict:
-        """获取当前会话的数据库统计信息"""
+        """获取当前会话的数据库统计信息（直接查询数据库）"""
         return self.db.get_session_statistics(self.session_id)
     
+    def get_cached_session_statistics(self) -> Dict:
+        """
+        获取当前会话的数据库统计信息（内存计数器，O(1)且不访问数据库）
+        
+        到达校准间隔时提交一次校准查询到写入线程，排在已提交的写入之后执行
+        """
+        if not self._reconcile_pending and self.stats_counter.needs_reconcile(self.stats_reconcile_interval):
+            if self._writer_active():
+                self._reconcile_pending = True
+                if not self.writer.submit(TaskEvent(self._reconcile_statistics)):
+                    self._reconcile_pending = False
+            else:
+                self._reconcile_statistics()
+        return self.stats_counter.snapshot()
+    
+    def _reconcile_statistics(self):
+        """用数据库查询结果校准内存会话统计"""
+        try:
+            self.stats_counter.reconcile(self.db.get_session_statistics(self.session_id))
+        except Exception as e:
+            logger.error(f"会话统计校准失败: {e}")
+        finally:
+            self._reconcile_pending = False
+    
     def get_realtime_statistics(self) -> Dict:
         """获取实时统计信息"""
         # 传递当前轨迹信息以获得准确的当前人数
@@ -406,6 +518,11 @@ class PersistentAnalyzer:
         try:
             # 确保会话已结束
             self.end_session()
+            # 停止异步人脸分析线程
+            self.analyzer.close()
+            # 停止本会话专用的写入线程
+            if self._owns_writer:
+                self.writer.close()
             # 关闭数据库连接
             self.db.close()
             logger.info("持久化分析器已关闭")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线执行模块
+将单帧处理拆分为若干阶段，每个阶段一个线程，阶段之间用有界队列连接；
+每个阶段按先进先出处理，结果顺序与提交顺序一致。多核机器上单会话吞吐量
+趋近于 1/最慢阶段耗时，而不是 1/各阶段耗时之和
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_STOP = object()
+
+class PipelineItem:
+    """在各阶段之间传递的单帧上下文"""
+
+    __slots__ = ('seq', 'value', 'error', 'future', 'submitted_at')
+
+    def __init__(self, seq: int, value: Any):
+        self.seq = seq
+        self.value = value
+        self.error: Optional[BaseException] = None
+        self.future: Future = Future()
+        self.submitted_at = time.monotonic()
+
+class StageStats:
+    """单个阶段的耗时统计"""
+
+    def __init__(self, name: str, window: int = 200):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.total_wait = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, elapsed: float, wait: float):
+        self.count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.total_wait += wait
+        self.recent.append(elapsed)
+
+    def to_dict(self, uptime: float) -> Dict:
+        count = max(self.count, 1)
+        recent = np.array(self.recent) * 1000 if self.recent else np.zeros(1)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': self.total_time / count * 1000,
+            'p50_ms': float(np.percentile(recent, 50)),
+            'p90_ms': float(np.percentile(recent, 90)),
+            'max_ms': self.max_time * 1000,
+            'avg_lock_wait_ms': self.total_wait / count * 1000,
+            'busy_ratio': self.total_time / uptime if uptime > 0 else 0.0
+        }
+
+class PipelineRunner:
+    """多阶段流水线执行器"""
+
+    def __init__(self, stages: Sequence[Tuple[str, Callable[[Any], Any]]], queue_size: int = 2,
+                 locks: Dict[str, Any] = None, name: str = 'pipeline'):
+        """
+        初始化流水线
+
+        Args:
+            stages: [(阶段名称, 处理函数), ...]，处理函数接收上一阶段的输出并返回本阶段输出
+            queue_size: 各阶段输入队列的容量（提交方在第一阶段队列满时阻塞，形成背压）
+            locks: 阶段名称 -> 锁，读写同一份状态的阶段持有同一把锁，避免与相邻帧交错执行
+            name: 线程名称前缀
+        """
+        if not stages:
+            raise ValueError("流水线至少需要一个阶段")
+
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.locks = locks or {}
+
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in self.stages]
+        self._stats = [StageStats(stage_name) for stage_name, _ in self.stages]
+        self._seq = 0
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._started_at = time.monotonic()
+
+        # 端到端统计
+        self.completed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self._completed_at = deque(maxlen=100)
+
+        self._threads = []
+        for index, (stage_name, _) in enumerate(self.stages):
+            thread = threading.Thread(target=self._run_stage, args=(index,),
+                                      name=f"{name}-{stage_name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def submit(self, value: Any, timeout: float = None) -> Future:
+        """
+        提交一帧（第一阶段队列已满时阻塞）
+
+        Returns:
+            Future，结果为最后一阶段的输出；任一阶段抛出异常时为该异常
+        """
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("流水线已关闭")
+            self._seq += 1
+            item = PipelineItem(self._seq, value)
+            self._queues[0].put(item, timeout=timeout)
+        return item.future
+
+    def process(self, value: Any, timeout: float = None) -> Any:
+        """提交一帧并等待结果"""
+        return self.submit(value).result(timeout)
+
+    def _run_stage(self, index: int):
+        stage_name, func = self.stages[index]
+        stats = self._stats[index]
+        lock = self.locks.get(stage_name)
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                if outbox is not None:
+                    outbox.put(_STOP)
+                return
+
+            # 前面阶段失败的帧只向后传递，保证结果按提交顺序完成
+            if item.error is None:
+                start = time.monotonic()
+                wait = 0.0
+                try:
+                    if lock is not None:
+                        with lock:
+                            wait = time.monotonic() - start
+                            item.value = func(item.value)
+                    else:
+                        item.value = func(item.value)
+                except Exception as e:
+                    item.error = e
+                    stats.errors += 1
+                    logger.error(f"流水线阶段 {stage_name} 处理第 {item.seq} 帧失败: {e}")
+                stats.record(time.monotonic() - start - wait, wait)
+
+            if outbox is not None:
+                outbox.put(item)
+            else:
+                self._finish(item)
+
+    def _finish(self, item: PipelineItem):
+        now = time.monotonic()
+        latency = now - item.submitted_at
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self._completed_at.append(now)
+        if item.error is not None:
+            self.failed += 1
+            item.future.set_exception(item.error)
+        else:
+            self.completed += 1
+            item.future.set_result(item.value)
+
+    def close(self, timeout: float = 10.0):
+        """处理完已提交的帧后停止所有阶段线程"""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queues[0].put(_STOP)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in self._threads):
+            logger.warning(f"流水线线程未在{timeout}秒内结束")
+
+    def get_statistics(self) -> Dict:
+        """各阶段耗时、端到端延迟和吞吐量"""
+        uptime = time.monotonic() - self._started_at
+        finished = max(self.completed + self.failed, 1)
+        completed_at = list(self._completed_at)
+        fps = 0.0
+        if len(completed_at) >= 2 and completed_at[-1] > completed_at[0]:
+            fps = (len(completed_at) - 1) / (completed_at[-1] - completed_at[0])
+        stages = {stats.name: stats.to_dict(uptime) for stats in self._stats}
+        bottleneck = max(stages, key=lambda name: stages[name]['avg_ms'])
+        return {
+            'stages': stages,
+            'bottleneck': bottleneck,
+            'in_flight': self._seq - self.completed - self.failed,
+            'completed': self.completed,
+            'failed': self.failed,
+            'avg_latency_ms': self.total_latency / finished * 1000,
+            'max_latency_ms': self.max_latency * 1000,
+            'fps': fps
+        }
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量统计模块
+以累加和实现的年龄/置信度/性别估计器，每次更新为O(1)且内存固定，
+替代在完整历史列表上反复求和的实现；可选指数衰减，使较新的观测权重更高
+"""
+
+from collections import deque
+from typing import Optional, Tuple
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class RunningMean:
+    """累加均值（decay=1.0时为精确算术平均）"""
+
+    __slots__ = ('decay', 'total', 'weight')
+
+    def __init__(self, decay: float = 1.0):
+        self.decay = decay
+        self.total = 0.0
+        self.weight = 0.0
+
+    def add(self, value: float, weight: float = 1.0):
+        if self.decay != 1.0:
+            self.total *= self.decay
+            self.weight *= self.decay
+        self.total += value * weight
+        self.weight += weight
+
+    @property
+    def count(self) -> float:
+        return self.weight
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.weight if self.weight > 0 else None
+
+class AgeEstimate:
+    """
+    人员档案的年龄估计：平均年龄置信度、平均人脸质量，以及按 置信度×质量 加权的平均年龄
+
+    同一张人脸同时带有置信度和质量时计入加权平均；尚无加权样本或权重全为0时使用简单平均
+    """
+
+    __slots__ = ('ages', 'confidences', 'qualities', 'weighted_ages')
+
+    def __init__(self, decay: float = 1.0):
+        self.ages = RunningMean(decay)
+        self.confidences = RunningMean(decay)
+        self.qualities = RunningMean(decay)
+        self.weighted_ages = RunningMean(decay)
+
+    def add(self, age: float, confidence: Optional[float] = None, quality: Optional[float] = None):
+        self.ages.add(age)
+        if confidence is not None:
+            self.confidences.add(confidence)
+        if quality is not None:
+            self.qualities.add(quality)
+        if confidence is not None and quality is not None:
+            self.weighted_ages.add(age, confidence * quality)
+        elif self.weighted_ages.decay != 1.0:
+            # 衰减模式下缺少权重的样本同样推进时间
+            self.weighted_ages.add(0.0, 0.0)
+
+    @property
+    def avg_age(self) -> Optional[float]:
+        if self.weighted_ages.weight > 0:
+            return self.weighted_ages.mean
+        return self.ages.mean
+
+    @property
+    def avg_confidence(self) -> Optional[float]:
+        return self.confidences.mean
+
+    @property
+    def avg_quality(self) -> Optional[float]:
+        return self.qualities.mean
+
+class GenderVotes:
+    """性别投票计数：票数多者为主要性别（平票时为Female，与原实现一致）"""
+
+    __slots__ = ('decay', 'male', 'female', 'total')
+
+    def __init__(self, decay: float = 1.0):
+        self.decay = decay
+        self.male = 0.0
+        self.female = 0.0
+        self.total = 0.0
+
+    def add(self, gender: str):
+        if self.decay != 1.0:
+            self.male *= self.decay
+            self.female *= self.decay
+            self.total *= self.decay
+        if gender == 'Male':
+            self.male += 1
+        elif gender == 'Female':
+            self.female += 1
+        self.total += 1
+
+    def dominant(self) -> Tuple[Optional[str], float]:
+        """(主要性别, 占比)"""
+        if self.total <= 0:
+            return None, 0.0
+        if self.male > self.female:
+            return 'Male', self.male / self.total
+        return 'Female', self.female / self.total
+
+class WindowedAgeStats:
+    """
+    滑动窗口内的加权年龄统计（AgeHistory使用）
+
+    维护窗口内各项的累加和，新样本进入时减去被挤出的样本；
+    每经过一个窗口长度的淘汰后从窗口重新求和，避免浮点误差累积
+    """
+
+    __slots__ = ('ages', 'confidences', 'qualities', 'age_sum', 'age_sq_sum', 'confidence_sum',
+                 'weight_sum', 'weighted_age_sum', 'nonzero_weights', '_evictions')
+
+    def __init__(self, maxlen: int = 20):
+        self.ages = deque(maxlen=maxlen)
+        self.confidences = deque(maxlen=maxlen)
+        self.qualities = deque(maxlen=maxlen)
+        self.age_sum = 0.0
+        self.age_sq_sum = 0.0
+        self.confidence_sum = 0.0
+        self.weight_sum = 0.0
+        self.weighted_age_sum = 0.0
+        self.nonzero_weights = 0
+        self._evictions = 0
+
+    def _account(self, age: float, confidence: float, quality: float, sign: int):
+        weight = confidence * quality
+        self.age_sum += sign * age
+        self.age_sq_sum += sign * age * age
+        self.confidence_sum += sign * confidence
+        self.weight_sum += sign * weight
+        self.weighted_age_sum += sign * age * weight
+        if weight != 0:
+            self.nonzero_weights += sign
+
+    def _resum(self):
+        self.age_sum = float(sum(self.ages))
+        self.age_sq_sum = float(sum(a * a for a in self.ages))
+        self.confidence_sum = float(sum(self.confidences))
+        weights = [c * q for c, q in zip(self.confidences, self.qualities)]
+        self.weight_sum = float(sum(weights))
+        self.weighted_age_sum = float(sum(a * w for a, w in zip(self.ages, weights)))
+        self.nonzero_weights = sum(1 for w in weights if w != 0)
+        self._evictions = 0
+
+    def add(self, age: float, confidence: float, quality: float):
+        if len(self.ages) == self.ages.maxlen:
+            self._account(self.ages[0], self.confidences[0], self.qualities[0], -1)
+            self._evictions += 1
+        self.ages.append(age)
+        self.confidences.append(confidence)
+        self.qualities.append(quality)
+        self._account(age, confidence, quality, 1)
+        if self._evictions >= self.ages.maxlen:
+            self._resum()
+
+    def __len__(self) -> int:
+        return len(self.ages)
+
+    def smoothed(self) -> Tuple[float, float]:
+        """(加权平均年龄, 平均置信度)；窗口为空时调用方需先判断"""
+        n = len(self.ages)
+        avg_confidence = self.confidence_sum / n
+        if self.nonzero_weights == 0:
+            return self.age_sum / n, avg_confidence
+        return self.weighted_age_sum / self.weight_sum, avg_confidence
+
+    def age_std(self) -> Optional[float]:
+        """窗口内年龄的标准差（样本少于2个时为None）"""
+        n = len(self.ages)
+        if n < 2:
+            return None
+        mean = self.age_sum / n
+        return max(0.0, self.age_sq_sum / n - mean * mean) ** 0.5
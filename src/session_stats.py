@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会话数据库统计缓存模块
+在写入数据库时同步维护人员/位置/人脸计数器，使每帧读取会话统计为O(1)且不访问MySQL；
+可定期用数据库查询结果校准计数器
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+import logging
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SessionStatsCounter:
+    """与 DatabaseManager.get_session_statistics 结构一致的内存统计"""
+
+    def __init__(self, session: Dict):
+        """
+        Args:
+            session: 会话基本信息（id、session_name、start_time等）
+        """
+        self.session = dict(session)
+        self._lock = threading.Lock()
+
+        # 每个轨迹最近一次写入的人员行（upsert时先减去旧值再加新值）
+        self._persons: Dict[int, tuple] = {}
+        self.person_offset = 0  # 校准时数据库人员数与内存计数的差值
+        self.age_sum = 0.0
+        self.age_count = 0
+        self.male_count = 0
+        self.female_count = 0
+        self.frames_sum = 0
+        self.total_positions = 0
+        self.total_faces = 0
+
+        self.created_at = time.time()
+        self.last_reconciled = None
+        self.reconcile_count = 0
+
+    @staticmethod
+    def _contribution(person: Dict) -> tuple:
+        gender = (person.get('dominant_gender') or '').lower()
+        return (person.get('avg_age'), gender, person.get('total_frames', 0) or 0)
+
+    def _apply(self, contribution: tuple, sign: int):
+        avg_age, gender, frames = contribution
+        if avg_age is not None:
+            self.age_sum += sign * float(avg_age)
+            self.age_count += sign
+        if gender == 'male':
+            self.male_count += sign
+        elif gender == 'female':
+            self.female_count += sign
+        self.frames_sum += sign * frames
+
+    def record_write(self, persons: List[Dict], positions: int, faces: int):
+        """
+        记录一次成功的写入
+
+        Args:
+            persons: 本次upsert的人员数据（需包含track_id）
+            positions: 写入的位置行数
+            faces: 写入的人脸行数
+        """
+        with self._lock:
+            for person in persons:
+                contribution = self._contribution(person)
+                previous = self._persons.get(person['track_id'])
+                if previous is not None:
+                    self._apply(previous, -1)
+                self._apply(contribution, 1)
+                self._persons[person['track_id']] = contribution
+            self.total_positions += positions
+            self.total_faces += faces
+
+    def reconcile(self, db_stats: Dict):
+        """用数据库查询结果（get_session_statistics 的返回值）校准计数器"""
+        if not db_stats:
+            return
+        person_stats = db_stats.get('person_stats') or {}
+        with self._lock:
+            total_persons = int(person_stats.get('total_persons') or 0)
+            drift = total_persons - len(self._persons) - self.person_offset
+            if drift:
+                logger.warning(f"会话 {self.session.get('id')} 人员计数与数据库相差 {drift}，已校准")
+            self.person_offset = total_persons - len(self._persons)
+
+            self.session.update(db_stats.get('session') or {})
+            avg_age = person_stats.get('avg_age')
+            self.age_count = sum(1 for c in self._persons.values() if c[0] is not None)
+            self.age_sum = float(avg_age) * self.age_count if avg_age is not None else 0.0
+            self.male_count = int(person_stats.get('male_count') or 0)
+            self.female_count = int(person_stats.get('female_count') or 0)
+            avg_frames = person_stats.get('avg_frames_per_person')
+            self.frames_sum = int(round(float(avg_frames) * total_persons)) if avg_frames is not None else 0
+            self.total_positions = int((db_stats.get('position_stats') or {}).get('total_positions') or 0)
+            self.total_faces = int((db_stats.get('face_stats') or {}).get('total_faces') or 0)
+            self.last_reconciled = time.time()
+            self.reconcile_count += 1
+
+    def needs_reconcile(self, interval: Optional[float]) -> bool:
+        """距上次校准是否已超过interval秒（interval为空或<=0表示不校准）"""
+        if not interval or interval <= 0:
+            return False
+        return time.time() - (self.last_reconciled or self.created_at) >= interval
+
+    def snapshot(self) -> Dict:
+        """获取统计快照"""
+        with self._lock:
+            total_persons = len(self._persons) + self.person_offset
+            return {
+                'session': dict(self.session),
+                'person_stats': {
+                    'total_persons': total_persons,
+                    'avg_age': self.age_sum / self.age_count if self.age_count else None,
+                    'male_count': self.male_count,
+                    'female_count': self.female_count,
+                    'avg_frames_per_person': self.frames_sum / total_persons if total_persons else None
+                },
+                'position_stats': {'total_positions': self.total_positions},
+                'face_stats': {'total_faces': self.total_faces},
+                'cache': {
+                    'last_reconciled': self.last_reconciled,
+                    'reconcile_count': self.reconcile_count
+                }
+            }
@@ -12,6 +12,7 @@ from typing import List, Tuple, Dict, Optional
 import logging
 from dataclasses import dataclass
 from datetime import datetime
+from detections import as_detections
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -26,17 +27,19 @@ class PersonTrack:
     center: Tuple[int, int]
     timestamp: datetime
     age: int  # 轨迹存在的帧数
+    predicted: bool = False  # 本帧框来自卡尔曼预测（没有匹配到检测）
 
 class PersonTracker:
     """人员跟踪器"""
     
-    def __init__(self, max_age: int = 30, n_init: int = 3):
+    def __init__(self, max_age: int = 30, n_init: int = 3, shared_embedder: bool = False):
         """
         初始化跟踪器
         
         Args:
             max_age: 轨迹最大存活时间（帧数）
             n_init: 确认轨迹所需的连续检测次数
+            shared_embedder: 是否使用进程内共享的外观特征提取器（跟踪状态仍为本实例独有）
         """
         self.max_age = max_age
         self.n_init = n_init
@@ -46,21 +49,27 @@ class PersonTracker:
             max_age=max_age,
             n_init=n_init,
             max_cosine_distance=0.2,
-            nn_budget=100
+            nn_budget=100,
+            embedder=None if shared_embedder else 'mobilenet'
         )
         
+        if shared_embedder:
+            # DeepSort.generate_embeds 通过 self.embedder.predict 提取特征，替换为共享句柄
+            from model_registry import get_model_registry
+            self.tracker.embedder = get_model_registry().get_reid_embedder()
+        
         # 轨迹历史记录
         self.track_history: Dict[int, List[Tuple[int, int, datetime]]] = {}
         self.active_tracks: Dict[int, PersonTrack] = {}
         
         logger.info("人员跟踪器初始化完成")
     
-    def update(self, detections: List[Tuple[int, int, int, int, float]], frame: np.ndarray) -> List[PersonTrack]:
+    def update(self, detections: np.ndarray, frame: np.ndarray) -> List[PersonTrack]:
         """
         更新跟踪器
         
         Args:
-            detections: 检测结果列表 [(x1, y1, x2, y2, confidence), ...]
+            detections: (N, 5) 检测结果数组 [x1, y1, x2, y2, confidence]（也接受同格式的元组列表）
             frame: 当前帧图像
             
         Returns:
@@ -69,53 +78,18 @@ class PersonTracker:
         current_time = datetime.now()
         
         # 转换检测格式为DeepSORT需要的格式
-        # DeepSORT需要 ([left, top, w, h], confidence, detection_class)
-        deepsort_detections = []
-        for x1, y1, x2, y2, conf in detections:
-            w = x2 - x1
-            h = y2 - y1
-            deepsort_detections.append(([x1, y1, w, h], conf, 'person'))
+        # DeepSORT需要 ([left, top, w, h], confidence, detection_class)，整批换算后一次转为列表
+        detections = as_detections(detections)
+        deepsort_detections = [
+            (box, conf, 'person')
+            for box, conf in zip(detections.xywh.tolist(), detections.confidence.tolist())
+        ]
         
         try:
             # 更新跟踪器
             tracks = self.tracker.update_tracks(deepsort_detections, frame=frame)
             
-            # 处理跟踪结果
-            current_tracks = []
-            for track in tracks:
-                if not track.is_confirmed():
-                    continue
-                
-                track_id = track.track_id
-                ltrb = track.to_ltrb()
-                
-                if ltrb is not None:
-                    x1, y1, x2, y2 = map(int, ltrb)
-                    center_x = (x1 + x2) // 2
-                    center_y = (y1 + y2) // 2
-                    
-                    # 创建轨迹对象
-                    person_track = PersonTrack(
-                        track_id=track_id,
-                        bbox=(x1, y1, x2, y2),
-                        confidence=0.8,  # DeepSORT不直接提供置信度
-                        center=(center_x, center_y),
-                        timestamp=current_time,
-                        age=track.age if hasattr(track, 'age') else 1
-                    )
-                    
-                    current_tracks.append(person_track)
-                    self.active_tracks[track_id] = person_track
-                    
-                    # 更新轨迹历史
-                    if track_id not in self.track_history:
-                        self.track_history[track_id] = []
-                    self.track_history[track_id].append((center_x, center_y, current_time))
-                    
-                    # 限制历史记录长度
-                    if len(self.track_history[track_id]) > 100:
-                        self.track_history[track_id] = self.track_history[track_id][-100:]
-            
+            current_tracks = self._collect_tracks(tracks, current_time)
             logger.debug(f"当前活跃轨迹数: {len(current_tracks)}")
             return current_tracks
             
@@ -123,6 +97,64 @@ class PersonTracker:
             logger.error(f"跟踪更新失败: {e}")
             return []
     
+    def predict(self) -> List[PersonTrack]:
+        """
+        只用卡尔曼滤波推进轨迹状态（跳过检测的帧使用，不提取外观特征、不做匹配）
+        
+        与 update_tracks 内部的预测步骤相同，下一次 update 会在此基础上继续预测并匹配；
+        轨迹的未匹配帧数照常累加，长时间只预测的轨迹在下一次 update 时按 max_age 删除
+        
+        Returns:
+            已确认轨迹的预测框（predicted=True）
+        """
+        current_time = datetime.now()
+        try:
+            self.tracker.tracker.predict()
+            return self._collect_tracks(self.tracker.tracker.tracks, current_time)
+        except Exception as e:
+            logger.error(f"轨迹预测失败: {e}")
+            return []
+    
+    def _collect_tracks(self, tracks: List, current_time: datetime) -> List[PersonTrack]:
+        """将DeepSORT轨迹转换为PersonTrack并更新轨迹历史（只保留已确认的轨迹）"""
+        current_tracks = []
+        for track in tracks:
+            if not track.is_confirmed():
+                continue
+            
+            track_id = track.track_id
+            ltrb = track.to_ltrb()
+            
+            if ltrb is not None:
+                x1, y1, x2, y2 = map(int, ltrb)
+                center_x = (x1 + x2) // 2
+                center_y = (y1 + y2) // 2
+                
+                # 创建轨迹对象
+                person_track = PersonTrack(
+                    track_id=track_id,
+                    bbox=(x1, y1, x2, y2),
+                    confidence=0.8,  # DeepSORT不直接提供置信度
+                    center=(center_x, center_y),
+                    timestamp=current_time,
+                    age=track.age if hasattr(track, 'age') else 1,
+                    predicted=track.time_since_update > 0
+                )
+                
+                current_tracks.append(person_track)
+                self.active_tracks[track_id] = person_track
+                
+                # 更新轨迹历史
+                if track_id not in self.track_history:
+                    self.track_history[track_id] = []
+                self.track_history[track_id].append((center_x, center_y, current_time))
+                
+                # 限制历史记录长度
+                if len(self.track_history[track_id]) > 100:
+                    self.track_history[track_id] = self.track_history[track_id][-100:]
+        
+        return current_tracks
+    
     def get_track_path(self, track_id: int, max_points: int = 30) -> List[Tuple[int, int]]:
         """
         获取指定轨迹的路径点
@@ -10,6 +10,7 @@ from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Quer
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.websockets import WebSocketState
 import uvicorn
 import json
 import asyncio
@@ -24,12 +25,19 @@ from pathlib import Path
 import traceback
 import uuid
 import time
+from concurrent.futures import Future
 import ssl
 import os
 import ipaddress
 
 from src.complete_analyzer import CompleteAnalyzer
 from src.database import DatabaseManager
+# 与分析器模块使用相同的导入路径，保证注册表单例在进程内唯一
+from model_registry import get_model_registry
+from frame_executor import FrameExecutor
+from frame_slot import LatestFrameSlot
+from frame_protocol import (decode_frame, encode_frame, encode_stats, negotiate,
+                            FrameProtocolError, MSG_VIDEO_FRAME, MSG_FRAME_RESULT)
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -37,26 +45,49 @@ logger = logging.getLogger(__name__)
 
 class UserSession:
     """用户会话类"""
+    
+    # 实时会话启用的分析优化（IntegratedAnalyzer 默认全部关闭）
+    ANALYZER_OPTIONS = {
+        'roi_face_detection': True,
+        'face_scheduling': True,
+        'async_faces': True,
+        'motion_gating': True
+    }
+    
     def __init__(self, user_id: str, username: str = None):
         self.user_id = user_id
         self.username = username or f"用户_{user_id[:8]}"
         self.analyzer = None
+        self.pipeline = None  # 流水线模式下的多阶段执行器
         self.is_running = False
         self.frame_count = 0
-        self.current_frame = None
+        self.render_mode = CompleteAnalyzer.RENDER_FRAME
         self.current_stats = {}
         self.created_at = datetime.now()
         self.last_activity = datetime.now()
         
-    def start_analysis(self, db_config: Dict = None):
-        """启动分析"""
+    def start_analysis(self, db_config: Dict = None, pipeline_depth: int = 0):
+        """
+        启动分析
+        
+        Args:
+            db_config: 数据库配置
+            pipeline_depth: 流水线模式下同时在途的最大帧数，0表示逐帧顺序处理
+        """
         if not self.is_running:
             self.analyzer = CompleteAnalyzer(
                 session_name=f"{self.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
                 use_insightface=True,
                 db_config=db_config,
-                save_interval=10
+                save_interval=10,
+                shared_models=True,
+                analyzer_options=self.ANALYZER_OPTIONS
             )
+            if pipeline_depth > 0:
+                # 队列容量不小于在途帧数，提交方不会在事件循环中阻塞
+                self.pipeline = self.analyzer.create_pipeline(
+                    decode=self._decode_frame, encode=self._encode_frame, queue_size=pipeline_depth
+                )
             self.is_running = True
             self.frame_count = 0
             logger.info(f"用户 {self.username} 开始分析")
@@ -72,22 +103,32 @@ class UserSession:
                     logger.error(f"关闭分析器失败: {e}")
                 finally:
                     self.analyzer = None
+                    self.pipeline = None
             logger.info(f"用户 {self.username} 停止分析")
     
-    def process_frame(self, frame_data: str):
-        """处理来自浏览器的视频帧"""
+    def set_render_mode(self, render_mode: str):
+        """设置结果输出模式（'frame' 返回标注图像，'overlay' 只返回叠加层描述）"""
+        if render_mode in (CompleteAnalyzer.RENDER_FRAME, CompleteAnalyzer.RENDER_OVERLAY):
+            self.render_mode = render_mode
+        return self.render_mode
+    
+    def process_frame(self, frame_data, binary_output: bool = False):
+        """
+        处理来自浏览器的视频帧
+        
+        Args:
+            frame_data: base64 data URL字符串（文本协议）或原始JPEG字节（二进制协议）
+            binary_output: 是否返回原始JPEG字节（否则返回data URL）
+            
+        Returns:
+            (结果图像, 统计信息)；叠加层模式下结果图像为None，叠加层描述位于统计信息的'overlay'中
+        """
         try:
             if not self.is_running or not self.analyzer:
                 logger.warning(f"用户 {self.username}: 处理条件不满足 - is_running={self.is_running}, analyzer={bool(self.analyzer)}")
                 return None, {}
             
-            # 解码base64图像
-            header, encoded = frame_data.split(',', 1)
-            image_data = base64.b64decode(encoded)
-            
-            # 转换为numpy数组
-            nparr = np.frombuffer(image_data, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = self._decode_frame(frame_data)
             
             if frame is None:
                 logger.warning(f"用户 {self.username}: 无法解码图像")
@@ -95,6 +136,16 @@ class UserSession:
             
             logger.debug(f"用户 {self.username}: 成功解码图像，尺寸: {frame.shape}")
             
+            if self.render_mode == CompleteAnalyzer.RENDER_OVERLAY:
+                # 叠加层模式：不绘制、不编码，客户端在实时画面上自行渲染
+                result = self.analyzer.analyze_frame(frame)
+                stats = result['stats']
+                stats['overlay'] = result['overlay']
+                self.current_stats = stats
+                self.frame_count += 1
+                self.last_activity = datetime.now()
+                return None, stats
+            
             # 处理帧
             result_frame, stats = self.analyzer.process_frame(frame)
             
@@ -103,34 +154,188 @@ class UserSession:
                 return None, {}
             
             # 编码结果帧
-            # 性能优化：降低JPEG质量以提高编码速度
-            _, buffer = cv2.imencode('.jpg', result_frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
-            result_base64 = base64.b64encode(buffer).decode('utf-8')
+            buffer = self._encode_frame(result_frame)
+            if binary_output:
+                result = buffer.tobytes()
+            else:
+                result = f"data:image/jpeg;base64,{base64.b64encode(buffer).decode('utf-8')}"
             
-            self.current_frame = f"data:image/jpeg;base64,{result_base64}"
             self.current_stats = stats
             self.frame_count += 1
             self.last_activity = datetime.now()
             
             logger.debug(f"用户 {self.username}: 帧处理完成，帧数: {self.frame_count}")
             
-            return self.current_frame, stats
+            return result, stats
             
         except Exception as e:
             logger.error(f"用户 {self.username} 处理帧失败: {e}")
             import traceback
             logger.error(traceback.format_exc())
             return None, {}
+    
+    def analyze_frame(self, frame_data) -> Optional[Dict]:
+        """
+        分析移动端上传的单帧（不绘制）
+        
+        Args:
+            frame_data: 原始图像字节
+            
+        Returns:
+            analyze_frame 的结果字典；未在分析时为None，无法解码时抛出 ValueError
+        """
+        if not self.is_running or not self.analyzer:
+            return None
+        
+        frame = self._decode_frame(frame_data)
+        if frame is None:
+            raise ValueError("无效的图像数据")
+        
+        result = self.analyzer.analyze_frame(frame)
+        self.current_stats = result['stats']
+        self.frame_count += 1
+        self.last_activity = datetime.now()
+        return result
+    
+    @staticmethod
+    def _decode_frame(frame_data) -> Optional[np.ndarray]:
+        """解码浏览器帧（base64 data URL字符串或原始JPEG字节）"""
+        if isinstance(frame_data, str):
+            # 解码base64图像
+            header, encoded = frame_data.split(',', 1)
+            image_data = base64.b64decode(encoded)
+        else:
+            # 二进制协议：直接使用JPEG字节（memoryview不复制）
+            image_data = frame_data
+        
+        # 转换为numpy数组
+        nparr = np.frombuffer(image_data, np.uint8)
+        return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    
+    @staticmethod
+    def _encode_frame(result_frame: np.ndarray) -> np.ndarray:
+        """编码结果帧（性能优化：降低JPEG质量以提高编码速度）"""
+        _, buffer = cv2.imencode('.jpg', result_frame, [cv2.IMWRITE_JPEG_QUALITY, 60])
+        return buffer
+    
+    def submit_frame(self, frame_data, binary_output: bool = False) -> Future:
+        """
+        流水线模式：提交帧后立即返回，结果按提交顺序完成
+        
+        Returns:
+            Future，结果与 process_frame 的返回值相同
+        """
+        result_future = Future()
+        pipeline = self.pipeline
+        if not self.is_running or pipeline is None:
+            result_future.set_result((None, {}))
+            return result_future
+        
+        render_mode = self.render_mode
+        try:
+            pipeline_future = pipeline.submit({'data': frame_data, 'render_mode': render_mode})
+        except RuntimeError as e:
+            # 分析已停止，流水线已关闭
+            logger.debug(f"用户 {self.username} 流水线不可用: {e}")
+            result_future.set_result((None, {}))
+            return result_future
+        
+        def on_done(future: Future):
+            try:
+                ctx = future.result()
+            except Exception as e:
+                logger.error(f"用户 {self.username} 流水线处理帧失败: {e}")
+                result_future.set_result((None, {}))
+                return
+            
+            stats = ctx['stats']
+            if render_mode == CompleteAnalyzer.RENDER_OVERLAY:
+                stats['overlay'] = ctx['overlay']
+                result = None
+            elif binary_output:
+                result = ctx['output'].tobytes()
+            else:
+                result = f"data:image/jpeg;base64,{base64.b64encode(ctx['output']).decode('utf-8')}"
+            
+            self.current_stats = stats
+            self.frame_count += 1
+            self.last_activity = datetime.now()
+            result_future.set_result((result, stats))
+        
+        pipeline_future.add_done_callback(on_done)
+        return result_future
+    
+    def get_stats_payload(self) -> Optional[Dict]:
+        """获取实时统计、行为统计和年龄分布（未运行时返回None）"""
+        if not self.analyzer or not self.is_running:
+            return None
+        # 在分析器状态锁内计算（流水线模式下分析线程与本调用并发）
+        snapshot = self.analyzer.get_snapshot(('realtime', 'behavior'))
+        return {
+            "realtime": snapshot.realtime,
+            "behavior": snapshot.behavior,
+            "age_distribution": snapshot.age_distribution
+        }
+    
+    def get_age_distribution(self) -> Dict:
+        """获取年龄分布数据（取自最近一帧的统计快照）"""
+        try:
+            if not self.analyzer:
+                return {"0-17": 0, "18-25": 0, "26-35": 0, "36-45": 0, "46-55": 0, "56-65": 0, "65+": 0}
+            return self.analyzer.get_snapshot(('realtime',)).age_distribution
+            
+        except Exception as e:
+            logger.error(f"获取年龄分布失败: {e}")
+            return {"0-17": 0, "18-25": 0, "26-35": 0, "36-45": 0, "46-55": 0, "56-65": 0, "65+": 0}
+    
+    def export_state(self) -> Dict:
+        """导出会话状态（进程池模式下同步回主进程）"""
+        return {
+            "is_running": self.is_running,
+            "frame_count": self.frame_count,
+            "last_activity": self.last_activity
+        }
+    
+    def import_state(self, state: Dict):
+        """导入工作进程中的会话状态"""
+        self.is_running = state["is_running"]
+        self.frame_count = state["frame_count"]
+        self.last_activity = state["last_activity"]
 
 class WebApp:
     """AI人流分析Web应用"""
     
-    def __init__(self, db_config: Dict = None):
-        """初始化Web应用"""
+    def __init__(self, db_config: Dict = None, preload_models: bool = False,
+                 executor_mode: str = FrameExecutor.MODE_THREAD, frame_workers: int = 4,
+                 pipeline_depth: int = 0):
+        """
+        初始化Web应用
+        
+        Args:
+            db_config: 数据库配置字典
+            preload_models: 是否在启动时预加载共享模型（避免首个会话启动等待）
+            executor_mode: 帧处理执行模式，'thread'、'process' 或 'inline'（在事件循环中执行）
+            frame_workers: 帧处理工作线程数/工作进程数
+            pipeline_depth: 每个会话流水线同时在途的最大帧数（0为逐帧顺序处理；进程池模式下不可用）
+        """
         self.app = FastAPI(title="AI人流分析系统", version="1.0.0")
         self.db_config = db_config
         self.db = DatabaseManager(db_config)
         
+        # 共享模型注册表（所有会话共用一份模型）
+        self.model_registry = get_model_registry()
+        if preload_models:
+            self.model_registry.preload(use_insightface=True)
+        
+        # 帧处理执行器（事件循环只负责I/O，分析在工作线程/进程中按会话顺序执行）
+        self.frame_executor = FrameExecutor(mode=executor_mode, max_workers=frame_workers)
+        
+        # 会话流水线（解码/检测/分析/绘制/编码各一个线程，结果需在本进程中取回）
+        if pipeline_depth > 0 and executor_mode == FrameExecutor.MODE_PROCESS:
+            logger.warning("进程池模式下不支持流水线，使用逐帧顺序处理")
+            pipeline_depth = 0
+        self.pipeline_depth = pipeline_depth
+        
         # 用户会话管理
         self.user_sessions: Dict[str, UserSession] = {}
         self.websocket_connections: Dict[str, WebSocket] = {}
@@ -271,8 +476,10 @@ class WebApp:
                             inactive_users.append(user_id)
                     
                     for user_id in inactive_users:
-                        logger.info(f"清理无活动用户: {self.user_sessions[user_id].username}")
-                        self.user_sessions[user_id].stop_analysis()
+                        session = self.user_sessions[user_id]
+                        logger.info(f"清理无活动用户: {session.username}")
+                        self.frame_executor.call_sync(session, 'stop_analysis')
+                        self.frame_executor.release(session)
                         del self.user_sessions[user_id]
                         if user_id in self.websocket_connections:
                             del self.websocket_connections[user_id]
@@ -308,6 +515,7 @@ class WebApp:
             
             user_id = str(uuid.uuid4())
             session = UserSession(user_id, username)
+            self.frame_executor.attach(session)
             self.user_sessions[user_id] = session
             
             logger.info(f"创建用户会话: {session.username} (ID: {user_id})")
@@ -343,7 +551,8 @@ class WebApp:
             try:
                 session = self.user_sessions[user_id]
                 if not session.is_running:
-                    session.start_analysis(db_config=self.db_config)
+                    await self.frame_executor.call(session, 'start_analysis', db_config=self.db_config,
+                                                   pipeline_depth=self.pipeline_depth)
                     return {"status": "success", "message": f"{session.username} 分析已开始"}
                 else:
                     return {"status": "info", "message": f"{session.username} 分析已在运行中"}
@@ -360,7 +569,7 @@ class WebApp:
             try:
                 session = self.user_sessions[user_id]
                 if session.is_running:
-                    session.stop_analysis()
+                    await self.frame_executor.call(session, 'stop_analysis')
                     return {"status": "success", "message": f"{session.username} 分析已停止"}
                 else:
                     return {"status": "info", "message": f"{session.username} 分析未在运行"}
@@ -376,18 +585,11 @@ class WebApp:
             
             try:
                 session = self.user_sessions[user_id]
-                if session.analyzer and session.is_running:
-                    # 获取实时统计
-                    realtime_stats = session.analyzer.persistent_analyzer.get_realtime_statistics()
-                    behavior_stats = session.analyzer.behavior_analyzer.get_behavior_summary()
-                    
-                    # 获取年龄分布数据
-                    age_distribution = self._get_age_distribution(session)
-                    
+                # 统计读取与帧处理同样排队执行，避免与分析线程并发访问分析器
+                payload = await self.frame_executor.call(session, 'get_stats_payload') if session.is_running else None
+                if payload:
                     return {
-                        "realtime": realtime_stats,
-                        "behavior": behavior_stats,
-                        "age_distribution": age_distribution,
+                        **payload,
                         "frame_count": session.frame_count,
                         "username": session.username,
                         "timestamp": datetime.now().isoformat()
@@ -424,45 +626,151 @@ class WebApp:
             self.websocket_connections[user_id] = websocket
             session = self.user_sessions[user_id]
             
+            # 每个连接一个单帧接收槽：接收协程只覆盖最新帧，处理协程取最新帧分析
+            frame_slot = LatestFrameSlot()
+            send_lock = asyncio.Lock()
+            
+            async def send_json(payload: Dict):
+                async with send_lock:
+                    await websocket.send_text(json.dumps(payload))
+            
+            async def send_result(result_frame, stats: Dict, header, binary: bool):
+                # 附带丢帧率和排队时长，供客户端节流；年龄分布取自同一帧快照的实时统计
+                realtime = stats.get("realtime", {}) if stats else {}
+                result_stats = {
+                    "realtime": realtime,
+                    "behavior": stats.get("behavior", {}) if stats else {},
+                    "age_distribution": realtime.get("age_distribution", {}),
+                    "ingest": frame_slot.get_statistics(),
+                    "frame_count": session.frame_count,
+                    "username": session.username,
+                    "timestamp": datetime.now().isoformat()
+                }
+                overlay = stats.get("overlay") if stats else None
+                
+                if binary:
+                    # 二进制协议：结果帧为原始JPEG，统计数据单独发送紧凑文本消息
+                    async with send_lock:
+                        if result_frame is not None:
+                            await websocket.send_bytes(encode_frame(
+                                MSG_FRAME_RESULT, result_frame, header.frame_id, header.timestamp
+                            ))
+                        await websocket.send_text(encode_stats(header.frame_id, result_stats, overlay))
+                else:
+                    await send_json({
+                        "type": "frame_result",
+                        "frame": result_frame,
+                        "overlay": overlay,
+                        "stats": result_stats
+                    })
+                logger.debug(f"已发送处理结果给用户 {session.username}")
+            
+            # 流水线模式：处理协程只提交帧，发送协程按提交顺序等待结果，最多pipeline_depth帧在途
+            in_flight: Optional[asyncio.Queue] = None
+            if self.pipeline_depth > 0:
+                in_flight = asyncio.Queue(maxsize=self.pipeline_depth)
+            
+            async def send_pipelined_results():
+                while True:
+                    future, header, binary, started_at = await in_flight.get()
+                    try:
+                        result_frame, stats = await future
+                        frame_slot.task_done(time.perf_counter() - started_at)
+                        await send_result(result_frame, stats, header, binary)
+                    except Exception as e:
+                        logger.error(f"用户 {session.username} 帧结果发送错误: {e}")
+                        if websocket.client_state != WebSocketState.CONNECTED:
+                            return
+            
+            async def process_frames():
+                while True:
+                    item, queue_age = await frame_slot.get()
+                    if item is None:
+                        return
+                    if not session.is_running:
+                        continue
+                    
+                    frame_data, header = item
+                    binary = header is not None
+                    try:
+                        started_at = time.perf_counter()
+                        if in_flight is not None and session.pipeline is not None:
+                            # 提交也经由执行器，与同一会话的启动/停止/统计调用按顺序执行；提交本身不等待处理
+                            submitted = await self.frame_executor.call(
+                                session, 'submit_frame', frame_data, binary_output=binary
+                            )
+                            future = asyncio.wrap_future(submitted)
+                            await in_flight.put((future, header, binary, started_at))
+                            continue
+                        
+                        result_frame, stats = await self.frame_executor.call(
+                            session, 'process_frame', frame_data, binary_output=binary
+                        )
+                        frame_slot.task_done(time.perf_counter() - started_at)
+                        await send_result(result_frame, stats, header, binary)
+                    except Exception as e:
+                        logger.error(f"用户 {session.username} 帧处理任务错误: {e}")
+                        if websocket.client_state != WebSocketState.CONNECTED:
+                            return
+            
+            processor = asyncio.create_task(process_frames())
+            sender = asyncio.create_task(send_pipelined_results()) if in_flight is not None else None
+            
             logger.info(f"WebSocket连接已建立: {session.username}")
             
             try:
                 while True:
-                    # 接收消息
-                    message = await websocket.receive_text()
-                    data = json.loads(message)
+                    # 接收消息（文本或二进制）
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", 1000))
+                    
+                    if message.get("bytes") is not None:
+                        # 二进制协议视频帧：头部 + 原始JPEG
+                        try:
+                            header, payload = decode_frame(message["bytes"])
+                        except FrameProtocolError as e:
+                            logger.warning(f"用户 {session.username} 二进制帧格式错误: {e}")
+                            continue
+                        if header.msg_type == MSG_VIDEO_FRAME and session.is_running:
+                            if frame_slot.put((payload, header)):
+                                logger.debug(f"用户 {session.username} 丢弃过期帧，累计 {frame_slot.dropped_frames}")
+                        continue
+                    
+                    data = json.loads(message["text"])
                     
-                    if data.get("type") == "video_frame":
-                        # 处理视频帧
+                    if data.get("type") == "connection":
+                        # 协议协商：客户端声明支持binary-v1时使用二进制帧传输
+                        protocol = negotiate(data.get("protocols"))
+                        # 输出模式协商：overlay模式下服务端只返回叠加层描述
+                        render_mode = session.render_mode
+                        if data.get("render_mode"):
+                            render_mode = await self.frame_executor.call(session, 'set_render_mode', data["render_mode"])
+                        await send_json({
+                            "type": "connection_established",
+                            "user_id": user_id,
+                            "protocol": protocol,
+                            "render_mode": render_mode,
+                            "timestamp": datetime.now().isoformat()
+                        })
+                        logger.info(f"用户 {session.username} 使用传输协议: {protocol}, 输出模式: {render_mode}")
+                    
+                    elif data.get("type") == "video_frame":
+                        # 放入接收槽，未处理的旧帧被丢弃
                         frame_data = data.get("frame")
                         if frame_data and session.is_running:
-                            logger.debug(f"处理用户 {session.username} 的视频帧")
-                            result_frame, stats = session.process_frame(frame_data)
-                            
-                            # 发送处理结果
-                            response = {
-                                "type": "frame_result",
-                                "frame": result_frame,
-                                "stats": {
-                                    "realtime": stats.get("realtime", {}) if stats else {},
-                                    "behavior": stats.get("behavior", {}) if stats else {},
-                                    "age_distribution": self._get_age_distribution(session),
-                                    "frame_count": session.frame_count,
-                                    "username": session.username,
-                                    "timestamp": datetime.now().isoformat()
-                                }
-                            }
-                            await websocket.send_text(json.dumps(response))
-                            logger.debug(f"已发送处理结果给用户 {session.username}")
+                            if frame_slot.put((frame_data, None)):
+                                logger.debug(f"用户 {session.username} 丢弃过期帧，累计 {frame_slot.dropped_frames}")
                         else:
                             logger.warning(f"用户 {session.username} 帧处理条件不满足: frame_data={bool(frame_data)}, is_running={session.is_running}")
                     
                     elif data.get("type") == "get_stats":
                         # 发送统计数据
-                        if session.analyzer and session.is_running:
-                            realtime_stats = session.analyzer.persistent_analyzer.get_realtime_statistics()
-                            behavior_stats = session.analyzer.behavior_analyzer.get_behavior_summary()
-                            age_distribution = self._get_age_distribution(session)
+                        payload = await self.frame_executor.call(session, 'get_stats_payload') if session.is_running else None
+                        if payload:
+                            realtime_stats = payload["realtime"]
+                            behavior_stats = payload["behavior"]
+                            age_distribution = payload["age_distribution"]
                         else:
                             realtime_stats = {"total_people": 0, "active_tracks": 0, "avg_age": None, "male_count": 0, "female_count": 0}
                             behavior_stats = {"shoppers": 0, "browsers": 0, "avg_engagement_score": 0, "avg_dwell_time": 0, "shopper_rate": 0}
@@ -474,19 +782,24 @@ class WebApp:
                                 "realtime": realtime_stats,
                                 "behavior": behavior_stats,
                                 "age_distribution": age_distribution,
+                                "ingest": frame_slot.get_statistics(),
                                 "frame_count": session.frame_count,
                                 "is_running": session.is_running,
                                 "username": session.username,
                                 "timestamp": datetime.now().isoformat()
                             }
                         }
-                        await websocket.send_text(json.dumps(response))
+                        await send_json(response)
                     
             except WebSocketDisconnect:
                 logger.info(f"WebSocket连接断开: {session.username}")
             except Exception as e:
                 logger.error(f"WebSocket错误: {e}")
             finally:
+                frame_slot.close()
+                processor.cancel()
+                if sender is not None:
+                    sender.cancel()
                 if user_id in self.websocket_connections:
                     del self.websocket_connections[user_id]
                 logger.info(f"WebSocket连接已移除: {session.username}")
@@ -556,36 +869,26 @@ class WebApp:
                 # 读取图像数据
                 frame_data = await frame_file.read()
                 
-                # 转换为numpy数组
-                import numpy as np
-                import cv2
-                
-                nparr = np.frombuffer(frame_data, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if frame is None:
+                # 解码和分析都经由执行器，不阻塞事件循环，并与该会话的其他调用按顺序执行
+                try:
+                    result = await self.frame_executor.call(session, 'analyze_frame', frame_data)
+                except ValueError:
                     raise HTTPException(status_code=400, detail="无效的图像数据")
                 
-                # 使用分析器处理帧
-                if session.analyzer is None:
-                    session.analyzer = CompleteAnalyzer(db_config=self.db_config)
-                
-                result = session.analyzer.analyze_frame(frame)
-                
-                # 更新会话统计
-                session.frame_count += 1
-                session.last_activity = datetime.now()
+                if result is None:
+                    raise HTTPException(status_code=409, detail="分析未启动")
                 
                 # 提取人脸信息
                 faces = []
                 if result and 'faces' in result:
                     for face in result['faces']:
+                        x1, y1, x2, y2 = face.get('bbox', [0, 0, 0, 0])
                         face_info = {
                             'box': {
-                                'x': int(face.get('bbox', [0, 0, 0, 0])[0]),
-                                'y': int(face.get('bbox', [0, 0, 0, 0])[1]),
-                                'width': int(face.get('bbox', [0, 0, 0, 0])[2]),
-                                'height': int(face.get('bbox', [0, 0, 0, 0])[3])
+                                'x': int(x1),
+                                'y': int(y1),
+                                'width': int(x2 - x1),
+                                'height': int(y2 - y1)
                             }
                         }
                         
@@ -609,6 +912,8 @@ class WebApp:
                 
                 return response_data
                 
+            except HTTPException:
+                raise
             except Exception as e:
                 logger.error(f"分析帧失败: {e}")
                 raise HTTPException(status_code=500, detail="分析帧失败")
@@ -670,47 +975,6 @@ class WebApp:
             "timestamp": datetime.now().isoformat()
         }
     
-    def _get_age_distribution(self, session: UserSession):
-        """获取年龄分布数据"""
-        try:
-            if not session.analyzer:
-                return {"0-17": 0, "18-25": 0, "26-35": 0, "36-45": 0, "46-55": 0, "56-65": 0, "65+": 0}
-            
-            # 获取人员档案
-            if hasattr(session.analyzer.persistent_analyzer, 'analyzer'):
-                profiles = session.analyzer.persistent_analyzer.analyzer.person_profiles
-            else:
-                profiles = session.analyzer.persistent_analyzer.person_profiles
-            
-            age_groups = {
-                "0-17": 0, "18-25": 0, "26-35": 0, 
-                "36-45": 0, "46-55": 0, "56-65": 0, "65+": 0
-            }
-            
-            for track_id, profile in profiles.items():
-                if profile.avg_age is not None:
-                    age = profile.avg_age
-                    if age < 18:
-                        age_groups["0-17"] += 1
-                    elif age < 26:
-                        age_groups["18-25"] += 1
-                    elif age < 36:
-                        age_groups["26-35"] += 1
-                    elif age < 46:
-                        age_groups["36-45"] += 1
-                    elif age < 56:
-                        age_groups["46-55"] += 1
-                    elif age < 66:
-                        age_groups["56-65"] += 1
-                    else:
-                        age_groups["65+"] += 1
-            
-            return age_groups
-            
-        except Exception as e:
-            logger.error(f"获取年龄分布失败: {e}")
-            return {"0-17": 0, "18-25": 0, "26-35": 0, "36-45": 0, "46-55": 0, "56-65": 0, "65+": 0}
-    
     def _get_main_page(self) -> str:
         """获取主页HTML"""
         return """
@@ -1309,6 +1573,8 @@ class WebApp:
                                 console.log('收到WebSocket消息:', data.type);
                                 
                                 if (data.type === 'frame_result') {
+                                    // 结果返回后才允许发送下一帧，并根据服务端丢帧率/排队时长调整采集间隔
+                                    onFrameResult(data.stats && data.stats.ingest);
                                     // 显示处理后的帧
                                     if (data.frame) {
                                         processedVideo.src = data.frame;
@@ -1399,6 +1665,23 @@ class WebApp:
                 let frameSkipCount = 0;
                 let adaptiveQuality = 0.6;
                 let adaptiveScale = 0.8;
+                let captureIntervalMs = 100;      // 自适应采集间隔
+                const MIN_CAPTURE_INTERVAL = 100;
+                const MAX_CAPTURE_INTERVAL = 1000;
+                const FRAME_RESULT_TIMEOUT = 2000; // 结果丢失时的兜底超时
+                
+                function onFrameResult(ingest) {
+                    isProcessing = false;
+                    if (!ingest) return;
+                    
+                    // 服务端仍在丢帧或帧排队过久：放慢采集；否则逐步向处理耗时靠拢
+                    if (ingest.drop_rate > 0.1 || ingest.queue_age_ms > captureIntervalMs) {
+                        captureIntervalMs = Math.min(MAX_CAPTURE_INTERVAL, captureIntervalMs * 1.25);
+                    } else {
+                        const target = Math.max(MIN_CAPTURE_INTERVAL, ingest.processing_ms);
+                        captureIntervalMs = Math.max(target, captureIntervalMs * 0.9);
+                    }
+                }
                 
                 function startFrameCapture() {
                     if (frameInterval) return;
@@ -1449,8 +1732,7 @@ class WebApp:
                         
                         // 高级优化：自适应帧间隔
                         const now = Date.now();
-                        const minInterval = frameSkipCount > 5 ? 150 : 100; // 动态调整间隔
-                        if (now - lastFrameTime < minInterval) {
+                        if (now - lastFrameTime < captureIntervalMs) {
                             return;
                         }
                         lastFrameTime = now;
@@ -1480,10 +1762,13 @@ class WebApp:
                         // 更新状态
                         document.getElementById('captureStatus').textContent = '正在发送';
                         
-                        // 异步重置处理标志
+                        // 处理标志在收到frame_result时重置，超时兜底
+                        const sentAt = lastFrameTime;
                         setTimeout(() => {
-                            isProcessing = false;
-                        }, 30);
+                            if (isProcessing && lastFrameTime === sentAt) {
+                                isProcessing = false;
+                            }
+                        }, FRAME_RESULT_TIMEOUT);
                         
                     } catch (error) {
                         console.error('捕获帧失败:', error);
@@ -1611,6 +1896,8 @@ class WebApp:
         else:
             logger.info(f"启动HTTP Web应用: http://{host}:{port}")
             uvicorn.run(self.app, host=host, port=port)
+        
+        self.frame_executor.shutdown()
 
 def main():
     """主函数"""
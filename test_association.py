@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人脸-人员关联测试
+验证一对一分配、按头部位置区分重叠人员、空输入，以及无SciPy时的匈牙利算法实现
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import itertools
+from types import SimpleNamespace
+
+import numpy as np
+
+from association import associate_faces, assign_faces_to_tracks, hungarian, SCIPY_AVAILABLE
+
+def brute_force_cost(cost: np.ndarray) -> float:
+    """穷举所有分配的最小总代价（小矩阵）"""
+    n, m = cost.shape
+    if n > m:
+        cost, (n, m) = cost.T, (m, n)
+    return min(cost[range(n), list(cols)].sum() for cols in itertools.permutations(range(m), n))
+
+def test_faces_compete_for_one_track():
+    """两张人脸都落在同一人员框内时只分配一张（贪心匹配会把两张都分给该人员）"""
+    person = [100, 100, 200, 400]
+    near_head = [130, 110, 170, 150]
+    lower = [130, 200, 170, 240]
+    pairs = associate_faces([lower, near_head], [person])
+    assert pairs == {1: 0}, pairs
+
+    faces = [SimpleNamespace(bbox=lower, track_id=None), SimpleNamespace(bbox=near_head, track_id=None)]
+    tracks = [SimpleNamespace(track_id=7, bbox=person)]
+    assignment = assign_faces_to_tracks(faces, tracks)
+    assert assignment == {7: 1}
+    assert faces[0].track_id is None and faces[1].track_id == 7
+    print("✅ 多张人脸竞争同一人员时为一对一分配")
+
+def test_one_to_one_with_two_tracks():
+    """两张人脸、两个相互重叠的人员：各自分给头部位置最近的人员"""
+    left = [100, 100, 220, 400]
+    right = [160, 100, 280, 400]
+    left_face = [140, 105, 180, 145]
+    right_face = [200, 105, 240, 145]
+    pairs = associate_faces([right_face, left_face], [left, right])
+    assert pairs == {0: 1, 1: 0}, pairs
+    print("✅ 两张人脸分别分配给两个人员")
+
+def test_tie_break_by_head_distance():
+    """人脸同时完全落在两个人员框内时，分给人员框顶部中点更近的人员"""
+    face = [150, 110, 190, 150]
+    far = [60, 60, 220, 400]     # 顶部中点 (140, 60)
+    near = [100, 100, 240, 400]  # 顶部中点 (170, 100)
+    assert associate_faces([face], [far, near]) == {0: 1}
+    assert associate_faces([face], [near, far]) == {0: 0}
+    print("✅ 同等重叠时按到头部位置的距离区分")
+
+def test_empty_inputs():
+    """无人脸、无人员或人脸不在任何人员框内时返回空分配"""
+    person = [100, 100, 200, 400]
+    face = [130, 110, 170, 150]
+    assert associate_faces([], [person]) == {}
+    assert associate_faces([face], []) == {}
+    assert associate_faces([], []) == {}
+    assert associate_faces([[500, 500, 540, 540]], [person]) == {}
+    assert assign_faces_to_tracks([], []) == {}
+    rows, cols = hungarian(np.zeros((0, 3)))
+    assert len(rows) == 0 and len(cols) == 0
+    print("✅ 空输入返回空分配")
+
+def test_hungarian_matches_reference(trials: int = 200, seed: int = 0):
+    """匈牙利算法实现的总代价与参考实现一致（含非方阵）"""
+    rng = np.random.default_rng(seed)
+    if SCIPY_AVAILABLE:
+        from scipy.optimize import linear_sum_assignment
+    for i in range(trials):
+        n, m = rng.integers(1, 7, size=2)
+        cost = rng.random((n, m))
+        if i % 3 == 0:
+            cost = np.round(cost * 4)  # 含重复值
+        rows, cols = hungarian(cost)
+        assert len(rows) == min(n, m)
+        assert len(set(rows.tolist())) == len(rows) and len(set(cols.tolist())) == len(cols)
+        assert list(rows) == sorted(rows)
+        total = cost[rows, cols].sum()
+        assert abs(total - brute_force_cost(cost)) < 1e-9, (i, cost)
+        if SCIPY_AVAILABLE:
+            ref_rows, ref_cols = linear_sum_assignment(cost)
+            assert abs(total - cost[ref_rows, ref_cols].sum()) < 1e-9, (i, cost)
+    reference = "scipy.optimize.linear_sum_assignment" if SCIPY_AVAILABLE else "穷举"
+    print(f"✅ 匈牙利算法与{reference}一致（{trials} 个随机矩阵）")
+
+if __name__ == "__main__":
+    test_faces_compete_for_one_track()
+    test_one_to_one_with_two_tracks()
+    test_tie_break_by_head_distance()
+    test_empty_inputs()
+    test_hungarian_matches_reference()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨会话批处理推理测试
+使用模拟的批量推理函数验证：结果路由正确、多会话合批、单会话不额外等待、按会话公平取帧、异常传递
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import threading
+import time
+
+import numpy as np
+
+from batch_inference import BatchInferenceServer
+
+class FakeModel:
+    """固定开销 + 每帧开销的批量推理（模拟GPU批处理）"""
+
+    def __init__(self, fixed: float = 0.02, per_frame: float = 0.002):
+        self.fixed = fixed
+        self.per_frame = per_frame
+        self.batches = []
+
+    def __call__(self, frames):
+        self.batches.append([int(frame[0, 0]) for frame in frames])
+        time.sleep(self.fixed + self.per_frame * len(frames))
+        return [int(frame[0, 0]) * 10 for frame in frames]
+
+def make_frame(value: int) -> np.ndarray:
+    return np.full((4, 4), value, dtype=np.int32)
+
+def run_sessions(server, num_sessions: int, frames_per_session: int):
+    errors = []
+
+    def session(session_id):
+        for i in range(frames_per_session):
+            value = session_id * 1000 + i
+            if server(session_id, make_frame(value), timeout=5) != value * 10:
+                errors.append(value)
+
+    threads = [threading.Thread(target=session, args=(s,)) for s in range(num_sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, errors
+
+def test_routing_and_batching():
+    """8个会话并发提交：结果正确路由，批大小>1，总吞吐高于逐帧推理"""
+    model = FakeModel()
+    server = BatchInferenceServer(model, max_batch=8, max_wait_ms=5.0)
+    elapsed, errors = run_sessions(server, num_sessions=8, frames_per_session=10)
+    stats = server.get_statistics()
+    server.close()
+
+    assert not errors
+    assert stats['frames'] == 80 and stats['avg_batch_size'] > 4, stats
+    unbatched = 80 * (model.fixed + model.per_frame)
+    assert elapsed < unbatched / 3, (elapsed, unbatched)
+    print(f"✅ 8会话 x 10帧: 平均批大小 {stats['avg_batch_size']:.1f}，耗时 {elapsed * 1000:.0f}ms"
+          f"（逐帧约 {unbatched * 1000:.0f}ms），平均排队 {stats['avg_queue_wait_ms']:.1f}ms")
+
+def test_single_session_no_wait():
+    """只有一个活跃会话时立即推理，不等待max_wait"""
+    model = FakeModel(fixed=0.0, per_frame=0.0)
+    server = BatchInferenceServer(model, max_batch=8, max_wait_ms=200.0)
+    start = time.perf_counter()
+    for i in range(5):
+        assert server('only', make_frame(i), timeout=5) == i * 10
+    elapsed = time.perf_counter() - start
+    server.close()
+    assert elapsed < 0.2, elapsed
+    print(f"✅ 单会话5帧耗时 {elapsed * 1000:.1f}ms（未等待合批）")
+
+def test_fairness():
+    """一个会话积压多帧时，每批中其他会话也各有一帧"""
+    model = FakeModel(fixed=0.05, per_frame=0.0)
+    server = BatchInferenceServer(model, max_batch=4, max_wait_ms=1.0)
+    blocker = server.submit('warmup', make_frame(0))  # 占住工作线程
+    time.sleep(0.01)
+    greedy = [server.submit('greedy', make_frame(100 + i)) for i in range(8)]
+    others = [server.submit(f'other{i}', make_frame(200 + i)) for i in range(3)]
+    for future in [blocker] + greedy + others:
+        future.result(timeout=5)
+    server.close()
+
+    first_batch = model.batches[1]
+    assert sorted(first_batch) == [100, 200, 201, 202], model.batches
+    print(f"✅ 按会话轮询取帧: 第一批 {first_batch}")
+
+def test_error_propagation():
+    """推理失败时该批所有调用方收到异常，服务继续运行"""
+    calls = []
+
+    def flaky(frames):
+        calls.append(len(frames))
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return [0] * len(frames)
+
+    server = BatchInferenceServer(flaky, max_wait_ms=0.0)
+    try:
+        server('a', make_frame(1), timeout=5)
+        assert False, "应抛出异常"
+    except RuntimeError:
+        pass
+    assert server('a', make_frame(2), timeout=5) == 0
+    assert server.get_statistics()['failed_batches'] == 1
+    server.close()
+    print("✅ 推理异常传递给调用方")
+
+if __name__ == "__main__":
+    test_routing_and_batching()
+    test_single_session_no_wait()
+    test_fairness()
+    test_error_propagation()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CompleteAnalyzer流水线测试
+用模拟的分析器验证：流水线中每一帧的绘制结果和统计只反映该帧自己的分析状态，
+不会被下一帧的分析提前修改；其他线程读取统计时不会与分析线程交错
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import threading
+import time
+
+import numpy as np
+
+from complete_analyzer import CompleteAnalyzer
+from frame_snapshot import SnapshotCounters
+
+class FakeIntegrated:
+    def __init__(self):
+        self.frame_count = 0
+
+    def detect_persons(self, frame):
+        time.sleep(0.002)
+        return np.zeros((0, 5), dtype=np.float32)
+
+class FakePersistent:
+    """process_frame 把帧内写入的编号记为当前状态"""
+
+    def __init__(self):
+        self.analyzer = FakeIntegrated()
+        self.current = None
+        self.profiles = {}
+        self.record_count = 0
+        self.last_record_time = None
+
+    def process_frame(self, frame, detections=None):
+        time.sleep(0.003)
+        self.analyzer.frame_count += 1
+        self.current = int(frame[0, 0, 0])
+        # 像真实档案字典一样逐项增删
+        for i in range(50):
+            self.profiles[(self.current, i)] = i
+            time.sleep(0.00002)
+        for key in [k for k in self.profiles if k[0] != self.current]:
+            del self.profiles[key]
+        return [], [], {}
+
+    def get_realtime_statistics(self):
+        total = 0
+        for value in self.profiles.values():
+            total += value
+            time.sleep(0.00001)
+        return {'frame': self.current, 'total': total}
+
+    def get_cached_session_statistics(self):
+        return {}
+
+    def get_persistence_statistics(self):
+        return {}
+
+class FakeBehavior:
+    def __init__(self, persistent: FakePersistent):
+        self.persistent = persistent
+        self.frame = None
+
+    def update_behavior_analysis(self, tracks, profiles):
+        self.frame = self.persistent.current
+
+    def get_behavior_summary(self):
+        time.sleep(0.001)
+        return {'frame': self.frame}
+
+    def get_zone_statistics(self):
+        return {}
+
+def make_analyzer() -> CompleteAnalyzer:
+    analyzer = CompleteAnalyzer.__new__(CompleteAnalyzer)
+    analyzer.persistent_analyzer = FakePersistent()
+    analyzer.behavior_analyzer = FakeBehavior(analyzer.persistent_analyzer)
+    analyzer.snapshot_counters = SnapshotCounters()
+    analyzer._snapshot = None
+    analyzer.pipeline = None
+    analyzer._state_lock = threading.RLock()
+
+    def draw(frame, tracks, faces, snapshot):
+        # 绘制读取行为分析器的当前状态（热力图/行为信息）
+        time.sleep(0.003)
+        return analyzer.behavior_analyzer.frame
+
+    analyzer._draw_complete_results = draw
+    return analyzer
+
+def test_render_sees_own_frame(num_frames: int = 100):
+    """绘制和统计看到的行为状态、快照帧号都属于本帧"""
+    analyzer = make_analyzer()
+    pipeline = analyzer.create_pipeline(queue_size=4)
+    futures = [pipeline.submit({'frame': np.full((2, 2, 3), i % 256, dtype=np.uint8)}) for i in range(num_frames)]
+    results = [future.result(timeout=30) for future in futures]
+    pipeline.close()
+
+    mismatched = 0
+    for i, ctx in enumerate(results):
+        expected = i % 256
+        stats = ctx['stats']
+        if (ctx['result_frame'] != expected or stats['behavior']['frame'] != expected
+                or stats['realtime']['frame'] != expected or stats['snapshot']['frame'] != i + 1):
+            mismatched += 1
+    assert mismatched == 0, f"{mismatched}/{num_frames} 帧的绘制或统计读到了其他帧的状态"
+    print(f"✅ {num_frames} 帧的绘制和统计均对应本帧状态")
+
+def test_concurrent_stats_reads(num_frames: int = 60):
+    """REST统计线程与流水线分析线程并发时，统计在状态锁内计算，不会遇到正在修改的字典"""
+    analyzer = make_analyzer()
+    pipeline = analyzer.create_pipeline(queue_size=4)
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                realtime = analyzer.get_snapshot(('realtime', 'behavior')).realtime
+                assert realtime['total'] in (0, sum(range(50))), realtime
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    futures = [pipeline.submit({'frame': np.full((2, 2, 3), i, dtype=np.uint8)}) for i in range(num_frames)]
+    for future in futures:
+        future.result(timeout=30)
+    done.set()
+    thread.join()
+    pipeline.close()
+    assert not errors, errors[:3]
+    print("✅ 并发读取统计没有与分析交错")
+
+if __name__ == "__main__":
+    test_render_sees_own_frame()
+    test_concurrent_stats_reads()
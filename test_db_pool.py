@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接池测试
+用模拟连接（不需要MySQL）验证连接复用、耗尽等待与超时、连接级错误丢弃、
+ping失败重建、归还时回滚未提交事务以及溢出连接的关闭
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+import db_pool
+from db_pool import ConnectionPool, PoolTimeoutError
+
+class FakeConnection:
+    """模拟 pymysql 连接"""
+
+    def __init__(self):
+        self.server_status = 0
+        self.broken = False
+        self.closed = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect: bool = False):
+        if self.broken:
+            raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.server_status &= ~SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def close(self):
+        self.closed = True
+
+@contextmanager
+def fake_connect(fail: bool = False):
+    """替换 pymysql.connect，返回创建的连接列表"""
+    created = []
+
+    def connect(**kwargs):
+        if fail:
+            raise pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    original = db_pool.pymysql.connect
+    db_pool.pymysql.connect = connect
+    try:
+        yield created
+    finally:
+        db_pool.pymysql.connect = original
+
+def make_pool(**settings) -> ConnectionPool:
+    return ConnectionPool({'host': 'localhost', 'port': 3306}, **settings)
+
+def test_checkout_reuses_connection():
+    """归还后的连接被下一次借出复用"""
+    with fake_connect() as created:
+        pool = make_pool(pool_size=2, max_overflow=0)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            assert second is first
+        stats = pool.get_statistics()
+        assert len(created) == 1 and stats['created'] == 1
+        assert stats['checkouts'] == 2 and stats['idle_connections'] == 1 and stats['in_use_connections'] == 0
+    print("✅ 连接归还后复用")
+
+def test_exhaustion_timeout_and_wait():
+    """连接耗尽时借出超时；其他线程归还后等待方拿到连接"""
+    with fake_connect() as created:
+        pool = make_pool(pool_size=1, max_overflow=0, pool_timeout=0.05)
+        with pool.connection():
+            try:
+                with pool.connection():
+                    raise AssertionError("连接池耗尽时不应借出连接")
+            except PoolTimeoutError:
+                pass
+        assert pool.get_statistics()['timeouts'] == 1
+
+        pool.pool_timeout = 2.0
+        acquired = []
+        with pool.connection() as held:
+            waiter = threading.Thread(target=lambda: acquired.append(pool._checkout()))
+            waiter.start()
+            time.sleep(0.05)
+            assert not acquired  # 仍在等待
+        waiter.join(2.0)
+        assert acquired and acquired[0].conn is held
+        pool._checkin(acquired[0])
+        assert len(created) == 1
+        assert pool.get_statistics()['max_checkout_wait_ms'] >= 40
+    print("✅ 耗尽时超时，归还后唤醒等待方")
+
+def test_connection_error_discards():
+    """上下文中抛出连接级错误时丢弃连接，下一次借出新建连接"""
+    with fake_connect() as created:
+        pool = make_pool(pool_size=2, max_overflow=0)
+        try:
+            with pool.connection():
+                raise pymysql.err.OperationalError(2013, "Lost connection")
+        except pymysql.err.OperationalError:
+            pass
+        assert created[0].closed
+        stats = pool.get_statistics()
+        assert stats['open_connections'] == 0 and stats['discarded'] == 1
+
+        # 普通异常不丢弃连接
+        try:
+            with pool.connection() as conn:
+                raise ValueError("业务错误")
+        except ValueError:
+            pass
+        assert not conn.closed and pool.get_statistics()['idle_connections'] == 1
+    print("✅ 连接级错误时丢弃连接")
+
+def test_broken_idle_connection_replaced():
+    """空闲连接ping失败时关闭并重建"""
+    with fake_connect() as created:
+        pool = make_pool(pool_size=2, max_overflow=0)
+        with pool.connection() as conn:
+            pass
+        conn.broken = True
+        with pool.connection() as replacement:
+            assert replacement is not conn
+        assert conn.closed and len(created) == 2
+        stats = pool.get_statistics()
+        assert stats['ping_failures'] == 1 and stats['open_connections'] == 1
+    print("✅ ping失败的空闲连接被重建")
+
+def test_expired_connection_recycled():
+    """超过存活时间的空闲连接在借出时关闭"""
+    with fake_connect() as created:
+        pool = make_pool(pool_size=2, max_overflow=0, pool_recycle=0.01)
+        with pool.connection() as conn:
+            pass
+        time.sleep(0.02)
+        with pool.connection() as fresh:
+            assert fresh is not conn
+        assert conn.closed and len(created) == 2
+        assert pool.get_statistics()['open_connections'] == 1
+    print("✅ 过期连接被回收")
+
+def test_checkin_rolls_back_open_transaction():
+    """归还时回滚未提交的事务"""
+    with fake_connect():
+        pool = make_pool(pool_size=1, max_overflow=0)
+        with pool.connection() as conn:
+            conn.server_status |= SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        assert conn.rollbacks == 1 and not conn.closed
+    print("✅ 归还时回滚未提交事务")
+
+def test_overflow_closed_on_return():
+    """超过常驻连接数的溢出连接归还时关闭"""
+    with fake_connect() as created:
+        pool = make_pool(pool_size=1, max_overflow=1)
+        with pool.connection():
+            with pool.connection():
+                assert pool.get_statistics()['open_connections'] == 2
+        assert sum(conn.closed for conn in created) == 1
+        stats = pool.get_statistics()
+        assert stats['open_connections'] == 1 and stats['idle_connections'] == 1
+    print("✅ 溢出连接归还时关闭")
+
+def test_connect_failure_releases_slot():
+    """创建连接失败时释放名额，不会永久占用连接池"""
+    with fake_connect(fail=True):
+        pool = make_pool(pool_size=1, max_overflow=0, pool_timeout=0.05)
+        for _ in range(3):
+            try:
+                with pool.connection():
+                    pass
+            except pymysql.err.OperationalError:
+                pass
+        stats = pool.get_statistics()
+        assert stats['open_connections'] == 0 and stats['timeouts'] == 0
+    print("✅ 创建失败时释放连接名额")
+
+if __name__ == "__main__":
+    test_checkout_reuses_connection()
+    test_exhaustion_timeout_and_wait()
+    test_connection_error_discards()
+    test_broken_idle_connection_replaced()
+    test_expired_connection_recycled()
+    test_checkin_rolls_back_open_transaction()
+    test_overflow_closed_on_return()
+    test_connect_failure_releases_slot()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人口统计增量聚合测试
+档案的平均年龄跨越分组边界、主要性别翻转、档案被移除后，
+聚合器的直方图、年龄总和与性别计数与按全部档案重新统计的结果一致
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import random
+
+from demographics import DemographicAggregator
+from running_stats import AgeEstimate, GenderVotes
+
+TOLERANCE = 1e-6
+
+def legacy_age_group(age: float) -> str:
+    """原 IntegratedAnalyzer.get_statistics 的年龄分组"""
+    if age < 18:
+        return "0-17"
+    elif age < 26:
+        return "18-25"
+    elif age < 36:
+        return "26-35"
+    elif age < 46:
+        return "36-45"
+    elif age < 56:
+        return "46-55"
+    elif age < 66:
+        return "56-65"
+    return "65+"
+
+def legacy_face_age_group(age: float) -> str:
+    """原 FaceAnalyzer.get_age_statistics 的年龄分组"""
+    if age < 13:
+        return '儿童(0-12)'
+    elif age < 18:
+        return '青少年(13-17)'
+    elif age < 36:
+        return '青年(18-35)'
+    elif age < 56:
+        return '中年(36-55)'
+    return '老年(56+)'
+
+class Profile:
+    """与 PersonProfile 相同的年龄/性别估计"""
+
+    def __init__(self):
+        self.age_stats = AgeEstimate()
+        self.gender_votes = GenderVotes()
+        self.avg_age = None
+        self.dominant_gender = None
+
+    def update(self, age, gender):
+        if age is not None:
+            self.age_stats.add(age, 1.0, 1.0)
+            self.avg_age = self.age_stats.avg_age
+        if gender is not None:
+            self.gender_votes.add(gender)
+            self.dominant_gender, _ = self.gender_votes.dominant()
+
+def assert_matches_recount(aggregator: DemographicAggregator, profiles: dict, step):
+    """与按全部档案重新统计的结果比较"""
+    ages = [p.avg_age for p in profiles.values() if p.avg_age is not None]
+    genders = [p.dominant_gender for p in profiles.values() if p.dominant_gender is not None]
+
+    expected = dict.fromkeys(aggregator.age_distribution(), 0)
+    expected_face = dict.fromkeys(aggregator.age_distribution('face'), 0)
+    for age in ages:
+        expected[legacy_age_group(age)] += 1
+        expected_face[legacy_face_age_group(age)] += 1
+
+    assert aggregator.age_distribution() == expected, (step, aggregator.age_distribution(), expected)
+    assert aggregator.age_distribution('face') == expected_face, step
+    assert aggregator.age_count == len(ages), step
+    assert abs(aggregator.age_sum - sum(ages)) <= TOLERANCE * max(1.0, sum(ages)), step
+    assert aggregator.get_gender_count('Male') == genders.count('Male'), step
+    assert aggregator.get_gender_count('Female') == genders.count('Female'), step
+
+def test_bucket_boundaries_and_gender_flip():
+    """平均年龄从17跨到18并继续跨越多个分组，主要性别从男翻转为女"""
+    aggregator = DemographicAggregator()
+    profile = Profile()
+    profiles = {1: profile}
+
+    for age, gender in [(17, 'Male'), (19, 'Female'), (19, 'Female'), (66, None), (66, None)]:
+        profile.update(age, gender)
+        aggregator.update(1, profile.avg_age, profile.dominant_gender)
+        assert_matches_recount(aggregator, profiles, (age, gender))
+
+    # 17 -> 18 -> 18.33 -> 30.25 -> 37.4：依次经过 0-17、18-25、26-35、36-45
+    assert aggregator.age_distribution()["36-45"] == 1
+    assert profile.dominant_gender == 'Female'
+    assert aggregator.get_gender_count('Male') == 0 and aggregator.get_gender_count('Female') == 1
+    print("✅ 跨分组边界和性别翻转后与重新统计一致")
+
+def test_random_updates_match_recount(num_updates: int = 5000, num_tracks: int = 40, seed: int = 0):
+    """随机更新（年龄集中在分组边界附近）和移除档案，每步都与重新统计一致"""
+    rng = random.Random(seed)
+    aggregator = DemographicAggregator()
+    profiles = {}
+    boundaries = [13, 18, 26, 36, 46, 56, 66]
+
+    for step in range(num_updates):
+        track_id = rng.randrange(num_tracks)
+        if track_id in profiles and rng.random() < 0.05:
+            del profiles[track_id]
+            aggregator.remove(track_id)
+        else:
+            profile = profiles.setdefault(track_id, Profile())
+            age = rng.choice(boundaries) + rng.uniform(-1.5, 1.5) if rng.random() > 0.1 else None
+            gender = rng.choice([None, 'Male', 'Female'])
+            profile.update(age, gender)
+            aggregator.update(track_id, profile.avg_age, profile.dominant_gender)
+        assert_matches_recount(aggregator, profiles, step)
+
+    aggregator.clear()
+    assert_matches_recount(aggregator, {}, 'clear')
+    assert aggregator.avg_age is None
+    print(f"✅ {num_updates} 次随机更新后与重新统计一致")
+
+if __name__ == "__main__":
+    test_bucket_boundaries_and_gender_flip()
+    test_random_updates_match_recount()
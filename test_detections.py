@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检测结果数组测试
+验证 (N, 5) float32 数组与 Detections 视图的按列访问、格式转换和空结果处理
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from detections import Detections, as_detections, empty_detections
+
+def test_view_without_copy():
+    """float32数组转换为视图时共享内存"""
+    array = np.array([[10, 20, 110, 220, 0.9], [300, 40, 350, 140, 0.6]], dtype=np.float32)
+    detections = as_detections(array)
+    assert isinstance(detections, Detections)
+    assert np.shares_memory(detections, array)
+    assert detections.xyxy.tolist() == [[10, 20, 110, 220], [300, 40, 350, 140]]
+    assert np.allclose(detections.confidence, [0.9, 0.6])
+    assert detections.xywh.tolist() == [[10, 20, 100, 200], [300, 40, 50, 100]]
+    assert detections.centers.tolist() == [[60, 120], [325, 90]]
+    # xywh 不修改原数组
+    assert array[0, 2] == 110
+    print("✅ Detections视图按列访问正确且不复制数据")
+
+def test_legacy_tuples():
+    """旧接口的元组列表可以转换，也可以转换回去"""
+    detections = as_detections([(1, 2, 3, 4, 0.5), (5, 6, 7, 8, 0.75)])
+    assert detections.shape == (2, 5) and detections.dtype == np.float32
+    assert detections.to_tuples() == [(1, 2, 3, 4, 0.5), (5, 6, 7, 8, 0.75)]
+    print("✅ 元组列表互相转换正确")
+
+def test_empty():
+    """空列表和空数组都得到 (0, 5) 视图"""
+    for value in ([], empty_detections(), np.zeros((0,), dtype=np.float32)):
+        detections = as_detections(value)
+        assert detections.shape == (0, 5)
+        assert detections.xywh.shape == (0, 4)
+        assert detections.to_tuples() == []
+    print("✅ 空检测结果处理正确")
+
+if __name__ == "__main__":
+    test_view_without_copy()
+    test_legacy_tuples()
+    test_empty()
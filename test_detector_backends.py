@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+检测后端预处理/后处理测试
+验证letterbox缩放填充、YOLOv8输出解码（人员过滤、NMS）以及坐标映射回原图
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from detector_backends import letterbox, postprocess, preprocess
+
+def to_output(boxes, size: int, gain: float, pad, num_anchors: int = 50):
+    """原图坐标的 (x1, y1, x2, y2, 人员得分, 其他类别得分) -> 模拟的 84 x N 模型输出"""
+    output = np.zeros((84, num_anchors), dtype=np.float32)
+    for i, (x1, y1, x2, y2, person, other) in enumerate(boxes):
+        lx1, ly1 = x1 * gain + pad[0], y1 * gain + pad[1]
+        lx2, ly2 = x2 * gain + pad[0], y2 * gain + pad[1]
+        output[:4, i] = [(lx1 + lx2) / 2, (ly1 + ly2) / 2, lx2 - lx1, ly2 - ly1]
+        output[4, i] = person
+        output[5, i] = other
+    return output
+
+def test_letterbox():
+    """等比缩放后居中填充到正方形"""
+    frame = np.full((480, 640, 3), 255, dtype=np.uint8)
+    padded, gain, (left, top) = letterbox(frame, 640)
+    assert padded.shape == (640, 640, 3)
+    assert gain == 1.0 and left == 0 and top == 80
+    assert padded[0, 0, 0] == 114 and padded[320, 320, 0] == 255
+
+    blob, transforms = preprocess([frame, np.zeros((720, 1280, 3), dtype=np.uint8)], 320)
+    assert blob.shape == (2, 3, 320, 320) and blob.dtype == np.float32
+    assert blob.max() <= 1.0
+    assert transforms[1][0] == 0.25
+    print("✅ letterbox缩放与填充正确")
+
+def test_postprocess():
+    """只保留人员类别，重叠框经NMS合并，坐标映射回原图"""
+    frame_shape = (720, 1280, 3)
+    gain, pad = 0.5, (0, 140)
+    output = to_output([
+        (100, 100, 300, 500, 0.9, 0.0),   # 人员
+        (105, 102, 302, 498, 0.8, 0.0),   # 与上一个重叠，应被NMS抑制
+        (600, 200, 700, 400, 0.6, 0.0),   # 第二个人员
+        (900, 100, 1000, 300, 0.1, 0.9),  # 其他类别
+        (50, 50, 80, 90, 0.1, 0.0)        # 低于置信度下限
+    ], 640, gain, pad)
+
+    detections = postprocess(output, (gain, pad), frame_shape)
+    assert detections.shape == (2, 5) and detections.dtype == np.float32
+    (x1, y1, x2, y2, conf), second = detections
+    assert abs(x1 - 100) <= 1 and abs(y1 - 100) <= 1 and abs(x2 - 300) <= 1 and abs(y2 - 500) <= 1
+    assert abs(conf - 0.9) < 1e-6
+    assert abs(second[0] - 600) <= 1 and abs(second[4] - 0.6) < 1e-6
+    print("✅ 人员过滤、NMS和坐标映射正确")
+
+def test_postprocess_clip_and_empty():
+    """超出图像的框裁剪到边界，没有候选时返回空数组"""
+    output = to_output([(-20, -10, 200, 300, 0.7, 0.0)], 640, 1.0, (0, 80))
+    detections = postprocess(output, (1.0, (0, 80)), (480, 640, 3))
+    assert detections[0, :2].tolist() == [0, 0]
+    assert postprocess(np.zeros((84, 10), dtype=np.float32), (1.0, (0, 0)), (480, 640, 3)).shape == (0, 5)
+    print("✅ 边界裁剪和空结果正确")
+
+if __name__ == "__main__":
+    test_letterbox()
+    test_postprocess()
+    test_postprocess_clip_and_empty()
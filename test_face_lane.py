@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步人脸分析通道测试
+使用模拟的慢速分析函数验证：提交不阻塞、结果带原始帧序号、坐标映射回原图、队列满时丢弃
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import time
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from face_lane import FaceLane, crop_to_tracks
+from face_analyzer import FaceInfo
+
+@dataclass
+class Track:
+    """与 PersonTrack 相同的坐标字段"""
+    track_id: int
+    bbox: Tuple[int, int, int, int]
+    center: Tuple[int, int]
+
+def make_track(track_id, bbox):
+    x1, y1, x2, y2 = bbox
+    return Track(track_id=track_id, bbox=bbox, center=((x1 + x2) // 2, (y1 + y2) // 2))
+
+def slow_analyze(image, tracks, delay=0.05):
+    """在每个人员框顶部生成一张人脸（裁剪图坐标），并检查像素来自正确的位置"""
+    time.sleep(delay)
+    faces = []
+    for track_id, track in tracks.items():
+        x1, y1, x2, y2 = track.bbox
+        assert image[y1 + 1, x1 + 1, 0] == track_id
+        faces.append(FaceInfo(bbox=(x1 + 10, y1 + 5, x1 + 40, y1 + 40), confidence=0.9,
+                              landmarks=[[x1 + 20, y1 + 20]], track_id=track_id))
+    return faces
+
+def make_frame(tracks):
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    for track in tracks:
+        x1, y1, x2, y2 = track.bbox
+        frame[y1:y2, x1:x2] = track.track_id
+    return frame
+
+def test_crop():
+    """只复制人员区域，轨迹坐标平移到裁剪图"""
+    tracks = [make_track(1, (300, 200, 400, 500)), make_track(2, (600, 100, 700, 400))]
+    image, offset, local_tracks = crop_to_tracks(make_frame(tracks), tracks)
+    assert image.shape[0] < 720 and image.shape[1] < 1280
+    for track, local in zip(tracks, local_tracks):
+        assert local.bbox[0] + offset[0] == track.bbox[0] and local.bbox[1] + offset[1] == track.bbox[1]
+    assert tracks[0].bbox == (300, 200, 400, 500)
+    print(f"✅ 裁剪区域 {image.shape[1]}x{image.shape[0]}，偏移 {offset}")
+
+def test_non_blocking_and_tagged():
+    """提交立即返回，结果带原始帧序号且坐标为原图坐标"""
+    lane = FaceLane(slow_analyze)
+    tracks = [make_track(1, (300, 200, 400, 500)), make_track(2, (600, 100, 700, 400))]
+    frame = make_frame(tracks)
+
+    start = time.perf_counter()
+    assert lane.submit(7, frame, tracks, tracks)
+    assert (time.perf_counter() - start) < 0.02
+    frame[:] = 0  # 提交后复用帧缓冲不影响分析
+
+    assert lane.flush(timeout=2.0)
+    results = lane.poll(current_frame=9)
+    assert len(results) == 1 and results[0].frame_index == 7
+    faces = sorted(results[0].faces, key=lambda f: f.track_id)
+    assert faces[0].bbox == (310, 205, 340, 240) and faces[0].landmarks == [[320, 220]]
+    assert faces[1].bbox == (610, 105, 640, 140)
+    assert lane.get_statistics()['max_frames_behind'] == 2
+    lane.close()
+    print("✅ 提交不阻塞，结果带原始帧序号并映射回原图坐标")
+
+def test_drop_when_busy():
+    """分析跟不上时丢弃新任务，而不是让主循环等待"""
+    lane = FaceLane(lambda image, tracks: slow_analyze(image, tracks, delay=0.2), max_pending=1)
+    tracks = [make_track(1, (300, 200, 400, 500))]
+    frame = make_frame(tracks)
+    accepted = [lane.submit(i, frame, tracks) for i in range(5)]
+    time.sleep(0.01)
+    assert accepted[0] and accepted.count(True) <= 2
+    assert lane.get_statistics()['dropped'] >= 3
+    lane.close()
+    print(f"✅ 队列已满时丢弃任务（接受 {accepted.count(True)}/5）")
+
+if __name__ == "__main__":
+    test_crop()
+    test_non_blocking_and_tagged()
+    test_drop_when_busy()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人员ROI马赛克测试
+验证ROI拼接、检测结果映射回原图坐标以及重叠人员框的去重
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from face_roi import build_mosaic, head_roi, map_detections
+
+def to_mosaic(tile, box):
+    """原图坐标 -> 马赛克坐标（模拟检测器在马赛克上的输出）"""
+    ox, oy = tile.offset
+    rx1, ry1 = tile.roi[:2]
+    return [(box[0] - rx1) * tile.scale + ox, (box[1] - ry1) * tile.scale + oy,
+            (box[2] - rx1) * tile.scale + ox, (box[3] - ry1) * tile.scale + oy]
+
+def test_head_roi():
+    """ROI取人员框上部并裁剪到图像范围内"""
+    roi = head_roi((100, 50, 200, 350), (480, 640, 3))
+    x1, y1, x2, y2 = roi
+    assert x1 < 100 and x2 > 200 and y1 < 50
+    assert y2 < 50 + 300 * 0.6
+    assert head_roi((0, 0, 640, 480), (480, 640, 3))[:2] == (0, 0)
+    assert head_roi((10, 10, 10, 200), (480, 640, 3)) is None
+    print("✅ ROI计算正确")
+
+def test_mosaic_layout():
+    """图块不重叠且都在画布内，内容来自对应ROI"""
+    frame = np.random.RandomState(0).randint(0, 255, (720, 1280, 3), dtype=np.uint8)
+    person_boxes = [(40 + 150 * i, 100, 160 + 150 * i, 500) for i in range(8)]
+    mosaic = build_mosaic(frame, person_boxes)
+    assert mosaic is not None and mosaic.image.shape == (640, 640, 3)
+    assert sorted(tile.owner for tile in mosaic.tiles) == list(range(8))
+    occupied = np.zeros((640, 640), dtype=np.int32)
+    for tile in mosaic.tiles:
+        ox, oy = tile.offset
+        w, h = tile.size
+        assert ox + w <= 640 and oy + h <= 640
+        occupied[oy:oy + h, ox:ox + w] += 1
+    assert occupied.max() == 1
+    print(f"✅ {len(mosaic.tiles)} 个ROI拼接为一张马赛克，图块互不重叠")
+
+def test_too_many_persons():
+    """一张马赛克放不下时返回None，由调用方退回整帧检测"""
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    person_boxes = [(10 * i, 0, 10 * i + 400, 1000) for i in range(80)]
+    assert build_mosaic(frame, person_boxes) is None
+    print("✅ 人数过多时退回整帧检测")
+
+def test_map_back():
+    """检测结果映射回原图坐标，并只保留每个人员得分最高的人脸"""
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    person_boxes = [(100, 100, 260, 600), (700, 150, 820, 500)]
+    faces = [(150, 110, 210, 180), (735, 160, 785, 215)]
+    mosaic = build_mosaic(frame, person_boxes)
+    tiles = {tile.owner: tile for tile in mosaic.tiles}
+
+    bboxes = np.array([to_mosaic(tiles[0], faces[0]) + [0.9],
+                       to_mosaic(tiles[1], faces[1]) + [0.8],
+                       to_mosaic(tiles[1], (740, 250, 760, 270)) + [0.4]], dtype=np.float32)
+    kpss = np.stack([np.tile(bboxes[i, :2], (5, 1)) for i in range(3)])
+    results = map_detections(mosaic, bboxes, kpss, person_boxes)
+
+    assert [owner for owner, _, _ in results] == [0, 1]
+    for (owner, bbox, kps), face in zip(results, faces):
+        assert np.allclose(bbox[:4], face, atol=1.0), (bbox, face)
+        assert np.allclose(kps[0], face[:2], atol=1.0)
+    print("✅ 检测框与关键点正确映射回原图")
+
+def test_overlapping_persons():
+    """同一张人脸出现在两个重叠人员的ROI中时只归属头部更近的人员"""
+    frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+    person_boxes = [(300, 100, 460, 600), (370, 100, 530, 600)]
+    face = (380, 110, 440, 180)
+    mosaic = build_mosaic(frame, person_boxes)
+    tiles = {tile.owner: tile for tile in mosaic.tiles}
+    bboxes = np.array([to_mosaic(tiles[0], face) + [0.9],
+                       to_mosaic(tiles[1], face) + [0.9]], dtype=np.float32)
+    assert all(tile.roi[0] <= face[0] and face[2] <= tile.roi[2] for tile in tiles.values())
+    results = map_detections(mosaic, bboxes, None, person_boxes)
+    assert [owner for owner, _, _ in results] == [0]
+    print("✅ 重叠人员框中的人脸只关联一次")
+
+if __name__ == "__main__":
+    test_head_roi()
+    test_mosaic_layout()
+    test_too_many_persons()
+    test_map_back()
+    test_overlapping_persons()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+人脸分析调度器测试
+使用模拟时钟验证：新轨迹立即分析、预算限制、按需求排序以及收敛后停止采样
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from dataclasses import dataclass
+from typing import Optional
+
+from face_scheduler import FaceScheduler
+from face_analyzer import AgeHistory
+
+@dataclass
+class Track:
+    track_id: int
+
+@dataclass
+class Face:
+    track_id: int
+    face_quality: Optional[float] = 0.8
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def ids(tracks):
+    return sorted(track.track_id for track in tracks)
+
+def test_new_tracks_run_immediately():
+    """新轨迹不受预算限制，之后每帧不超过预算"""
+    clock = FakeClock()
+    scheduler = FaceScheduler(max_tracks_per_frame=2, retry_interval=0.0, clock=clock)
+    tracks = [Track(i) for i in range(5)]
+    assert ids(scheduler.select(tracks)) == [0, 1, 2, 3, 4]
+    clock.now += 0.1
+    assert len(scheduler.select(tracks)) == 2
+    print("✅ 新轨迹立即分析，后续受预算限制")
+
+def test_priority_by_need():
+    """样本少、方差大的轨迹优先"""
+    clock = FakeClock()
+    scheduler = FaceScheduler(max_tracks_per_frame=1, retry_interval=0.0, clock=clock)
+    tracks = [Track(1), Track(2)]
+    histories = {1: AgeHistory(), 2: AgeHistory()}
+    scheduler.select(tracks, histories)
+    for _ in range(4):
+        scheduler.record([tracks[0]], [Face(1)], 10.0)
+        histories[1].add_prediction(30, 0.9, 0.8)
+    clock.now += 0.1
+    assert ids(scheduler.select(tracks, histories)) == [2]
+    print("✅ 需求评分高的轨迹优先")
+
+def test_converged_tracks_stop():
+    """样本足够、方差小且质量达标后停止采样"""
+    clock = FakeClock()
+    scheduler = FaceScheduler(max_tracks_per_frame=4, retry_interval=0.0, clock=clock)
+    track = Track(7)
+    history = AgeHistory()
+    for age in (30, 31, 29, 30, 31):
+        assert ids(scheduler.select([track], {7: history})) == [7]
+        scheduler.record([track], [Face(7)], 10.0)
+        history.add_prediction(age, 0.9, 0.8)
+        clock.now += 0.1
+    assert scheduler.select([track], {7: history}) == []
+    assert scheduler.get_statistics()['converged'] == 1
+
+    # 方差大时继续采样
+    noisy = AgeHistory()
+    for age in (20, 45, 25, 50, 22, 48):
+        noisy.add_prediction(age, 0.9, 0.8)
+    scheduler.select([Track(8)], {8: noisy})
+    for _ in range(6):
+        scheduler.record([Track(8)], [Face(8)], 10.0)
+    clock.now += 0.1
+    assert ids(scheduler.select([Track(8)], {8: noisy})) == [8]
+    print("✅ 已收敛轨迹停止采样，方差大的轨迹继续采样")
+
+def test_time_budget_and_retry():
+    """毫秒预算按单轨迹耗时换算为人数；未检测到人脸的轨迹按间隔重试"""
+    clock = FakeClock()
+    scheduler = FaceScheduler(max_tracks_per_frame=10, budget_ms=30.0, retry_interval=1.0, clock=clock)
+    tracks = [Track(i) for i in range(6)]
+    selected = scheduler.select(tracks)
+    scheduler.record(selected, [], 6 * 15.0)
+    assert scheduler.get_statistics()['frame_capacity'] == 2
+    clock.now += 0.5
+    assert scheduler.select(tracks) == []
+    clock.now += 0.6
+    assert len(scheduler.select(tracks)) == 2
+    print("✅ 时间预算与重试间隔生效")
+
+def test_forget():
+    """长时间未出现的轨迹状态被清理"""
+    clock = FakeClock()
+    scheduler = FaceScheduler(forget_after=5.0, clock=clock)
+    scheduler.select([Track(1)])
+    clock.now += 10.0
+    scheduler.select([Track(2)])
+    assert list(scheduler.states) == [2]
+    print("✅ 消失轨迹的状态被清理")
+
+if __name__ == "__main__":
+    test_new_tracks_run_immediately()
+    test_priority_by_need()
+    test_converged_tracks_stop()
+    test_time_budget_and_retry()
+    test_forget()
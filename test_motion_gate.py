@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运动门控测试
+验证静止画面跳过检测、画面变化和强制刷新触发检测，以及跳过比例统计
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from motion_gate import MotionGate
+
+def make_scene(seed: int = 0, height: int = 480, width: int = 640) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.repeat(rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8), 8, axis=0).repeat(8, axis=1)
+
+def test_static_scene_skipped():
+    """首帧检测，之后静止画面（含轻微噪声）跳过"""
+    gate = MotionGate(refresh_interval=100)
+    scene = make_scene()
+    rng = np.random.default_rng(1)
+    assert gate.should_detect(scene)
+    for _ in range(20):
+        noisy = np.clip(scene.astype(np.int16) + rng.integers(-3, 4, scene.shape), 0, 255).astype(np.uint8)
+        assert not gate.should_detect(noisy)
+    stats = gate.get_statistics()
+    assert stats['skipped'] == 20 and stats['skip_ratio'] > 0.9
+    print("✅ 静止画面跳过检测")
+
+def test_motion_triggers_detection():
+    """有人进入画面时触发检测，并以该帧作为新的参考帧"""
+    gate = MotionGate(refresh_interval=100)
+    scene = make_scene()
+    gate.should_detect(scene)
+    moved = scene.copy()
+    moved[200:360, 300:360] = 255  # 出现一个人大小的区域
+    assert gate.should_detect(moved)
+    assert not gate.should_detect(moved)
+    assert gate.get_statistics()['motion_triggers'] == 1
+    print("✅ 画面变化触发检测")
+
+def test_slow_motion_accumulates():
+    """与参考帧比较，每帧很小的移动累积后也会触发"""
+    gate = MotionGate(refresh_interval=100)
+    frame = np.full((480, 640, 3), 40, dtype=np.uint8)
+    gate.should_detect(frame)
+    triggered = False
+    for step in range(1, 40):
+        moving = frame.copy()
+        moving[200:300, 100 + step * 2:160 + step * 2] = 220
+        if gate.should_detect(moving):
+            triggered = True
+            break
+    assert triggered
+    print("✅ 缓慢移动累积触发检测")
+
+def test_forced_refresh():
+    """连续跳过达到刷新间隔时强制检测"""
+    gate = MotionGate(refresh_interval=5)
+    scene = make_scene()
+    decisions = [gate.should_detect(scene) for _ in range(11)]
+    assert decisions == [True, False, False, False, False, True, False, False, False, False, True]
+    assert gate.get_statistics()['forced_refreshes'] == 2
+    print("✅ 强制刷新间隔生效")
+
+def test_resolution_change_and_reset():
+    """分辨率变化或重置后必定检测"""
+    gate = MotionGate(refresh_interval=100)
+    gate.should_detect(make_scene())
+    assert gate.should_detect(make_scene(height=720, width=1280))
+    gate.reset()
+    assert gate.should_detect(make_scene(height=720, width=1280))
+    print("✅ 分辨率变化和重置后重新检测")
+
+if __name__ == "__main__":
+    test_static_scene_skipped()
+    test_motion_triggers_detection()
+    test_slow_motion_accumulates()
+    test_forced_refresh()
+    test_resolution_change_and_reset()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步持久化写入器测试
+用模拟数据库（不需要MySQL）验证同会话保存批次的合并、按提交顺序写入、
+flush/close 等待剩余事件写完、队列满时的丢弃策略以及写入失败后继续运行
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import threading
+
+from persistence_writer import PersistenceWriter, SaveBatchEvent, AnalysisRecordEvent, TaskEvent
+
+class FakeDB:
+    """模拟 DatabaseManager，记录写入调用"""
+
+    def __init__(self, fail: bool = False):
+        self.calls = []
+        self.fail = fail
+        self.next_id = 100
+
+    def save_batch(self, session_id, persons, positions, faces, person_ids=None):
+        if self.fail:
+            raise RuntimeError("模拟写入失败")
+        ids = dict(person_ids or {})
+        for person in persons:
+            if person['track_id'] not in ids:
+                ids[person['track_id']] = self.next_id
+                self.next_id += 1
+        self.calls.append(('save_batch', session_id, persons, positions, faces))
+        return {p['track_id']: ids[p['track_id']] for p in persons}
+
+    def save_analysis_record(self, record_data):
+        self.calls.append(('analysis_record', record_data))
+        return len(self.calls)
+
+def person(track_id: int, frames: int) -> dict:
+    return {'track_id': track_id, 'total_frames': frames}
+
+def position(track_id: int, frame: int) -> dict:
+    return {'track_id': track_id, 'frame_number': frame}
+
+def hold_writer(writer: PersistenceWriter) -> threading.Event:
+    """提交一个阻塞任务，使后续事件在队列中积压，返回放行事件"""
+    started, release = threading.Event(), threading.Event()
+
+    def task():
+        started.set()
+        release.wait(5)
+
+    writer.submit(TaskEvent(task))
+    assert started.wait(5)
+    return release
+
+def test_coalesces_same_session_batches():
+    """积压的同会话保存批次合并为一次写入：人员取最新档案，位置和人脸追加，回调全部执行"""
+    db = FakeDB()
+    writer = PersistenceWriter()
+    release = hold_writer(writer)
+    saved = []
+    for i in range(3):
+        writer.submit(SaveBatchEvent(db, 1, [person(7, i)], [position(7, i)], [],
+                                     person_ids={}, on_saved=saved.append))
+    release.set()
+    assert writer.flush(5)
+
+    assert len(db.calls) == 1
+    _, session_id, persons, positions, _ = db.calls[0]
+    assert session_id == 1 and persons == [person(7, 2)]
+    assert [p['frame_number'] for p in positions] == [0, 1, 2]
+    assert saved == [{7: 100}] * 3
+    assert writer.get_statistics()['coalesced'] == 2
+    writer.close()
+    print("✅ 同会话保存批次合并写入")
+
+def test_different_sessions_not_merged():
+    """不同会话或中间隔着其他事件的保存批次不合并，且按提交顺序写入"""
+    db = FakeDB()
+    writer = PersistenceWriter()
+    release = hold_writer(writer)
+    writer.submit(SaveBatchEvent(db, 1, [person(1, 0)], [], []))
+    writer.submit(SaveBatchEvent(db, 2, [person(2, 0)], [], []))
+    writer.submit(AnalysisRecordEvent(db, {'record': 'a'}))
+    writer.submit(SaveBatchEvent(db, 2, [person(3, 0)], [], []))
+    release.set()
+    assert writer.flush(5)
+
+    kinds = [(call[0], call[1] if call[0] == 'save_batch' else call[1]['record']) for call in db.calls]
+    assert kinds == [('save_batch', 1), ('save_batch', 2), ('analysis_record', 'a'), ('save_batch', 2)]
+    assert writer.get_statistics()['coalesced'] == 0
+    writer.close()
+    print("✅ 不同会话不合并，按提交顺序写入")
+
+def test_flush_timeout_while_blocked():
+    """写入未完成时 flush 超时返回False，完成后返回True"""
+    writer = PersistenceWriter()
+    release = hold_writer(writer)
+    assert not writer.flush(0.05)
+    release.set()
+    assert writer.flush(5)
+    writer.close()
+    print("✅ flush等待写入完成")
+
+def test_close_drains_queue():
+    """close 写完队列中剩余的事件后才停止，关闭后拒绝新事件"""
+    db = FakeDB()
+    writer = PersistenceWriter()
+    release = hold_writer(writer)
+    for i in range(5):
+        writer.submit(AnalysisRecordEvent(db, {'record': i}))
+    release.set()
+    writer.close(5)
+
+    assert [call[1]['record'] for call in db.calls] == list(range(5))
+    assert writer.closed
+    assert not writer.submit(AnalysisRecordEvent(db, {'record': 'late'}))
+    assert len(db.calls) == 5
+    print("✅ 关闭前写完剩余事件")
+
+def test_drop_policies():
+    """队列满时 drop_newest 丢弃新事件，drop_oldest 丢弃最旧事件，block 超时后丢弃"""
+    for policy, expected in [(PersistenceWriter.POLICY_DROP_NEWEST, [0, 1]),
+                             (PersistenceWriter.POLICY_DROP_OLDEST, [1, 2]),
+                             (PersistenceWriter.POLICY_BLOCK, [0, 1])]:
+        db = FakeDB()
+        writer = PersistenceWriter(max_queue=2, policy=policy, block_timeout=0.02)
+        release = hold_writer(writer)
+        accepted = [writer.submit(AnalysisRecordEvent(db, {'record': i})) for i in range(3)]
+        release.set()
+        assert writer.flush(5)
+
+        assert [call[1]['record'] for call in db.calls] == expected, (policy, db.calls)
+        assert accepted[2] == (policy == PersistenceWriter.POLICY_DROP_OLDEST), policy
+        assert writer.get_statistics()['dropped'] == 1, policy
+        writer.close()
+    print("✅ 队列满时按策略丢弃")
+
+def test_failure_does_not_stop_writer():
+    """写入失败时计数并继续处理后续事件，失败批次的回调不执行"""
+    failing, db = FakeDB(fail=True), FakeDB()
+    writer = PersistenceWriter()
+    saved = []
+    writer.submit(SaveBatchEvent(failing, 1, [person(1, 0)], [], [], on_saved=saved.append))
+    writer.submit(AnalysisRecordEvent(db, {'record': 'after'}))
+    assert writer.flush(5)
+
+    assert saved == [] and len(db.calls) == 1
+    stats = writer.get_statistics()
+    assert stats['failed'] == 1 and stats['written'] == 1
+    writer.close()
+    print("✅ 写入失败后继续运行")
+
+if __name__ == "__main__":
+    test_coalesces_same_session_batches()
+    test_different_sessions_not_merged()
+    test_flush_timeout_while_blocked()
+    test_close_drains_queue()
+    test_drop_policies()
+    test_failure_does_not_stop_writer()
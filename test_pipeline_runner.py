@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线执行器测试
+使用模拟耗时的阶段验证：结果按提交顺序返回、吞吐量趋近最慢阶段、异常不打乱顺序、共享锁互斥
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import threading
+import time
+
+from pipeline_runner import PipelineRunner
+
+def sleep_stage(name, delay):
+    def stage(value):
+        time.sleep(delay)
+        return value + [name]
+    return stage
+
+def test_order_and_throughput(num_frames: int = 30):
+    """5个阶段各耗时10~20ms：顺序执行约70ms/帧，流水线约20ms/帧"""
+    delays = [('decode', 0.01), ('detect', 0.02), ('analyze', 0.015), ('render', 0.01), ('encode', 0.015)]
+    runner = PipelineRunner([(name, sleep_stage(name, delay)) for name, delay in delays], queue_size=2)
+
+    start = time.perf_counter()
+    futures = [runner.submit([i]) for i in range(num_frames)]
+    results = [future.result(timeout=10) for future in futures]
+    elapsed = time.perf_counter() - start
+
+    assert [r[0] for r in results] == list(range(num_frames))
+    assert all(r[1:] == [name for name, _ in delays] for r in results)
+    sequential = sum(delay for _, delay in delays) * num_frames
+    assert elapsed < sequential * 0.6, (elapsed, sequential)
+
+    stats = runner.get_statistics()
+    assert stats['bottleneck'] == 'detect' and stats['completed'] == num_frames
+    runner.close()
+    print(f"✅ 结果按顺序返回，耗时 {elapsed * 1000:.0f}ms（顺序执行约 {sequential * 1000:.0f}ms），"
+          f"瓶颈阶段: {stats['bottleneck']}")
+
+def test_errors_keep_order():
+    """中间阶段失败的帧仍按顺序完成，后续阶段跳过该帧"""
+    calls = []
+
+    def fail_odd(value):
+        if value % 2:
+            raise ValueError(f"bad frame {value}")
+        return value
+
+    def record(value):
+        time.sleep(0.005)
+        calls.append(value)
+        return value
+
+    runner = PipelineRunner([('check', fail_odd), ('record', record)])
+    futures = [runner.submit(i) for i in range(6)]
+    done_order = []
+    for i, future in enumerate(futures):
+        future.add_done_callback(lambda f, i=i: done_order.append(i))
+    for i, future in enumerate(futures):
+        if i % 2:
+            assert isinstance(future.exception(timeout=5), ValueError)
+        else:
+            assert future.result(timeout=5) == i
+    runner.close()
+    assert calls == [0, 2, 4]
+    assert done_order == list(range(6))
+    assert runner.get_statistics()['failed'] == 3
+    print("✅ 异常帧不影响结果顺序")
+
+def test_shared_lock():
+    """持有同一把锁的两个阶段不会同时执行"""
+    lock = threading.RLock()
+    active = []
+    overlap = []
+
+    def guarded(name):
+        def stage(value):
+            active.append(name)
+            if len(active) > 1:
+                overlap.append(tuple(active))
+            time.sleep(0.005)
+            active.remove(name)
+            return value
+        return stage
+
+    runner = PipelineRunner([('analyze', guarded('analyze')), ('render', guarded('render'))],
+                            locks={'analyze': lock, 'render': lock})
+    for future in [runner.submit(i) for i in range(20)]:
+        future.result(timeout=5)
+    runner.close()
+    assert not overlap
+    print("✅ 共享状态的阶段互斥执行")
+
+if __name__ == "__main__":
+    test_order_and_throughput()
+    test_errors_keep_order()
+    test_shared_lock()
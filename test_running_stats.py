@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量统计等价性测试
+对比累加和估计器与原实现（在完整历史列表上重新求和）的输出是否一致
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import random
+import statistics
+from collections import deque
+
+from running_stats import AgeEstimate, GenderVotes
+from face_analyzer import AgeHistory
+
+TOLERANCE = 1e-9
+
+class LegacyProfile:
+    """原 PersonProfile.update_face_info 的年龄/性别计算"""
+
+    def __init__(self):
+        self.age_estimates, self.age_confidences, self.age_qualities = [], [], []
+        self.gender_estimates = []
+        self.avg_age = None
+        self.age_confidence = 0.0
+        self.avg_face_quality = 0.0
+        self.dominant_gender = None
+        self.gender_confidence = 0.0
+
+    def update(self, age, confidence, quality, gender):
+        if age is not None:
+            self.age_estimates.append(age)
+            if confidence is not None:
+                self.age_confidences.append(confidence)
+                self.age_confidence = sum(self.age_confidences) / len(self.age_confidences)
+            if quality is not None:
+                self.age_qualities.append(quality)
+                self.avg_face_quality = sum(self.age_qualities) / len(self.age_qualities)
+            if self.age_confidences and self.age_qualities:
+                weights = [c * q for c, q in zip(self.age_confidences, self.age_qualities)]
+                if sum(weights) > 0:
+                    self.avg_age = sum(a * w for a, w in zip(self.age_estimates, weights)) / sum(weights)
+                else:
+                    self.avg_age = sum(self.age_estimates) / len(self.age_estimates)
+            else:
+                self.avg_age = sum(self.age_estimates) / len(self.age_estimates)
+        if gender is not None:
+            self.gender_estimates.append(gender)
+            male = self.gender_estimates.count('Male')
+            female = self.gender_estimates.count('Female')
+            if male > female:
+                self.dominant_gender, self.gender_confidence = 'Male', male / len(self.gender_estimates)
+            else:
+                self.dominant_gender, self.gender_confidence = 'Female', female / len(self.gender_estimates)
+
+class RunningProfile:
+    """新 PersonProfile.update_face_info 的年龄/性别计算"""
+
+    def __init__(self):
+        self.age_stats = AgeEstimate()
+        self.gender_votes = GenderVotes()
+        self.avg_age = None
+        self.age_confidence = 0.0
+        self.avg_face_quality = 0.0
+        self.dominant_gender = None
+        self.gender_confidence = 0.0
+
+    def update(self, age, confidence, quality, gender):
+        if age is not None:
+            self.age_stats.add(age, confidence, quality)
+            if confidence is not None:
+                self.age_confidence = self.age_stats.avg_confidence
+            if quality is not None:
+                self.avg_face_quality = self.age_stats.avg_quality
+            self.avg_age = self.age_stats.avg_age
+        if gender is not None:
+            self.gender_votes.add(gender)
+            self.dominant_gender, self.gender_confidence = self.gender_votes.dominant()
+
+def legacy_smoothed_age(ages, confidences, qualities):
+    """原 AgeHistory.get_smoothed_age（返回未取整的年龄）"""
+    if not ages:
+        return 30, 0.5
+    weights = [c * q for c, q in zip(confidences, qualities)]
+    if sum(weights) == 0:
+        return statistics.mean(ages), statistics.mean(confidences)
+    return sum(a * w for a, w in zip(ages, weights)) / sum(weights), statistics.mean(confidences)
+
+def close(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    return abs(a - b) <= TOLERANCE * max(1.0, abs(a), abs(b))
+
+def test_profile_equivalence(num_faces: int = 5000, seed: int = 0):
+    """人员档案：InsightFace/OpenCV人脸总是同时带有年龄、置信度和质量"""
+    rng = random.Random(seed)
+    legacy, running = LegacyProfile(), RunningProfile()
+    for i in range(num_faces):
+        has_age = rng.random() > 0.1
+        age = rng.randint(1, 90) if has_age else None
+        confidence = rng.choice([0.0, rng.random()]) if has_age else None
+        quality = rng.random() if has_age else None
+        gender = rng.choice([None, 'Male', 'Female'])
+        legacy.update(age, confidence, quality, gender)
+        running.update(age, confidence, quality, gender)
+
+        assert close(legacy.avg_age, running.avg_age), (i, legacy.avg_age, running.avg_age)
+        assert close(legacy.age_confidence, running.age_confidence), i
+        assert close(legacy.avg_face_quality, running.avg_face_quality), i
+        assert legacy.dominant_gender == running.dominant_gender, i
+        assert close(legacy.gender_confidence, running.gender_confidence), i
+    print(f"✅ 人员档案估计器与原实现一致（{num_faces} 次更新）")
+
+def test_profile_zero_weights():
+    """置信度全为0时退回简单平均"""
+    legacy, running = LegacyProfile(), RunningProfile()
+    for age in (20, 30, 46):
+        legacy.update(age, 0.0, 0.8, 'Male')
+        running.update(age, 0.0, 0.8, 'Male')
+        assert close(legacy.avg_age, running.avg_age)
+    running.update(60, 0.5, 0.5, None)
+    legacy.update(60, 0.5, 0.5, None)
+    assert close(legacy.avg_age, running.avg_age)
+    print("✅ 零权重回退与原实现一致")
+
+def test_age_history_equivalence(num_predictions: int = 5000, maxlen: int = 20, seed: int = 1):
+    """AgeHistory：滑动窗口累加和与原实现一致（包括重新求和之后）"""
+    rng = random.Random(seed)
+    history = AgeHistory(maxlen=maxlen)
+    ages, confidences, qualities = deque(maxlen=maxlen), deque(maxlen=maxlen), deque(maxlen=maxlen)
+    assert history.get_smoothed_age() == (30, 0.5)
+    for i in range(num_predictions):
+        age = rng.uniform(1, 90)
+        confidence = rng.choice([0.0, rng.uniform(0.6, 1.0)])
+        quality = rng.random()
+        history.add_prediction(age, confidence, quality)
+        ages.append(age)
+        confidences.append(confidence)
+        qualities.append(quality)
+
+        expected_age, expected_confidence = legacy_smoothed_age(ages, confidences, qualities)
+        smoothed_age, avg_confidence = history.window.smoothed()
+        assert close(expected_age, smoothed_age), (i, expected_age, smoothed_age)
+        assert close(expected_confidence, avg_confidence), i
+        # 取整结果一致（恰好处于.5边界时允许浮点误差导致的差异）
+        if abs(expected_age - round(expected_age) - 0.5) > 1e-6:
+            assert history.get_smoothed_age()[0] == int(round(expected_age)), i
+        assert list(history.ages) == list(ages)
+    print(f"✅ AgeHistory窗口统计与原实现一致（{num_predictions} 次预测，窗口 {maxlen}）")
+
+def test_decay():
+    """衰减模式：较新的观测权重更高，decay=1.0时为精确平均"""
+    decayed, exact = AgeEstimate(decay=0.5), AgeEstimate()
+    for age in (20, 20, 20, 60):
+        decayed.add(age, 1.0, 1.0)
+        exact.add(age, 1.0, 1.0)
+    assert close(exact.avg_age, 30.0)
+    assert decayed.avg_age > exact.avg_age
+    votes = GenderVotes(decay=0.5)
+    for gender in ('Male', 'Male', 'Female', 'Female'):
+        votes.add(gender)
+    assert votes.dominant()[0] == 'Female'
+    print("✅ 指数衰减生效")
+
+if __name__ == "__main__":
+    test_profile_equivalence()
+    test_profile_zero_weights()
+    test_age_history_equivalence()
+    test_decay()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轨迹预测测试
+验证跳过检测的帧用卡尔曼预测推进轨迹（框继续移动、标记为predicted、恢复检测后ID不变），
+以及区域停留时间按实际经过时间累加
+"""
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import time
+import numpy as np
+
+from model_registry import SharedModel, get_model_registry
+from tracker import PersonTrack, PersonTracker
+from behavior_analyzer import BehaviorAnalyzer
+
+class ConstantEmbedder:
+    """固定外观特征（只测试运动模型，不加载ReID网络）"""
+
+    def predict(self, crops):
+        return [np.ones(128, dtype=np.float32) / np.sqrt(128) for _ in crops]
+
+def make_tracker() -> PersonTracker:
+    registry = get_model_registry()
+    registry.get_reid_embedder = lambda *args, **kwargs: SharedModel('reid_embedder', ConstantEmbedder())
+    return PersonTracker(shared_embedder=True)
+
+def box_at(x: float) -> np.ndarray:
+    return np.array([[x, 100, x + 80, 300, 0.9]], dtype=np.float32)
+
+def test_predict_continues_motion():
+    """匀速移动的轨迹在只预测的帧中继续沿原方向移动"""
+    tracker = make_tracker()
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    x = 100
+    for _ in range(8):
+        tracks = tracker.update(box_at(x), frame)
+        x += 10
+    assert len(tracks) == 1 and not tracks[0].predicted
+    track_id = tracks[0].track_id
+    last_center = tracks[0].center[0]
+
+    for _ in range(3):
+        predicted = tracker.predict()
+        assert len(predicted) == 1
+        assert predicted[0].predicted and predicted[0].track_id == track_id
+        assert predicted[0].center[0] > last_center
+        last_center = predicted[0].center[0]
+        x += 10
+
+    # 恢复检测后仍匹配到同一轨迹
+    tracks = tracker.update(box_at(x), frame)
+    assert len(tracks) == 1 and tracks[0].track_id == track_id and not tracks[0].predicted
+    print("✅ 预测帧中轨迹继续移动，恢复检测后ID不变")
+
+def test_zone_dwell_uses_elapsed_time():
+    """区域停留时间按两次更新之间的实际时间累加，而不是每次更新固定0.1秒"""
+    analyzer = BehaviorAnalyzer(frame_width=640, frame_height=480)
+    zone = analyzer.zones[1]
+    xs, ys = zip(*zone.polygon)
+    center = ((min(xs) + max(xs)) // 2, (min(ys) + max(ys)) // 2)
+    track = PersonTrack(track_id=1, bbox=(center[0] - 20, center[1] - 50, center[0] + 20, center[1] + 50),
+                        confidence=0.8, center=center, timestamp=None, age=1)
+
+    analyzer.update_behavior_analysis([track], {})
+    time.sleep(0.3)
+    analyzer.update_behavior_analysis([track], {})
+    time.sleep(0.3)
+    analyzer.update_behavior_analysis([track], {})
+
+    dwell = analyzer.person_behaviors[1].zone_dwell_times[zone.name]
+    assert 0.5 <= dwell < 1.0, dwell
+    print(f"✅ 区域停留时间按实际时间累加 ({dwell:.2f}s)")
+
+if __name__ == "__main__":
+    test_predict_continues_motion()
+    test_zone_dwell_uses_elapsed_time()
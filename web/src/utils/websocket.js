@@ -1,5 +1,40 @@
 import { wsLogger } from './logger'
 
+// 二进制帧协议（与 src/frame_protocol.py 保持一致）
+// 头部16字节，网络字节序：magic 'PF' | version u8 | msg_type u8 | frame_id u32 | timestamp u64(ms)
+export const PROTOCOL_BINARY = 'binary-v1'
+// 叠加层模式：服务端只返回标注描述，由 CameraCapture 在实时画面上绘制
+export const RENDER_OVERLAY = 'overlay'
+const FRAME_MAGIC_0 = 0x50 // 'P'
+const FRAME_MAGIC_1 = 0x46 // 'F'
+const FRAME_VERSION = 1
+const MSG_VIDEO_FRAME = 1
+const MSG_FRAME_RESULT = 2
+const HEADER_SIZE = 16
+
+const encodeFrameHeader = (msgType, frameId, timestamp) => {
+  const header = new ArrayBuffer(HEADER_SIZE)
+  const view = new DataView(header)
+  view.setUint8(0, FRAME_MAGIC_0)
+  view.setUint8(1, FRAME_MAGIC_1)
+  view.setUint8(2, FRAME_VERSION)
+  view.setUint8(3, msgType)
+  view.setUint32(4, frameId >>> 0)
+  view.setBigUint64(8, BigInt(timestamp))
+  return header
+}
+
+const decodeFrameHeader = (buffer) => {
+  if (buffer.byteLength < HEADER_SIZE) return null
+  const view = new DataView(buffer)
+  if (view.getUint8(0) !== FRAME_MAGIC_0 || view.getUint8(1) !== FRAME_MAGIC_1) return null
+  return {
+    msgType: view.getUint8(3),
+    frameId: view.getUint32(4),
+    timestamp: Number(view.getBigUint64(8))
+  }
+}
+
 class WebSocketService {
   constructor() {
     this.ws = null
@@ -10,6 +45,10 @@ class WebSocketService {
     this.reconnectInterval = 3000
     this.isConnecting = false
     this.isManualClose = false
+    this.protocol = 'text'
+    this.renderMode = 'frame'
+    this.frameId = 0
+    this.lastFrameUrl = null
   }
 
   connect(userId, onMessage) {
@@ -28,6 +67,8 @@ class WebSocketService {
 
     try {
       this.ws = new WebSocket(wsUrl)
+      this.ws.binaryType = 'arraybuffer'
+      this.protocol = 'text'
       
       // 设置全局访问点，以便其他组件可以发送消息
       window.wsService = this
@@ -37,17 +78,39 @@ class WebSocketService {
         this.isConnecting = false
         this.reconnectAttempts = 0
         
-        // 发送连接确认（与PC端兼容）
+        // 发送连接确认（与PC端兼容），同时声明支持二进制帧协议
         this.send({
           type: 'connection',
           user_id: userId,
+          protocols: [PROTOCOL_BINARY],
+          render_mode: RENDER_OVERLAY,
           timestamp: new Date().toISOString()
         })
       }
 
       this.ws.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data)
+          if (event.data instanceof ArrayBuffer) {
+            this.handleBinaryMessage(event.data)
+            return
+          }
+          
+          let data = JSON.parse(event.data)
+          
+          if (data.type === 'connection_established') {
+            this.protocol = data.protocol || 'text'
+            this.renderMode = data.render_mode || 'frame'
+            wsLogger.info('WebSocket传输协议:', this.protocol, '输出模式:', this.renderMode)
+          } else if (data.type === 'frame_stats') {
+            // 二进制协议的配套统计消息，转换为与文本协议一致的frame_result
+            data = {
+              type: 'frame_result',
+              frame_id: data.frame_id,
+              frame: this.renderMode === RENDER_OVERLAY ? null : this.lastFrameUrl,
+              overlay: data.overlay,
+              stats: data.stats
+            }
+          }
           
           // 只在调试模式下打印详细消息，减少生产环境的输出
           if (data.type === 'frame_result') {
@@ -106,6 +169,50 @@ class WebSocketService {
     }
   }
 
+  // 处理二进制结果帧：生成对象URL供界面显示
+  handleBinaryMessage(buffer) {
+    const header = decodeFrameHeader(buffer)
+    if (!header || header.msgType !== MSG_FRAME_RESULT) {
+      wsLogger.error('收到无法识别的二进制消息')
+      return
+    }
+    
+    if (this.lastFrameUrl) {
+      URL.revokeObjectURL(this.lastFrameUrl)
+    }
+    const jpeg = new Blob([new Uint8Array(buffer, HEADER_SIZE)], { type: 'image/jpeg' })
+    this.lastFrameUrl = URL.createObjectURL(jpeg)
+    wsLogger.debug('收到二进制结果帧:', header.frameId)
+  }
+
+  // 是否已协商使用二进制帧协议
+  isBinary() {
+    return this.protocol === PROTOCOL_BINARY
+  }
+
+  // 以二进制协议发送JPEG帧（ArrayBuffer）
+  sendFrame(jpegBuffer, timestamp = Date.now()) {
+    if (!this.ws || this.ws.readyState !== WebSocket.OPEN) {
+      wsLogger.debug('WebSocket未连接，无法发送帧')
+      return false
+    }
+    
+    this.frameId = (this.frameId + 1) >>> 0
+    const header = encodeFrameHeader(MSG_VIDEO_FRAME, this.frameId, timestamp)
+    const message = new Uint8Array(HEADER_SIZE + jpegBuffer.byteLength)
+    message.set(new Uint8Array(header), 0)
+    message.set(new Uint8Array(jpegBuffer), HEADER_SIZE)
+    
+    try {
+      this.ws.send(message.buffer)
+      wsLogger.debug('发送二进制视频帧:', this.frameId)
+      return true
+    } catch (error) {
+      wsLogger.error('发送二进制视频帧失败:', error)
+      return false
+    }
+  }
+
   send(data) {
     if (this.ws && this.ws.readyState === WebSocket.OPEN) {
       try {
@@ -137,6 +244,13 @@ class WebSocketService {
     this.onMessage = null
     this.reconnectAttempts = 0
     this.isConnecting = false
+    this.protocol = 'text'
+    this.renderMode = 'frame'
+    
+    if (this.lastFrameUrl) {
+      URL.revokeObjectURL(this.lastFrameUrl)
+      this.lastFrameUrl = null
+    }
     
     // 清理全局访问点
     if (window.wsService === this) {